@@ -0,0 +1,275 @@
+"""
+DonTe Cleaner Scanner Benchmark
+Generates reproducible synthetic file trees and measures scanner throughput
+
+Usage:
+    python benchmark_scanners.py --files 20000 --output bench.json
+    python benchmark_scanners.py --files 5000 --depth 6 --suspicious-names 0.05
+
+Every scanner run happens in its own process with a fresh config directory, so
+caches start cold and the peak RSS belongs to that scanner alone. The JSON output
+is stable between runs with the same seed and can be diffed between releases.
+"""
+
+import sys
+import os
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+BENCHMARK_VERSION = 1
+SCANNERS = ("basic", "enhanced")
+
+SUSPICIOUS_NAMES = ["crack", "keygen", "patch", "loader", "activator", "hack", "cheat", "trojan"]
+SUSPICIOUS_CONTENT = [b"CreateRemoteThread", b"VirtualAllocEx", b"WriteProcessMemory",
+                      b"keylogger", b"SetWindowsHookEx"]
+PLAIN_EXTENSIONS = [".txt", ".log", ".dat", ".json", ".xml", ".dll", ".exe", ".png"]
+
+
+def generate_tree(root, files, min_size, max_size, depth, fanout,
+                  suspicious_names, suspicious_content, seed):
+    """Create a synthetic tree, the same arguments always produce the same tree
+
+    File sizes are log-uniform between min_size and max_size, so most files are
+    small with a long tail of large ones as on a real disk.
+    """
+    rng = random.Random(seed)
+    directories = [root]
+    frontier = [root]
+    for level in range(depth):
+        next_frontier = []
+        for parent in frontier:
+            for index in range(fanout):
+                directories.append(os.path.join(parent, f"dir_{level}_{index:03d}"))
+                next_frontier.append(directories[-1])
+        frontier = next_frontier
+
+    for directory in directories:
+        os.makedirs(directory, exist_ok=True)
+
+    stats = {'files': files, 'dirs': len(directories), 'bytes': 0,
+             'suspicious_names': 0, 'suspicious_content': 0}
+    chunk = bytes(rng.getrandbits(8) for _ in range(65536))
+
+    for index in range(files):
+        directory = directories[rng.randrange(len(directories))]
+        size = int(min_size * (max_size / min_size) ** rng.random()) if max_size > min_size else min_size
+
+        if rng.random() < suspicious_names:
+            name = f"{rng.choice(SUSPICIOUS_NAMES)}_{index}.exe"
+            stats['suspicious_names'] += 1
+        else:
+            name = f"file_{index}{rng.choice(PLAIN_EXTENSIONS)}"
+
+        marker = b""
+        if rng.random() < suspicious_content:
+            marker = rng.choice(SUSPICIOUS_CONTENT)
+            stats['suspicious_content'] += 1
+
+        with open(os.path.join(directory, name), 'wb') as f:
+            offset = rng.randrange(len(chunk))
+            remaining = size
+            if marker and size > len(marker):
+                f.write(marker)
+                remaining -= len(marker)
+            while remaining > 0:
+                piece = chunk[offset:offset + remaining] or chunk[:remaining]
+                f.write(piece)
+                remaining -= len(piece)
+                offset = 0
+
+        stats['bytes'] += size
+
+    return stats
+
+
+def read_proc_io():
+    """Read/write syscall counters from /proc when psutil is not installed (Linux)"""
+    counters = {}
+    try:
+        with open("/proc/self/io", 'r') as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                counters[key.strip()] = int(value)
+    except (OSError, ValueError):
+        return None, None
+    return counters.get('syscr'), counters.get('syscw')
+
+
+def sample_process():
+    """Peak RSS and I/O system call counters of the current process
+
+    Pages read through mmap are page faults rather than read calls, so a
+    scanner that maps files shows few read calls for the same data.
+    """
+    sample = {'peak_rss': None, 'read_calls': None, 'write_calls': None}
+
+    memory = psutil.Process().memory_info() if PSUTIL_AVAILABLE else None
+    if memory is not None and hasattr(memory, 'peak_wset'):
+        sample['peak_rss'] = memory.peak_wset
+    else:
+        try:
+            import resource
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+            sample['peak_rss'] = peak if sys.platform == 'darwin' else peak * 1024
+        except ImportError:
+            pass
+
+    if PSUTIL_AVAILABLE:
+        try:
+            # read/write syscalls on Linux, read/write I/O operations on Windows
+            io = psutil.Process().io_counters()
+            sample['read_calls'] = io.read_count
+            sample['write_calls'] = io.write_count
+        except (AttributeError, psutil.Error):
+            pass
+    else:
+        sample['read_calls'], sample['write_calls'] = read_proc_io()
+
+    return sample
+
+
+def run_scanner(name, tree, backend):
+    """Scan tree with one scanner twice (cold, then warm cache) and return the measurements"""
+    if name == "basic":
+        from core.antivirus_scanner import AntivirusScanner
+        scanner = AntivirusScanner()
+        scan = lambda: scanner.scan_directory(tree, incremental=False)
+    else:
+        from core.enhanced_antivirus import EnhancedAntivirusScanner
+        scanner = EnhancedAntivirusScanner()
+        scan = lambda: scanner.scan_directory(tree, backend=backend)
+
+    runs = []
+    for phase in ("cold", "warm"):
+        before = sample_process()
+        started = time.perf_counter()
+        threats = scan()
+        elapsed = time.perf_counter() - started
+        after = sample_process()
+
+        run = {'phase': phase, 'seconds': round(elapsed, 4), 'threats': len(threats),
+               'peak_rss': after['peak_rss']}
+        for counter in ('read_calls', 'write_calls'):
+            if before[counter] is not None and after[counter] is not None:
+                run[counter] = after[counter] - before[counter]
+        runs.append(run)
+
+    return {'scanner': name, 'backend': backend if name == "enhanced" else None, 'runs': runs}
+
+
+def run_isolated(name, tree, backend):
+    """Run one scanner in a child process with its own empty working and config directory"""
+    workdir = tempfile.mkdtemp(prefix="donte_bench_")
+    env = dict(os.environ)
+    repo = os.path.dirname(os.path.abspath(__file__))
+    env['PYTHONPATH'] = repo + os.pathsep + env.get('PYTHONPATH', "")
+    # Caches and signatures live in the config folder, give the run its own
+    env['DONTE_CONFIG_DIR'] = os.path.join(workdir, "config")
+
+    try:
+        completed = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--run-scanner", name,
+             "--tree", tree, "--backend", backend],
+            cwd=workdir, env=env, capture_output=True, text=True
+        )
+        if completed.returncode != 0:
+            return {'scanner': name, 'error': completed.stderr.strip().splitlines()[-1:]}
+        return json.loads(completed.stdout.strip().splitlines()[-1])
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def add_rates(result, tree_stats):
+    """Derive files/s and MB/s from the raw timings"""
+    for run in result.get('runs', []):
+        seconds = max(run['seconds'], 1e-9)
+        run['files_per_second'] = round(tree_stats['files'] / seconds, 1)
+        run['mb_per_second'] = round(tree_stats['bytes'] / (1024 * 1024) / seconds, 2)
+    return result
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the DonTe Cleaner scanners")
+    parser.add_argument("--files", type=int, default=10000, help="number of files in the tree")
+    parser.add_argument("--min-size", type=int, default=512, help="smallest file size in bytes")
+    parser.add_argument("--max-size", type=int, default=4 * 1024 * 1024, help="largest file size in bytes")
+    parser.add_argument("--depth", type=int, default=3, help="directory levels below the root")
+    parser.add_argument("--fanout", type=int, default=6, help="subdirectories per directory")
+    parser.add_argument("--suspicious-names", type=float, default=0.01, help="fraction of suspicious file names")
+    parser.add_argument("--suspicious-content", type=float, default=0.01, help="fraction of files with suspicious strings")
+    parser.add_argument("--seed", type=int, default=1, help="random seed for the tree")
+    parser.add_argument("--scanner", choices=SCANNERS + ("all",), default="all")
+    parser.add_argument("--backend", choices=("thread", "process"), default="thread",
+                        help="hashing backend of the enhanced scanner")
+    parser.add_argument("--tree-dir", help="where to build the tree (kept afterwards)")
+    parser.add_argument("--output", help="write the JSON report to this file instead of stdout")
+    parser.add_argument("--run-scanner", choices=SCANNERS, help=argparse.SUPPRESS)
+    parser.add_argument("--tree", help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    if args.run_scanner:
+        # Child process mode, see run_isolated
+        print(json.dumps(run_scanner(args.run_scanner, args.tree, args.backend)))
+        return 0
+
+    config = {key: value for key, value in vars(args).items()
+              if key not in ('run_scanner', 'tree', 'tree_dir', 'output')}
+    tree = args.tree_dir or tempfile.mkdtemp(prefix="donte_tree_")
+
+    try:
+        print(f"Generating {args.files} files in {tree} ...", file=sys.stderr)
+        tree_stats = generate_tree(tree, args.files, args.min_size, args.max_size, args.depth,
+                                   args.fanout, args.suspicious_names, args.suspicious_content,
+                                   args.seed)
+
+        results = []
+        for name in (SCANNERS if args.scanner == "all" else (args.scanner,)):
+            print(f"Running {name} scanner ...", file=sys.stderr)
+            results.append(add_rates(run_isolated(name, tree, args.backend), tree_stats))
+    finally:
+        if not args.tree_dir:
+            shutil.rmtree(tree, ignore_errors=True)
+
+    report = {
+        'benchmark_version': BENCHMARK_VERSION,
+        'config': config,
+        'tree': tree_stats,
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count()
+        },
+        'results': results
+    }
+
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
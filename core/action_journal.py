@@ -0,0 +1,245 @@
+"""
+Action Journal
+Append-only log of the changes the optimizers and cleaners make, written before it
+is needed so undo still works after the process died halfway through a run
+"""
+
+import os
+import json
+import time
+import zlib
+import hashlib
+import threading
+from utils.logger import get_logger
+from utils.resource_manager import get_config_path
+
+DEFAULT_JOURNAL_PATH = get_config_path("action_journal.log")
+DEFAULT_BLOB_FOLDER = get_config_path("journal_blobs")
+# Deleted files up to this size are captured by the shared journal
+DEFAULT_CAPTURE_MAX_SIZE = 64 * 1024
+
+# Bracket an undo run, an undo_started without its undo_finished was cut off
+UNDO_MARKERS = ('undo_started', 'undo_finished')
+
+
+class ActionJournal:
+    """JSON lines journal of mutating actions
+
+    Every line is one record {'seq', 'time', 'action', 'data'}. Undoing a
+    record appends {'action': 'undone', 'data': {'seq': n}} instead of
+    rewriting anything, so the file is only ever appended to and a crash can
+    at worst tear the last line, which is cut off when the journal is opened.
+
+    Lines are flushed to the OS as they are written and fsynced in batches
+    (every sync_every records or sync_interval seconds). Records passed
+    durable=True, used for registry and service changes, are fsynced at once.
+
+    Files up to capture_max_size bytes can have their content captured
+    before deletion, zlib-compressed and keyed by SHA-256 in blob_folder, so
+    deleting them can be undone.
+
+    An undo run is bracketed by 'undo_started' and 'undo_finished' records;
+    when the process dies in between, undo_interrupted is set on the next
+    open so the rest of the undo can be replayed.
+    """
+
+    def __init__(self, path=DEFAULT_JOURNAL_PATH, blob_folder=DEFAULT_BLOB_FOLDER,
+                 sync_every=64, sync_interval=1.0, capture_max_size=0, compact_size=8 * 1024 * 1024):
+        self.logger = get_logger("ActionJournal")
+        self.path = path
+        self.blob_folder = blob_folder
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self.capture_max_size = capture_max_size
+        self.lock = threading.Lock()
+        self.live = {}
+        self.undo_marker = None
+        self.next_seq = 1
+        self.unsynced = 0
+        self.last_sync = time.monotonic()
+        self.file = None
+
+        try:
+            journal_dir = os.path.dirname(path)
+            if journal_dir:
+                os.makedirs(journal_dir, exist_ok=True)
+            self._load()
+            self.file = open(path, 'a', encoding='utf-8')
+            if os.path.getsize(path) > compact_size:
+                self.compact()
+        except Exception as e:
+            self.logger.error(f"Action journal disabled, cannot open {path}: {e}")
+            self.file = None
+
+    def _load(self):
+        """Rebuild the records that were not undone yet"""
+        if not os.path.exists(self.path):
+            return
+
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        end = data.rfind(b"\n") + 1
+        if end < len(data):
+            # A crash tore the last line, cut it off so the next record starts a line of its own
+            with open(self.path, 'r+b') as f:
+                f.truncate(end)
+
+        for line in data[:end].splitlines():
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # Torn line left by an older version
+                continue
+            self.next_seq = max(self.next_seq, record['seq'] + 1)
+            self._apply(record)
+
+    def _apply(self, record):
+        """Update the records not undone yet with one journal line"""
+        if record['action'] == 'undone':
+            self.live.pop(record['data']['seq'], None)
+        elif record['action'] == 'undo_started':
+            self.undo_marker = record
+        elif record['action'] == 'undo_finished':
+            self.undo_marker = None
+        else:
+            self.live[record['seq']] = record
+
+    @property
+    def undo_interrupted(self):
+        """An undo run was started and never finished"""
+        return self.undo_marker is not None
+
+    def record(self, action, durable=False, **data):
+        """Append a record and return its sequence number"""
+        if self.file is None:
+            return None
+
+        with self.lock:
+            record = {'seq': self.next_seq, 'time': time.time(), 'action': action, 'data': data}
+            self.next_seq += 1
+            self.file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self.file.flush()
+            self._apply(record)
+            self.unsynced += 1
+
+            if (durable or self.unsynced >= self.sync_every
+                    or time.monotonic() - self.last_sync >= self.sync_interval):
+                self._sync()
+        return record['seq']
+
+    def _sync(self):
+        os.fsync(self.file.fileno())
+        self.unsynced = 0
+        self.last_sync = time.monotonic()
+
+    def sync(self):
+        """Force every record written so far to disk"""
+        if self.file is None:
+            return
+        with self.lock:
+            if self.unsynced:
+                self._sync()
+
+    def pending(self, actions=None):
+        """Records not undone yet, newest first, optionally only of some actions"""
+        with self.lock:
+            records = list(self.live.values())
+        records.sort(key=lambda record: record['seq'], reverse=True)
+        if actions is not None:
+            records = [record for record in records if record['action'] in actions]
+        return records
+
+    def mark_undone(self, seq):
+        self.record('undone', seq=seq)
+
+    def capture(self, file_path, file_stat):
+        """Keep the content of a small file about to be deleted, return its blob id or None"""
+        if self.file is None or not self.capture_max_size or file_stat.st_size > self.capture_max_size:
+            return None
+
+        try:
+            with open(file_path, 'rb') as f:
+                data = f.read(self.capture_max_size + 1)
+            if len(data) > self.capture_max_size:
+                return None
+
+            blob = hashlib.sha256(data).hexdigest()
+            blob_path = os.path.join(self.blob_folder, blob + ".z")
+            if not os.path.exists(blob_path):
+                os.makedirs(self.blob_folder, exist_ok=True)
+                temp_path = f"{blob_path}.{threading.get_ident()}.tmp"
+                with open(temp_path, 'wb') as f:
+                    f.write(zlib.compress(data, 1))
+                os.replace(temp_path, blob_path)
+            return blob
+        except OSError:
+            return None
+
+    def restore_blob(self, blob, target_path):
+        """Write a captured file back, never over a file that exists again"""
+        if os.path.exists(target_path):
+            return False
+        with open(os.path.join(self.blob_folder, blob + ".z"), 'rb') as f:
+            data = zlib.decompress(f.read())
+        os.makedirs(os.path.dirname(target_path) or ".", exist_ok=True)
+        with open(target_path, 'xb') as f:
+            f.write(data)
+        return True
+
+    def compact(self):
+        """Rewrite the journal with only the records not undone yet and drop unused blobs
+
+        The marker of an interrupted undo is kept, so it is still finished later.
+        """
+        if self.file is None:
+            return
+
+        with self.lock:
+            records = list(self.live.values())
+            if self.undo_marker is not None:
+                records.append(self.undo_marker)
+            records.sort(key=lambda record: record['seq'])
+            temp_path = self.path + ".tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                for record in records:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+            self.file.close()
+            os.replace(temp_path, self.path)
+            self.file = open(self.path, 'a', encoding='utf-8')
+            self.unsynced = 0
+
+            used = {entry[2] for record in records if record['action'] == 'files_deleted'
+                    for entry in record['data']['files'] if entry[2]}
+
+        if os.path.isdir(self.blob_folder):
+            for entry in os.scandir(self.blob_folder):
+                if entry.name.endswith(".z") and entry.name[:-2] not in used:
+                    try:
+                        os.remove(entry.path)
+                    except OSError:
+                        continue
+
+    def close(self):
+        if self.file is not None:
+            with self.lock:
+                if self.unsynced:
+                    self._sync()
+                self.file.close()
+                self.file = None
+
+
+_shared_journals = {}
+_shared_journals_lock = threading.Lock()
+
+
+def get_action_journal(path=DEFAULT_JOURNAL_PATH, **kwargs):
+    """Process-wide journal for path, so every optimizer appends to the same sequence"""
+    kwargs.setdefault('capture_max_size', DEFAULT_CAPTURE_MAX_SIZE)
+    with _shared_journals_lock:
+        journal = _shared_journals.get(path)
+        if journal is None:
+            journal = _shared_journals[path] = ActionJournal(path, **kwargs)
+        return journal
@@ -18,20 +18,29 @@ import time
 import shutil
 from pathlib import Path
 from utils.logger import get_logger
+from core.hash_cache import HashCache
+from core.signature_store import get_signature_store
+from core.hash_workers import fingerprint_file
+from core.pe_analyzer import analyze_pe_file, score_pe
+from core.scan_manifest import ScanManifest
+from core.scan_scheduler import RootScheduler
+from core.filename_matcher import FilenameMatcher
+from core.result_store import ScanResultStore, write_report
+from core.quarantine_vault import QuarantineVault
+from utils.file_walker import WalkProgress, parallel_iter_files
+from utils.progress_dispatcher import ThrottledCallback
+
+# Bump when a heuristic changes in code, verdicts stored by the old rules are dropped
+RULES_VERSION = 2
 
 class AntivirusScanner:
     def __init__(self):
         self.logger = get_logger("AntivirusScanner")
-        self.scan_results = []
+        self.scan_results = ScanResultStore()
         self.quarantine_folder = os.path.expanduser("~/Desktop/DonTe_Quarantine")
         
-        # Known malicious file signatures (MD5 hashes)
-        self.malicious_signatures = {
-            "d41d8cd98f00b204e9800998ecf8427e": "Empty file (potential placeholder malware)",
-            "5d41402abc4b2a76b9719d911017c592": "Known trojan signature",
-            "098f6bcd4621d373cade4e832627b4f6": "Suspicious test file",
-            # Add more known malicious signatures here
-        }
+        # Known malicious file signatures (MD5/SHA256), memory-mapped from disk
+        self.signature_store = get_signature_store()
         
         # Suspicious file extensions
         self.suspicious_extensions = [
@@ -44,31 +53,72 @@ class AntivirusScanner:
             "autorun.inf", "desktop.ini", "thumbs.db", "virus", "trojan",
             "malware", "hack", "crack", "keygen", "loader", "injector"
         ]
+        self.name_matcher = FilenameMatcher(self.suspicious_names, literal=True)
+        
+        # PE header findings needed before an executable is reported
+        self.pe_score_threshold = 3
+        
+        # Executables created this recently are flagged, in seconds
+        self.recent_creation_window = 3600
         
         # Create quarantine folder
         os.makedirs(self.quarantine_folder, exist_ok=True)
+        self.quarantine_vault = QuarantineVault(self.quarantine_folder)
+        
+        # Reuse hashes of unchanged files between scans
+        self.hash_cache = HashCache()
+        
+        # Last scan's per-file verdicts for incremental rescans
+        self.manifest = ScanManifest()
+        
+        # Roots on separate devices are scanned side by side, each device
+        # shares a fixed number of directory readers between its roots
+        self.root_scheduler = RootScheduler(max_per_device=1, readers_per_device=4)
+    
+    def get_signature_version(self):
+        """Version of the loaded signature database"""
+        return self.signature_store.version
     
-    def calculate_file_hash(self, file_path):
+    def get_rules_version(self):
+        """Fingerprint of the heuristics a verdict depends on besides the signatures"""
+        rules = json.dumps([RULES_VERSION, sorted(self.suspicious_extensions), self.suspicious_names,
+                            self.pe_score_threshold, self.recent_creation_window])
+        return hashlib.sha256(rules.encode("utf-8")).hexdigest()[:16]
+    
+    def verdict_is_stable(self, file_stat):
+        """False while a verdict could still change with the file's age alone"""
+        return time.time() - file_stat.st_ctime >= self.recent_creation_window
+    
+    def calculate_file_hash(self, file_path, file_stat=None):
         """Calculate MD5 hash of a file"""
         try:
             # Normalize path separators
             file_path = os.path.normpath(file_path)
             
-            # Check if file exists and is accessible
-            if not os.path.exists(file_path):
-                return None
+            if file_stat is None:
+                # Check if file exists and is accessible
+                if not os.path.exists(file_path):
+                    return None
+                    
+                if not os.path.isfile(file_path):
+                    return None
                 
-            if not os.path.isfile(file_path):
-                return None
+                try:
+                    file_stat = os.stat(file_path)
+                except OSError:
+                    return None
             
-            # Skip very large files (>100MB) for performance
-            try:
-                file_size = os.path.getsize(file_path)
-                if file_size > 100 * 1024 * 1024:  # 100MB
-                    self.logger.info(f"Skipping large file: {file_path} ({file_size} bytes)")
+            cached = self.hash_cache.get(file_path, file_stat)
+            if cached and cached[0]:
+                return cached[0]
+            
+            # Very large files (>100MB) are fingerprinted from a few sampled blocks,
+            # they are only read in full when the fingerprint is a known threat
+            file_size = file_stat.st_size
+            if file_size > 100 * 1024 * 1024:  # 100MB
+                if not self.signature_store.lookup(fingerprint_file(file_path)):
                     return None
-            except OSError:
-                return None
+                self.logger.info(f"Large file matches a threat fingerprint, hashing: {file_path} ({file_size} bytes)")
             
             hash_md5 = hashlib.md5()
             
@@ -76,8 +126,10 @@ class AntivirusScanner:
                 # Read in chunks to handle large files efficiently
                 while chunk := f.read(8192):
                     hash_md5.update(chunk)
-                    
-            return hash_md5.hexdigest()
+            
+            file_hash = hash_md5.hexdigest()
+            self.hash_cache.put(file_path, file_stat, file_hash)
+            return file_hash
             
         except (OSError, IOError, PermissionError) as e:
             self.logger.error(f"Error calculating hash for {file_path}: {e}")
@@ -86,14 +138,15 @@ class AntivirusScanner:
             self.logger.error(f"Unexpected error calculating hash for {file_path}: {e}")
             return None
     
-    def check_file_signature(self, file_path):
+    def check_file_signature(self, file_path, file_stat=None):
         """Check if file matches known malicious signatures"""
-        file_hash = self.calculate_file_hash(file_path)
-        if file_hash and file_hash in self.malicious_signatures:
-            return True, self.malicious_signatures[file_hash]
+        file_hash = self.calculate_file_hash(file_path, file_stat)
+        threat_name = self.signature_store.lookup(file_hash)
+        if threat_name:
+            return True, threat_name
         return False, None
     
-    def check_suspicious_patterns(self, file_path):
+    def check_suspicious_patterns(self, file_path, file_stat=None):
         """Check for suspicious file patterns"""
         file_name = os.path.basename(file_path).lower()
         file_ext = os.path.splitext(file_name)[1].lower()
@@ -102,19 +155,21 @@ class AntivirusScanner:
         if file_ext in self.suspicious_extensions:
             # Additional checks for executable files
             if file_ext in [".exe", ".scr", ".com", ".pif"]:
-                return self.analyze_executable(file_path)
+                return self.analyze_executable(file_path, file_stat)
         
-        # Check suspicious names
-        for suspicious_name in self.suspicious_names:
-            if suspicious_name in file_name:
-                return True, f"Suspicious file name pattern: {suspicious_name}"
+        # Check suspicious names with a single compiled alternation
+        suspicious_name = self.name_matcher.match(file_name)
+        if suspicious_name:
+            return True, f"Suspicious file name pattern: {suspicious_name}"
         
         return False, None
     
-    def analyze_executable(self, file_path):
+    def analyze_executable(self, file_path, file_stat=None):
         """Analyze executable files for suspicious behavior"""
         try:
-            file_size = os.path.getsize(file_path)
+            if file_stat is None:
+                file_stat = os.stat(file_path)
+            file_size = file_stat.st_size
             
             # Very small or very large executables can be suspicious
             if file_size < 1024:  # Less than 1KB
@@ -122,18 +177,28 @@ class AntivirusScanner:
             elif file_size > 100 * 1024 * 1024:  # Larger than 100MB
                 return True, "Unusually large executable file"
             
+            # Structure of the PE headers: packers, injection APIs, odd entry points;
+            # unreadable headers leave the decision to the checks below
+            try:
+                pe_score, pe_reasons = score_pe(analyze_pe_file(file_path))
+            except (OSError, ValueError) as e:
+                self.logger.debug(f"Cannot read PE headers of {file_path}: {e}")
+                pe_score, pe_reasons = 0, []
+            if pe_score >= self.pe_score_threshold:
+                return True, f"Suspicious executable structure: {'; '.join(pe_reasons)}"
+            
             # Check file creation time
-            creation_time = os.path.getctime(file_path)
+            creation_time = file_stat.st_ctime
             current_time = time.time()
             
             # Files created very recently might be suspicious
-            if current_time - creation_time < 3600:  # Created in last hour
+            if current_time - creation_time < self.recent_creation_window:
                 return True, "Recently created executable (potential malware)"
             
             # Check for hidden attributes
             if os.name == 'nt':  # Windows
                 import stat
-                if os.stat(file_path).st_file_attributes & stat.FILE_ATTRIBUTE_HIDDEN:
+                if file_stat.st_file_attributes & stat.FILE_ATTRIBUTE_HIDDEN:
                     return True, "Hidden executable file"
             
             return False, None
@@ -141,54 +206,92 @@ class AntivirusScanner:
             self.logger.error(f"Error analyzing executable {file_path}: {str(e)}")
             return False, None
     
-    def scan_directory(self, directory_path, callback=None):
-        """Scan a directory for malicious files"""
+    def evaluate_file(self, file_path, file_stat=None):
+        """Return the threat verdict for a single file, or None if it is clean"""
+        try:
+            # Check file signature
+            is_malicious, reason = self.check_file_signature(file_path, file_stat)
+            if is_malicious:
+                return {
+                    'threat_type': 'Known Malware',
+                    'description': reason,
+                    'severity': 'High'
+                }
+            
+            # Check suspicious patterns
+            is_suspicious, reason = self.check_suspicious_patterns(file_path, file_stat)
+            if is_suspicious:
+                return {
+                    'threat_type': 'Suspicious File',
+                    'description': reason,
+                    'severity': 'Medium'
+                }
+        
+        except Exception as e:
+            self.logger.error(f"Error scanning file {file_path}: {str(e)}")
+        
+        return None
+    
+    def scan_directory(self, directory_path, callback=None, incremental=False, progress=None, workers=None,
+                       control=None, record=False):
+        """Scan a directory for malicious files
+        
+        With incremental=True only files whose size, mtime or ctime changed
+        since the last scan are evaluated again, unchanged ones keep the
+        verdict stored in the manifest as long as the signatures and rules
+        are the same. record=True stores the verdicts in the manifest without
+        reusing any, so a later incremental scan can continue from them.
+        workers is the number of directory-listing threads.
+        
+        control, used by ScanSession, is asked control.proceed(file_path)
+        after every file and the scan ends when it returns False; threats go
+        to control.add_result instead of the scanner's result store.
+        """
         scan_results = []
         scanned_files = 0
-        total_files = sum([len(files) for r, d, files in os.walk(directory_path)])
+        if progress is None:
+            progress = WalkProgress()
+        add_result = control.add_result if control is not None else self.scan_results.add
         
         self.logger.info(f"Starting directory scan: {directory_path}")
         
-        for root, dirs, files in os.walk(directory_path):
-            for file in files:
-                file_path = os.path.join(root, file)
-                scanned_files += 1
-                
-                if callback:
-                    progress = (scanned_files / total_files) * 100
-                    callback(progress, f"Taranıyor: {file}")
-                
-                try:
-                    # Check file signature
-                    is_malicious, reason = self.check_file_signature(file_path)
-                    if is_malicious:
-                        scan_results.append({
-                            'path': file_path,
-                            'threat_type': 'Known Malware',
-                            'description': reason,
-                            'severity': 'High'
-                        })
-                        continue
-                    
-                    # Check suspicious patterns
-                    is_suspicious, reason = self.check_suspicious_patterns(file_path)
-                    if is_suspicious:
-                        scan_results.append({
-                            'path': file_path,
-                            'threat_type': 'Suspicious File',
-                            'description': reason,
-                            'severity': 'Medium'
-                        })
-                
-                except Exception as e:
-                    self.logger.error(f"Error scanning file {file_path}: {str(e)}")
+        if (incremental or record) and self.manifest.conn is not None:
+            self.manifest.sync_version(f"{self.get_signature_version()}:{self.get_rules_version()}")
+            verdicts = self.manifest.walk(directory_path, self.evaluate_file, progress,
+                                          cacheable=self.verdict_is_stable, workers=workers,
+                                          reuse=incremental)
+        else:
+            # Single streaming pass: progress is estimated while the tree is walked
+            verdicts = ((file_path, self.evaluate_file(file_path, file_stat))
+                        for file_path, file_stat in parallel_iter_files(directory_path, progress,
+                                                                        workers=workers))
         
-        self.scan_results.extend(scan_results)
+        # Per-file updates are coalesced so the UI is not flooded
+        report_progress = ThrottledCallback(callback) if callback else None
+        
+        for file_path, verdict in verdicts:
+            scanned_files += 1
+            
+            if report_progress:
+                report_progress(progress.percent(), f"Taranıyor: {os.path.basename(file_path)}")
+            
+            if verdict:
+                scan_results.append(add_result(
+                    file_path, verdict['threat_type'], verdict['severity'], verdict['description']))
+            
+            if control is not None and not control.proceed(file_path):
+                break
+        
+        # Closing the walk at once lets the manifest keep what was evaluated
+        verdicts.close()
+        if report_progress:
+            report_progress.flush()
+        self.hash_cache.flush()
         self.logger.info(f"Directory scan completed. Found {len(scan_results)} threats")
         return scan_results
     
-    def quick_scan(self, callback=None):
-        """Perform a quick system scan"""
+    def get_quick_scan_roots(self):
+        """Locations covered by a quick scan that exist on this system"""
         quick_scan_paths = [
             os.path.expanduser("~/Desktop"),
             os.path.expanduser("~/Downloads"),
@@ -197,19 +300,10 @@ class AntivirusScanner:
             "C:/Windows/Temp",
             "C:/Temp"
         ]
-        
-        all_results = []
-        for i, path in enumerate(quick_scan_paths):
-            if os.path.exists(path):
-                if callback:
-                    callback((i / len(quick_scan_paths)) * 100, f"Taranıyor: {path}")
-                results = self.scan_directory(path)
-                all_results.extend(results)
-        
-        return all_results
+        return [path for path in quick_scan_paths if os.path.exists(path)]
     
-    def full_scan(self, callback=None):
-        """Perform a full system scan"""
+    def get_full_scan_roots(self):
+        """All drives covered by a full scan"""
         drives = []
         if os.name == 'nt':  # Windows
             import string
@@ -218,35 +312,42 @@ class AntivirusScanner:
                     drives.append(f"{letter}:\\")
         else:
             drives = ["/"]
+        return drives
+    
+    def quick_scan(self, callback=None, incremental=False):
+        """Perform a quick system scan"""
+        return self.scan_roots(self.get_quick_scan_roots(), callback, incremental)
+    
+    def full_scan(self, callback=None, incremental=False):
+        """Perform a full system scan"""
+        return self.scan_roots(self.get_full_scan_roots(), callback, incremental)
+    
+    def scan_roots(self, roots, callback=None, incremental=False, control=None, record=False):
+        """Scan several roots in parallel, one walker per storage device at a time
         
-        all_results = []
-        for i, drive in enumerate(drives):
-            if callback:
-                callback((i / len(drives)) * 100, f"Taranıyor: {drive}")
-            try:
-                results = self.scan_directory(drive)
-                all_results.extend(results)
-            except Exception as e:
-                self.logger.error(f"Error scanning drive {drive}: {str(e)}")
+        control and record are passed on to scan_directory, control is also
+        told control.root_finished(root, files) when a root was scanned to
+        the end, and roots not started yet are skipped once
+        control.stopping() is true.
+        """
+        def scan_root(root, progress, workers):
+            if control is not None and control.stopping():
+                return []
+            results = self.scan_directory(root, incremental=incremental, progress=progress,
+                                          workers=workers, control=control, record=record)
+            if control is not None and not control.stopping():
+                control.root_finished(root, progress.files_seen)
+            return results
         
-        return all_results
+        return self.root_scheduler.run(roots, scan_root, callback)
     
-    def quarantine_file(self, file_path):
-        """Move suspicious file to quarantine"""
+    def quarantine_file(self, file_path, reason=None):
+        """Move suspicious file into the quarantine vault, returns (success, entry id)"""
         try:
-            file_name = os.path.basename(file_path)
-            quarantine_path = os.path.join(self.quarantine_folder, file_name)
-            
-            # If file already exists in quarantine, add timestamp
-            if os.path.exists(quarantine_path):
-                timestamp = int(time.time())
-                name, ext = os.path.splitext(file_name)
-                quarantine_path = os.path.join(self.quarantine_folder, f"{name}_{timestamp}{ext}")
-            
-            # Move file to quarantine
-            shutil.move(file_path, quarantine_path)
-            self.logger.info(f"File quarantined: {file_path} -> {quarantine_path}")
-            return True, quarantine_path
+            # A cached SHA-256 lets an already stored payload skip the copy
+            cached = self.hash_cache.get(file_path, os.stat(file_path))
+            entry_id = self.quarantine_vault.quarantine(file_path, reason, cached[1] if cached else None)
+            return True, entry_id
         except Exception as e:
             self.logger.error(f"Error quarantining file {file_path}: {str(e)}")
             return False, str(e)
@@ -261,14 +362,29 @@ class AntivirusScanner:
             self.logger.error(f"Error deleting file {file_path}: {str(e)}")
             return False, str(e)
     
-    def restore_from_quarantine(self, quarantine_path, original_path):
-        """Restore a file from quarantine"""
+    def restore_from_quarantine(self, quarantine_id, original_path=None):
+        """Restore a vault entry, to its original location unless original_path is given
+        
+        Plain files left in the quarantine folder by older versions are moved back as before.
+        """
         try:
-            shutil.move(quarantine_path, original_path)
-            self.logger.info(f"File restored: {quarantine_path} -> {original_path}")
+            if isinstance(quarantine_id, str) and os.path.isfile(quarantine_id):
+                shutil.move(quarantine_id, original_path)
+            else:
+                original_path = self.quarantine_vault.restore(int(quarantine_id), original_path)
+            self.logger.info(f"File restored: {quarantine_id} -> {original_path}")
             return True, "File restored successfully"
         except Exception as e:
-            self.logger.error(f"Error restoring file {quarantine_path}: {str(e)}")
+            self.logger.error(f"Error restoring file {quarantine_id}: {str(e)}")
+            return False, str(e)
+    
+    def delete_from_quarantine(self, quarantine_id):
+        """Permanently delete a vault entry"""
+        try:
+            self.quarantine_vault.delete(int(quarantine_id))
+            return True, "File deleted successfully"
+        except Exception as e:
+            self.logger.error(f"Error deleting quarantine entry {quarantine_id}: {str(e)}")
             return False, str(e)
     
     def get_scan_report(self):
@@ -276,18 +392,18 @@ class AntivirusScanner:
         report = {
             'scan_date': time.strftime("%Y-%m-%d %H:%M:%S"),
             'total_threats': len(self.scan_results),
-            'high_severity': len([r for r in self.scan_results if r['severity'] == 'High']),
-            'medium_severity': len([r for r in self.scan_results if r['severity'] == 'Medium']),
-            'low_severity': len([r for r in self.scan_results if r['severity'] == 'Low']),
+            'high_severity': self.scan_results.count('High'),
+            'medium_severity': self.scan_results.count('Medium'),
+            'low_severity': self.scan_results.count('Low'),
             'threats': self.scan_results
         }
         return report
     
     def save_report(self, report, file_path):
-        """Save scan report to file"""
+        """Save scan report to file, threats are written one at a time"""
         try:
             with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(report, f, indent=2, ensure_ascii=False)
+                write_report(report, f)
             return True
         except Exception as e:
             self.logger.error(f"Error saving report: {str(e)}")
@@ -0,0 +1,326 @@
+"""
+Archive Inspector
+Streams the members of zip, tar, gzip/bzip2/xz and 7z archives through hashing and
+content matching without extracting anything to disk
+"""
+
+import io
+import os
+import bz2
+import gzip
+import lzma
+import zlib
+import hashlib
+import tarfile
+import zipfile
+
+try:
+    import py7zr
+    from py7zr.io import Py7zIO, WriterFactory
+    PY7ZR_AVAILABLE = True
+except ImportError:
+    # Streaming extraction needs the writer factories of py7zr 0.21 or later
+    PY7ZR_AVAILABLE = False
+
+TAR_EXTENSIONS = (".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz")
+ZIP_EXTENSIONS = (".zip", ".jar", ".apk", ".xpi", ".docm", ".xlsm", ".pptm")
+COMPRESSED_STREAMS = {".gz": gzip.GzipFile, ".bz2": bz2.BZ2File, ".xz": lzma.LZMAFile}
+SEVEN_ZIP_EXTENSIONS = (".7z",)
+
+# Errors raised by damaged, truncated or encrypted archives
+ARCHIVE_ERRORS = (OSError, EOFError, RuntimeError, ValueError, zipfile.BadZipFile,
+                  tarfile.TarError, lzma.LZMAError, zlib.error, NotImplementedError)
+if PY7ZR_AVAILABLE:
+    ARCHIVE_ERRORS += (py7zr.exceptions.ArchiveError, py7zr.exceptions.PasswordRequired)
+
+
+class ArchiveLimitExceeded(Exception):
+    """An archive needs more work than the inspection limits allow"""
+
+
+class _Budget:
+    """Work left for one top-level archive, shared by all nesting levels"""
+
+    def __init__(self, max_entries, max_total_bytes):
+        self.entries_left = max_entries
+        self.bytes_left = max_total_bytes
+        # Decompressed bytes allowed by the size of the archive on disk
+        self.expanded_left = max_total_bytes
+        self.entries = 0
+        self.bytes = 0
+        # Kept for libraries that wrap the exceptions raised from their callbacks
+        self.exceeded = None
+
+    def take_entry(self):
+        self.entries += 1
+        self.entries_left -= 1
+        if self.entries_left < 0:
+            self.exceeded = "too many entries"
+            raise ArchiveLimitExceeded(self.exceeded)
+
+    def take_bytes(self, count):
+        self.bytes += count
+        self.bytes_left -= count
+        self.expanded_left -= count
+        if self.bytes_left < 0:
+            self.exceeded = "too much decompressed data"
+            raise ArchiveLimitExceeded(self.exceeded)
+        if self.expanded_left < 0:
+            self.exceeded = "compression ratio too high"
+            raise ArchiveLimitExceeded(self.exceeded)
+
+    def check_declared(self, count):
+        """Refuse up front an archive whose headers admit to exceeding the budget"""
+        if count > self.bytes_left:
+            self.exceeded = "too much decompressed data"
+        elif count > self.expanded_left:
+            self.exceeded = "compression ratio too high"
+        if self.exceeded:
+            raise ArchiveLimitExceeded(self.exceeded)
+
+
+class _MemberSink:
+    """Takes the decompressed bytes of one member as they are produced
+
+    Hashes them, keeps the head for the content matcher and, for a nested
+    archive small enough, the whole data. Every byte is charged to the budget
+    before it is kept.
+    """
+
+    def __init__(self, member_name, budget, content_window, max_nested_size, keep_data):
+        self.member_name = member_name
+        self.budget = budget
+        self.content_window = content_window
+        self.max_nested_size = max_nested_size
+        self.md5_hash = hashlib.md5()
+        self.sha256_hash = hashlib.sha256()
+        self.head = bytearray()
+        self.data = bytearray() if keep_data else None
+        self.size = 0
+
+    def write(self, chunk):
+        self.budget.take_bytes(len(chunk))
+        self.size += len(chunk)
+        self.md5_hash.update(chunk)
+        self.sha256_hash.update(chunk)
+
+        if len(self.head) < self.content_window:
+            self.head += chunk[:self.content_window - len(self.head)]
+        if self.data is not None:
+            if len(self.data) + len(chunk) > self.max_nested_size:
+                self.data = None
+            else:
+                self.data += chunk
+        return len(chunk)
+
+
+if PY7ZR_AVAILABLE:
+    class _SevenZipWriter(Py7zIO):
+        """py7zr output that feeds a member sink instead of memory or disk"""
+
+        def __init__(self, sink):
+            self.sink = sink
+
+        def write(self, s):
+            return self.sink.write(s)
+
+        def read(self, size=None):
+            return b""
+
+        def seek(self, offset, whence=0):
+            return 0
+
+        def flush(self):
+            pass
+
+        def size(self):
+            return self.sink.size
+
+    class _SevenZipWriterFactory(WriterFactory):
+        """Creates one sink per member py7zr extracts, in archive order"""
+
+        def __init__(self, new_sink):
+            self.new_sink = new_sink
+            self.sinks = []
+
+        def create(self, filename):
+            sink = self.new_sink(filename)
+            self.sinks.append(sink)
+            return _SevenZipWriter(sink)
+
+
+class ArchiveInspector:
+    """Walk archive members as streams, hashing each one and matching its head
+
+    Inspection only collects facts about the members, scoring them is left
+    to the scanner, so it can run in a worker process. Sizes recorded in
+    archive headers are not trusted, the limits are enforced on the bytes
+    actually decompressed. Every entry counts against max_entries, and the
+    decompressed bytes may not exceed max_ratio times the size of the archive
+    once past min_ratio_bytes.
+    """
+
+    def __init__(self, max_depth=3, max_entries=10000, max_total_bytes=512 * 1024 * 1024,
+                 max_ratio=100, min_ratio_bytes=32 * 1024 * 1024,
+                 max_nested_size=32 * 1024 * 1024, content_window=1024 * 1024,
+                 chunk_size=256 * 1024):
+        self.max_depth = max_depth
+        self.max_entries = max_entries
+        self.max_total_bytes = max_total_bytes
+        self.max_ratio = max_ratio
+        self.min_ratio_bytes = min_ratio_bytes
+        self.max_nested_size = max_nested_size
+        self.content_window = content_window
+        self.chunk_size = chunk_size
+
+    def archive_kind(self, name):
+        """'zip', 'tar', 'stream', '7z' or None, judged by the file name"""
+        name = name.lower()
+        if name.endswith(TAR_EXTENSIONS):
+            return "tar"
+        if name.endswith(ZIP_EXTENSIONS):
+            return "zip"
+        if name.endswith(SEVEN_ZIP_EXTENSIONS):
+            return "7z" if PY7ZR_AVAILABLE else None
+        if os.path.splitext(name)[1] in COMPRESSED_STREAMS:
+            return "stream"
+        return None
+
+    def is_archive(self, name):
+        return self.archive_kind(name) is not None
+
+    def inspect(self, file_path, matcher=None):
+        """Inspect an archive on disk
+
+        Returns a dict with members [(member_path, member_name, md5, sha256,
+        suspicious)] for every non-empty member, suspicious being the string
+        matcher found in its first content_window bytes; the number of entries
+        and decompressed bytes looked at; and limit_exceeded holding the
+        reason inspection stopped early, if it did.
+        """
+        budget = _Budget(self.max_entries, self.max_total_bytes)
+        report = {'members': [], 'entries': 0, 'bytes': 0, 'limit_exceeded': None}
+
+        try:
+            with open(file_path, "rb") as archive:
+                archive_size = os.fstat(archive.fileno()).st_size
+                budget.expanded_left = max(self.min_ratio_bytes, archive_size * self.max_ratio)
+                name = os.path.basename(file_path)
+                self._inspect_archive(archive, name, name, 0, budget, matcher, report['members'])
+        except ArchiveLimitExceeded as e:
+            report['limit_exceeded'] = str(e)
+        except ARCHIVE_ERRORS:
+            # Unreadable archives keep whatever was found before the damage
+            report['limit_exceeded'] = budget.exceeded
+
+        report['entries'] = budget.entries
+        report['bytes'] = budget.bytes
+        return report
+
+    def _members(self, archive, name, budget, new_sink):
+        """Yield a filled sink for each file of an archive, one member at a time
+
+        A member that cannot be read, encrypted or damaged, is skipped, the
+        rest of the archive may still be readable. Directories and other
+        entries without content still count as entries.
+        """
+        kind = self.archive_kind(name)
+
+        if kind == "zip":
+            with zipfile.ZipFile(archive) as zip_file:
+                for info in zip_file.infolist():
+                    budget.take_entry()
+                    if info.is_dir():
+                        continue
+                    sink = new_sink(info.filename)
+                    try:
+                        with zip_file.open(info) as reader:
+                            self._drain(reader, sink)
+                    except ARCHIVE_ERRORS:
+                        continue
+                    yield sink
+
+        elif kind == "tar":
+            # Stream mode reads the tar strictly forward, no seeking needed
+            with tarfile.open(fileobj=archive, mode="r|*") as tar_file:
+                for member in tar_file:
+                    budget.take_entry()
+                    if not member.isfile():
+                        # Whatever payload the header declares is still read past
+                        budget.take_bytes(member.size)
+                        continue
+                    sink = new_sink(member.name)
+                    try:
+                        self._drain(tar_file.extractfile(member), sink)
+                    except ARCHIVE_ERRORS:
+                        budget.take_bytes(max(0, member.size - sink.size))
+                        continue
+                    yield sink
+
+        elif kind == "stream":
+            base, ext = os.path.splitext(name)
+            budget.take_entry()
+            sink = new_sink(os.path.basename(base))
+            with COMPRESSED_STREAMS[ext.lower()](fileobj=archive) as reader:
+                self._drain(reader, sink)
+            yield sink
+
+        elif kind == "7z":
+            # py7zr pushes each member through a sink one decompressed block
+            # at a time, the budget stops it on the bytes actually produced
+            def new_counted_sink(member_name):
+                budget.take_entry()
+                return new_sink(member_name)
+
+            factory = _SevenZipWriterFactory(new_counted_sink)
+            with py7zr.SevenZipFile(archive, mode="r") as seven_zip:
+                # Archives that admit to being too large are not even started
+                entries = seven_zip.list()
+                budget.check_declared(sum(entry.uncompressed or 0 for entry in entries
+                                          if not entry.is_directory))
+                # Files are counted as py7zr creates their sinks
+                for entry in entries:
+                    if entry.is_directory:
+                        budget.take_entry()
+                try:
+                    seven_zip.extract(factory=factory)
+                except ARCHIVE_ERRORS:
+                    if budget.exceeded:
+                        raise ArchiveLimitExceeded(budget.exceeded)
+                    raise
+            yield from factory.sinks
+
+    def _drain(self, reader, sink):
+        """Copy a member reader into its sink in chunks"""
+        while True:
+            chunk = reader.read(self.chunk_size)
+            if not chunk:
+                break
+            sink.write(chunk)
+
+    def _inspect_archive(self, archive, name, display_path, depth, budget, matcher, members):
+        """Collect every member of one archive, descending into nested archives"""
+        nested_allowed = depth + 1 < self.max_depth
+
+        def new_sink(member_name):
+            keep_data = nested_allowed and self.is_archive(member_name)
+            return _MemberSink(member_name, budget, self.content_window, self.max_nested_size, keep_data)
+
+        for sink in self._members(archive, name, budget, new_sink):
+            # Empty members (package markers, placeholders) carry nothing to check
+            if sink.size == 0:
+                continue
+
+            member_path = f"{display_path}!{sink.member_name}"
+            suspicious = matcher.search(bytes(sink.head)) if matcher and sink.head else None
+            members.append((member_path, sink.member_name, sink.md5_hash.hexdigest(),
+                            sink.sha256_hash.hexdigest(), suspicious))
+            sink.head = None
+
+            if sink.data is not None:
+                data, sink.data = sink.data, None
+                try:
+                    self._inspect_archive(io.BytesIO(data), os.path.basename(sink.member_name),
+                                          member_path, depth + 1, budget, matcher, members)
+                except ARCHIVE_ERRORS:
+                    continue
@@ -0,0 +1,231 @@
+"""
+Cleanup Planner
+Keeps a per-directory size index of cleanable locations so cleanup savings can be
+projected without deleting anything and without re-walking unchanged directories
+"""
+
+import os
+import json
+import time
+import sqlite3
+import threading
+from utils.logger import get_logger
+from utils.resource_manager import get_config_path
+
+DAY = 86400
+
+# (label, minimum age in days) from youngest to oldest
+AGE_BUCKETS = (("today", 0), ("week", 1), ("month", 7), ("quarter", 30), ("older", 90))
+
+
+def age_bucket(age_days):
+    """Label of the AGE_BUCKETS entry an age in days falls into"""
+    label = AGE_BUCKETS[0][0]
+    for name, minimum in AGE_BUCKETS:
+        if age_days >= minimum:
+            label = name
+    return label
+
+
+class CleanupPlanner:
+    """SQLite index of file counts, bytes and modification days per directory
+
+    Each directory row holds only the files directly inside it, bucketed by
+    the day they were last modified. A refresh lists a directory again only
+    when its mtime changed, which is when files were added, removed or
+    renamed in it. Files rewritten in place keep their old size in the index
+    until their directory changes.
+    """
+
+    def __init__(self, db_path=None):
+        self.logger = get_logger("CleanupPlanner")
+        db_path = db_path or get_config_path("cleanup_index.db")
+        self.db_path = db_path
+        self.lock = threading.Lock()
+        self.conn = None
+
+        try:
+            db_dir = os.path.dirname(db_path)
+            if db_dir:
+                os.makedirs(db_dir, exist_ok=True)
+
+            self.conn = sqlite3.connect(db_path, check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS dirs (path TEXT PRIMARY KEY, mtime_ns INTEGER, "
+                "files INTEGER, bytes INTEGER, days TEXT, subdirs TEXT, indexed_at REAL)"
+            )
+            self.conn.commit()
+        except Exception as e:
+            self.logger.error(f"Cleanup index disabled, cannot open {db_path}: {e}")
+            self.conn = None
+
+    def _key(self, path):
+        return os.path.normcase(os.path.abspath(path))
+
+    def _range(self, root_key):
+        """SQL bounds selecting root_key and every path below it"""
+        prefix = root_key.rstrip(os.sep) + os.sep
+        return root_key, prefix, prefix[:-1] + chr(ord(os.sep) + 1)
+
+    def refresh(self, location):
+        """Bring the index of one location up to date, return (dirs_listed, dirs_reused)"""
+        if self.conn is None:
+            return 0, 0
+
+        root_key = self._key(location)
+        listed = reused = 0
+        seen = set()
+        stack = [(location, root_key)]
+
+        with self.lock:
+            while stack:
+                directory, key = stack.pop()
+                seen.add(key)
+                try:
+                    dir_stat = os.stat(directory)
+                except OSError:
+                    continue
+
+                row = self.conn.execute("SELECT mtime_ns, subdirs FROM dirs WHERE path = ?", (key,)).fetchone()
+                if row is not None and row[0] == dir_stat.st_mtime_ns:
+                    subdirs = json.loads(row[1])
+                    reused += 1
+                else:
+                    subdirs = self._index_directory(directory, key, dir_stat)
+                    listed += 1
+
+                for name in subdirs:
+                    stack.append((os.path.join(directory, name), os.path.join(key, os.path.normcase(name))))
+
+            # Directories that disappeared since the last refresh
+            _, low, high = self._range(root_key)
+            stale = [path for (path,) in self.conn.execute(
+                "SELECT path FROM dirs WHERE path = ? OR (path >= ? AND path < ?)",
+                (root_key, low, high)
+            ) if path not in seen]
+            self.conn.executemany("DELETE FROM dirs WHERE path = ?", [(path,) for path in stale])
+            self.conn.commit()
+
+        return listed, reused
+
+    def _index_directory(self, directory, key, dir_stat):
+        """List one directory and store its aggregate row, return its subdirectory names"""
+        files = 0
+        total = 0
+        days = {}
+        subdirs = []
+
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.name)
+                            continue
+                        file_stat = entry.stat(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    files += 1
+                    total += file_stat.st_size
+                    day = str(int(file_stat.st_mtime // DAY))
+                    count, size = days.get(day, (0, 0))
+                    days[day] = (count + 1, size + file_stat.st_size)
+        except OSError:
+            pass
+
+        self.conn.execute(
+            "INSERT OR REPLACE INTO dirs (path, mtime_ns, files, bytes, days, subdirs, indexed_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (key, dir_stat.st_mtime_ns, files, total, json.dumps(days), json.dumps(subdirs), time.time())
+        )
+        return subdirs
+
+    def summarize(self, location, refresh=True, now=None, min_age_days=0):
+        """File count, bytes and age histogram of a location from the index
+
+        old_files and old_bytes count the files last modified at least
+        min_age_days ago, in whole days. With refresh=False the answer is instant but only
+        as fresh as the last refresh of that location.
+        """
+        summary = {'path': location, 'files': 0, 'bytes': 0, 'old_files': 0, 'old_bytes': 0,
+                   'age_histogram': {name: {'files': 0, 'bytes': 0} for name, _ in AGE_BUCKETS},
+                   'dirs_listed': 0, 'dirs_reused': 0}
+        if self.conn is None or not os.path.isdir(location):
+            return summary
+
+        if refresh:
+            summary['dirs_listed'], summary['dirs_reused'] = self.refresh(location)
+
+        today = int((now or time.time()) // DAY)
+        root_key, low, high = self._range(self._key(location))
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT files, bytes, days FROM dirs WHERE path = ? OR (path >= ? AND path < ?)",
+                (root_key, low, high)
+            ).fetchall()
+
+        for files, total, days in rows:
+            summary['files'] += files
+            summary['bytes'] += total
+            for day, (count, size) in json.loads(days).items():
+                age_days = today - int(day)
+                bucket = summary['age_histogram'][age_bucket(age_days)]
+                bucket['files'] += count
+                bucket['bytes'] += size
+                if age_days >= min_age_days:
+                    summary['old_files'] += count
+                    summary['old_bytes'] += size
+
+        return summary
+
+    def plan(self, locations, refresh=True, now=None, policies=None):
+        """Projected savings of cleaning every location, nothing is deleted
+
+        policies maps locations that are only trimmed to their EvictionPolicy.
+        Such a location is projected to lose only files older than the
+        policy's min_age_days, and no more than what exceeds its max_bytes.
+        Ages come from modification days, so recently read files may be
+        counted as evictable.
+        """
+        policies = {self._key(path): policy for path, policy in (policies or {}).items()}
+        # Overlapping locations (TEMP and TMP are often the same folder) count once
+        keys = set()
+        summaries = []
+        for location in locations:
+            if not location:
+                continue
+            key = self._key(location)
+            if key in keys:
+                continue
+            keys.add(key)
+            policy = policies.get(key)
+            summary = self.summarize(location, refresh, now, policy.min_age_days if policy else 0)
+            if policy is None:
+                summary['projected_files'], summary['projected_bytes'] = summary['files'], summary['bytes']
+            elif policy.max_bytes is None:
+                summary['projected_files'], summary['projected_bytes'] = summary['old_files'], summary['old_bytes']
+            else:
+                summary['projected_bytes'] = min(summary['old_bytes'], max(0, summary['bytes'] - policy.max_bytes))
+                average = summary['old_bytes'] / summary['old_files'] if summary['old_files'] else 0
+                summary['projected_files'] = int(summary['projected_bytes'] / average) if average else 0
+            summaries.append(summary)
+
+        nested = [summary for summary in summaries
+                  if any(self._key(summary['path']).startswith(key.rstrip(os.sep) + os.sep) for key in keys)]
+        counted = [summary for summary in summaries if summary not in nested]
+
+        return {
+            'locations': summaries,
+            'total_files': sum(summary['projected_files'] for summary in counted),
+            'total_bytes': sum(summary['projected_bytes'] for summary in counted),
+            'created_at': time.time()
+        }
+
+    def close(self):
+        if self.conn is not None:
+            with self.lock:
+                self.conn.commit()
+                self.conn.close()
+                self.conn = None
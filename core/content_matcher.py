@@ -0,0 +1,76 @@
+"""
+Multi-Pattern Content Matcher
+Finds any of many byte strings in a single pass over a buffer or mmap view
+"""
+
+import re
+
+_END = -1
+
+
+def _build_trie(patterns):
+    """Build a byte trie, patterns that extend a shorter pattern are dropped"""
+    trie = {}
+    for pattern in patterns:
+        node = trie
+        for byte in pattern:
+            if _END in node:
+                break
+            node = node.setdefault(byte, {})
+        else:
+            node.clear()
+            node[_END] = True
+    return trie
+
+
+def _trie_to_regex(node):
+    """Turn a trie node into a regex where shared prefixes are only tested once"""
+    if _END in node:
+        return b""
+
+    single = []
+    branches = []
+    for byte in sorted(node):
+        child = _trie_to_regex(node[byte])
+        if child:
+            branches.append(re.escape(bytes([byte])) + child)
+        else:
+            single.append(re.escape(bytes([byte])))
+
+    if len(single) == 1:
+        branches.append(single[0])
+    elif single:
+        branches.append(b"[" + b"".join(single) + b"]")
+
+    if len(branches) == 1:
+        return branches[0]
+    return b"(?:" + b"|".join(branches) + b")"
+
+
+class ContentMatcher:
+    """Trie-shaped compiled regex acting as an Aho-Corasick style automaton
+
+    The trie factoring means each position of the input only follows the
+    branch for its own byte, so the cost per byte barely grows with the
+    number of patterns, and the scanning loop runs inside the re engine.
+    """
+
+    def __init__(self, patterns):
+        self.patterns = [p for p in patterns if p]
+        if self.patterns:
+            self.regex = re.compile(_trie_to_regex(_build_trie(self.patterns)))
+        else:
+            self.regex = None
+
+    def search(self, buffer, start=0, end=None):
+        """Return the first suspicious byte string found in buffer, or None
+
+        buffer can be bytes, a memoryview or an mmap object, nothing is copied.
+        """
+        if self.regex is None:
+            return None
+        if end is None:
+            end = len(buffer)
+
+        match = self.regex.search(buffer, start, end)
+        return match.group(0) if match else None
@@ -0,0 +1,238 @@
+"""
+Deletion Engine
+Empties temp and cache folders with os.scandir enumeration, batched deletes on a
+thread pool per volume and bottom-up removal of the directories left empty, or
+trims cache folders to a size budget by evicting their least recently used files
+"""
+
+import os
+import time
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from utils.logger import get_logger
+from utils.file_walker import device_key
+
+
+class DeletionResult:
+    """What a clean run removed, bytes only count space that was actually released"""
+
+    __slots__ = ('files_deleted', 'bytes_freed', 'dirs_removed', 'errors')
+
+    def __init__(self):
+        self.files_deleted = 0
+        self.bytes_freed = 0
+        self.dirs_removed = 0
+        self.errors = 0
+
+    def add(self, other):
+        self.files_deleted += other.files_deleted
+        self.bytes_freed += other.bytes_freed
+        self.dirs_removed += other.dirs_removed
+        self.errors += other.errors
+
+    @property
+    def freed_mb(self):
+        return self.bytes_freed / (1024 * 1024)
+
+
+def freed_size(file_path, file_stat):
+    """Bytes released by unlinking a file, a hard link to data that stays on disk frees nothing
+
+    Call it before the file is removed. DirEntry.stat() leaves st_nlink at 0
+    on Windows, the link count is then read with os.stat.
+    """
+    links = file_stat.st_nlink
+    if not links:
+        try:
+            links = os.stat(file_path, follow_symlinks=False).st_nlink
+        except OSError:
+            links = 1
+    if links > 1:
+        return 0
+    return file_stat.st_size
+
+
+def unique_roots(paths):
+    """Existing directories from paths, without duplicates or roots nested in another root"""
+    roots = {}
+    for path in paths:
+        if path and os.path.isdir(path):
+            roots.setdefault(os.path.normcase(os.path.abspath(path)), path)
+
+    keys = sorted(roots)
+    kept = []
+    for key in keys:
+        if not any(key.startswith(parent.rstrip(os.sep) + os.sep) for parent in kept):
+            kept.append(key)
+    return [roots[key] for key in kept]
+
+
+class EvictionPolicy:
+    """Which files of a cache folder to delete
+
+    Files used within the last min_age_days are always kept. Of the rest the
+    least recently used go first, until the folder fits in max_bytes; with
+    no max_bytes every file old enough is deleted. Last use is the later of
+    access and modification time, as many Windows volumes do not update
+    access times.
+    """
+
+    def __init__(self, max_bytes=None, min_age_days=0, use_atime=True):
+        self.max_bytes = max_bytes
+        self.min_age_days = min_age_days
+        self.use_atime = use_atime
+
+    def last_used(self, file_stat):
+        if self.use_atime:
+            return max(file_stat.st_atime, file_stat.st_mtime)
+        return file_stat.st_mtime
+
+    def select(self, entries, now=None):
+        """Pick the (path, stat) entries to evict from a complete listing of the folder"""
+        cutoff = (now or time.time()) - self.min_age_days * 86400
+        total = sum(file_stat.st_size for _, file_stat in entries)
+        candidates = sorted((entry for entry in entries if self.last_used(entry[1]) <= cutoff),
+                            key=lambda entry: self.last_used(entry[1]))
+        if self.max_bytes is None:
+            return candidates
+
+        selected = []
+        for entry in candidates:
+            if total <= self.max_bytes:
+                break
+            selected.append(entry)
+            total -= entry[1].st_size
+        return selected
+
+
+class DeletionEngine:
+    """Delete the contents of folders, never the folders passed in themselves
+
+    Each volume gets its own pool of deleting threads fed by one walker, so a
+    slow disk does not hold up another and a single disk is not flooded
+    with more concurrent deletes than it can serve.
+    """
+
+    def __init__(self, workers_per_volume=8, batch_size=256, remove_empty_dirs=True, journal=None):
+        self.logger = get_logger("DeletionEngine")
+        self.journal = journal
+        self.workers_per_volume = max(1, workers_per_volume)
+        self.batch_size = batch_size
+        self.remove_empty_dirs = remove_empty_dirs
+
+    def clean(self, paths, should_delete=None):
+        """Empty every folder in paths and return a DeletionResult
+
+        should_delete(path, stat) may veto single files.
+        """
+        return self._run([(root, None) for root in unique_roots(paths)], should_delete)
+
+    def evict(self, policies, now=None):
+        """Trim each folder of {path: EvictionPolicy} and return a DeletionResult
+
+        The directory structure of a cache is kept, only files are removed. A
+        folder nested in another one is trimmed by the outer folder's policy.
+        """
+        jobs = [(root, policies[root]) for root in unique_roots(policies)]
+        return self._run(jobs, None, now)
+
+    def _run(self, jobs, should_delete, now=None):
+        volumes = defaultdict(list)
+        for root, policy in jobs:
+            volumes[device_key(root)].append((root, policy))
+
+        total = DeletionResult()
+        lock = threading.Lock()
+
+        def clean_volume(volume_jobs):
+            result = self._clean_volume(volume_jobs, should_delete, now)
+            with lock:
+                total.add(result)
+
+        threads = [threading.Thread(target=clean_volume, args=(volume_jobs,), daemon=True)
+                   for volume_jobs in volumes.values()]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        return total
+
+    def _clean_volume(self, jobs, should_delete, now):
+        result = DeletionResult()
+        with ThreadPoolExecutor(max_workers=self.workers_per_volume) as pool:
+            for root, policy in jobs:
+                futures = []
+                directories = []
+                entries = self._walk(root, directories, result)
+                if policy is not None:
+                    # Eviction order depends on the whole folder, list it before deleting
+                    entries = policy.select(list(entries), now)
+
+                batch = []
+                for entry in entries:
+                    batch.append(entry)
+                    if len(batch) >= self.batch_size:
+                        futures.append(pool.submit(self._delete_batch, batch, should_delete))
+                        batch = []
+                if batch:
+                    futures.append(pool.submit(self._delete_batch, batch, should_delete))
+
+                for future in futures:
+                    result.add(future.result())
+
+                # Deepest directories first, a parent can only go once its children have
+                if self.remove_empty_dirs and policy is None:
+                    for directory in reversed(directories):
+                        try:
+                            os.rmdir(directory)
+                            result.dirs_removed += 1
+                        except OSError:
+                            continue
+        return result
+
+    def _walk(self, root, directories, result):
+        """Yield (path, stat) for every non-directory below root, record subdirectories in pre-order"""
+        stack = [root]
+        while stack:
+            directory = stack.pop()
+            try:
+                with os.scandir(directory) as it:
+                    for entry in it:
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                directories.append(entry.path)
+                                stack.append(entry.path)
+                            else:
+                                yield entry.path, entry.stat(follow_symlinks=False)
+                        except OSError:
+                            result.errors += 1
+            except OSError:
+                result.errors += 1
+
+    def _delete_batch(self, batch, should_delete):
+        result = DeletionResult()
+        deleted = []
+        for file_path, file_stat in batch:
+            if should_delete is not None and not should_delete(file_path, file_stat):
+                continue
+            blob = self.journal.capture(file_path, file_stat) if self.journal else None
+            size = freed_size(file_path, file_stat)
+            try:
+                os.remove(file_path)
+            except FileNotFoundError:
+                continue
+            except OSError:
+                # In use or access denied, typical for live temp files
+                result.errors += 1
+                continue
+            result.files_deleted += 1
+            result.bytes_freed += size
+            deleted.append((file_path, file_stat.st_size, blob))
+
+        # One journal record per batch keeps journaling cost per file small. Every
+        # deletion is journaled, only those with captured content can be undone
+        if self.journal and deleted:
+            self.journal.record('files_deleted', files=deleted)
+        return result
@@ -10,24 +10,33 @@ import time
 import shutil
 import re
 import mimetypes
+import queue
+import threading
 from pathlib import Path
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ProcessPoolExecutor
 from utils.logger import get_logger
+from core.hash_cache import HashCache
+from core.signature_store import get_signature_store
+from core.hash_workers import (hash_file, fingerprint_file, inspect_file, inspect_file_batch,
+                                init_inspection_worker)
+from core.content_matcher import ContentMatcher
+from core.filename_matcher import FilenameMatcher
+from core.archive_inspector import ArchiveInspector
+from core.pe_analyzer import analyze_pe_file, score_pe
+from core.metadata_prefilter import MetadataPrefilter
+from core.result_store import ScanResultStore, write_report
+from core.quarantine_vault import QuarantineVault
+from utils.file_walker import WalkProgress, parallel_iter_files
+from utils.progress_dispatcher import ThrottledCallback
 
 class EnhancedAntivirusScanner:
     def __init__(self):
         self.logger = get_logger("EnhancedAntivirusScanner")
-        self.scan_results = []
+        self.scan_results = ScanResultStore()
         self.quarantine_folder = os.path.expanduser("~/Desktop/DonTe_Quarantine")
         
-        # Known malicious file signatures (MD5 hashes)
-        self.malicious_signatures = {
-            "d41d8cd98f00b204e9800998ecf8427e": "Empty file (potential placeholder malware)",
-            "5d41402abc4b2a76b9719d911017c592": "Known trojan signature",
-            "098f6bcd4621d373cade4e832627b4f6": "Suspicious test file",
-            "44d88612fea8a8f36de82e1278abb02f": "Common malware string",
-            "e1671797c52e15f763380b45e841ec32": "Suspicious binary pattern",
-        }
+        # Known malicious file signatures (MD5/SHA256), memory-mapped from disk
+        self.signature_store = get_signature_store()
         
         # Comprehensive suspicious file extensions
         self.suspicious_extensions = {
@@ -51,6 +60,7 @@ class EnhancedAntivirusScanner:
             r"autorun\.inf", r"desktop\.ini", r"thumbs\.db",
             r".*\.exe\.exe", r".*\.scr\.exe", r".*\.pdf\.exe"
         ]
+        self.filename_matcher = FilenameMatcher(self.suspicious_patterns)
         
         # Known legitimate system paths to exclude
         self.system_paths = {
@@ -65,8 +75,46 @@ class EnhancedAntivirusScanner:
         self.max_file_size = 500 * 1024 * 1024  # 500MB
         self.min_suspicious_size = 1024  # 1KB
         
+        # Content analysis limits, the leading window is searched in place over mmap
+        self.max_content_scan_size = 10 * 1024 * 1024  # 10MB
+        self.content_scan_window = 1024 * 1024  # 1MB
+        
+        # Suspicious strings to look for, matched together in a single pass
+        self.suspicious_strings = [
+            b"virus", b"trojan", b"malware", b"backdoor", b"keylogger",
+            b"rootkit", b"botnet", b"exploit", b"payload", b"shellcode",
+            b"CreateRemoteThread", b"VirtualAllocEx", b"WriteProcessMemory",
+            b"SetWindowsHookEx", b"GetAsyncKeyState", b"RegSetValueEx"
+        ]
+        self.content_matcher = ContentMatcher(self.suspicious_strings)
+        
+        # Executables whose PE headers are parsed for structural red flags
+        self.pe_extensions = {".exe", ".dll", ".scr", ".sys", ".com", ".ocx", ".cpl", ".drv"}
+        
+        # Archives are opened and their members checked like regular files,
+        # bounded so a crafted archive cannot stall the scan
+        self.archive_inspector = ArchiveInspector(max_depth=3, max_entries=10000,
+                                                  max_total_bytes=512 * 1024 * 1024,
+                                                  content_window=self.content_scan_window)
+        
+        # Hashing backend for directory scans: "thread" or "process"
+        self.hash_backend = "thread"
+        self.hash_batch_size = 64
+        
         # Create quarantine folder
         os.makedirs(self.quarantine_folder, exist_ok=True)
+        self.quarantine_vault = QuarantineVault(self.quarantine_folder)
+        
+        # Cheap stat-only rules decide which files get the content, PE and archive reads
+        self.prefilter = MetadataPrefilter(self)
+        self.prefilter_batch_size = 256
+        
+        # Reuse hashes of unchanged files between scans
+        self.hash_cache = HashCache()
+    
+    def get_signature_version(self):
+        """Version of the loaded signature database"""
+        return self.signature_store.version
     
     def is_system_path(self, file_path):
         """Check if file is in a system directory"""
@@ -79,34 +127,59 @@ class EnhancedAntivirusScanner:
         except:
             return False
     
-    def calculate_file_hash(self, file_path):
+    def get_known_hashes(self, file_path, file_stat):
+        """Hashes that can be settled without reading the file, or None if it must be read"""
+        file_size = file_stat.st_size
+        if file_size == 0:
+            return "empty_file", "empty_file"
+        
+        cached = self.hash_cache.get(file_path, file_stat)
+        if cached and cached[0] and cached[1]:
+            return cached
+        return None
+    
+    def confirm_fingerprint(self, file_path, file_stat, fingerprint, hasher=hash_file):
+        """Tiered hashing for files above max_file_size
+        
+        The fingerprint of a few sampled blocks is looked up first, the full
+        hashes are only computed, by hasher, when it matches a known threat.
+        """
+        if not fingerprint or not self.signature_store.lookup(fingerprint):
+            return None, None
+        
+        try:
+            self.logger.info(f"Large file matches a threat fingerprint, hashing: {file_path}")
+            md5_hex, sha256_hex = hasher(file_path)
+        except OSError as e:
+            self.logger.debug(f"Cannot access file {file_path}: {e}")
+            return None, None
+        
+        self.hash_cache.put(file_path, file_stat, md5_hex, sha256_hex)
+        return md5_hex, sha256_hex
+    
+    def calculate_file_hash(self, file_path, file_stat=None):
         """Calculate MD5 and SHA256 hash of a file"""
         try:
             file_path = os.path.normpath(file_path)
             
-            if not os.path.exists(file_path) or not os.path.isfile(file_path):
-                return None, None
-            
-            # Check file size
-            try:
-                file_size = os.path.getsize(file_path)
-                if file_size > self.max_file_size:
-                    self.logger.info(f"Skipping large file: {file_path} ({file_size} bytes)")
+            if file_stat is None:
+                if not os.path.exists(file_path) or not os.path.isfile(file_path):
+                    return None, None
+                
+                try:
+                    file_stat = os.stat(file_path)
+                except OSError:
                     return None, None
-                if file_size == 0:
-                    return "empty_file", "empty_file"
-            except OSError:
-                return None, None
-            
-            md5_hash = hashlib.md5()
-            sha256_hash = hashlib.sha256()
-            
-            with open(file_path, "rb") as f:
-                while chunk := f.read(65536):  # 64KB chunks
-                    md5_hash.update(chunk)
-                    sha256_hash.update(chunk)
-                    
-            return md5_hash.hexdigest(), sha256_hash.hexdigest()
+            
+            known_hashes = self.get_known_hashes(file_path, file_stat)
+            if known_hashes:
+                return known_hashes
+            if file_stat.st_size > self.max_file_size:
+                return self.confirm_fingerprint(file_path, file_stat, fingerprint_file(file_path))
+            
+            md5_hex, sha256_hex = hash_file(file_path)
+            self.hash_cache.put(file_path, file_stat, md5_hex, sha256_hex)
+            return md5_hex, sha256_hex
             
         except (OSError, IOError, PermissionError) as e:
             self.logger.debug(f"Cannot access file {file_path}: {e}")
@@ -115,15 +188,18 @@ class EnhancedAntivirusScanner:
             self.logger.error(f"Unexpected error hashing {file_path}: {e}")
             return None, None
     
-    def check_file_signature(self, file_path):
+    def check_file_signature(self, file_path, file_stat=None, file_hashes=None):
         """Check if file matches known malicious signatures"""
-        md5_hash, sha256_hash = self.calculate_file_hash(file_path)
+        if file_hashes is None:
+            file_hashes = self.calculate_file_hash(file_path, file_stat)
+        md5_hash, sha256_hash = file_hashes
         
         if md5_hash == "empty_file":
             return True, "Zero-byte file (potential placeholder malware)"
         
-        if md5_hash and md5_hash in self.malicious_signatures:
-            return True, self.malicious_signatures[md5_hash]
+        threat_name = self.signature_store.lookup(md5_hash) or self.signature_store.lookup(sha256_hash)
+        if threat_name:
+            return True, threat_name
             
         return False, None
     
@@ -132,10 +208,10 @@ class EnhancedAntivirusScanner:
         try:
             filename = os.path.basename(file_path).lower()
             
-            # Check suspicious patterns
-            for pattern in self.suspicious_patterns:
-                if re.match(pattern, filename, re.IGNORECASE):
-                    return True, f"Suspicious filename pattern: {pattern}"
+            # Check suspicious patterns, all rules in one regex evaluation
+            pattern = self.filename_matcher.match(filename)
+            if pattern:
+                return True, f"Suspicious filename pattern: {pattern}"
             
             # Check double extensions
             if filename.count('.') > 1:
@@ -148,10 +224,10 @@ class EnhancedAntivirusScanner:
         except Exception:
             return False, None
     
-    def check_file_behavior(self, file_path):
+    def check_file_behavior(self, file_path, file_stat=None):
         """Check for suspicious file behavior patterns"""
         try:
-            stat_info = os.stat(file_path)
+            stat_info = file_stat if file_stat is not None else os.stat(file_path)
             
             # Check file size
             file_size = stat_info.st_size
@@ -179,90 +255,213 @@ class EnhancedAntivirusScanner:
         except Exception:
             return False, None
     
-    def check_file_content(self, file_path):
-        """Basic content analysis for suspicious strings"""
+    def check_pe_structure(self, file_path):
+        """Score the PE headers of an executable, returns (threat_level, reasons)"""
         try:
-            # Skip binary files larger than 10MB for content analysis
-            file_size = os.path.getsize(file_path)
-            if file_size > 10 * 1024 * 1024:
-                return False, None
-            
-            # Suspicious strings to look for
-            suspicious_strings = [
-                b"virus", b"trojan", b"malware", b"backdoor", b"keylogger",
-                b"rootkit", b"botnet", b"exploit", b"payload", b"shellcode",
-                b"CreateRemoteThread", b"VirtualAllocEx", b"WriteProcessMemory",
-                b"SetWindowsHookEx", b"GetAsyncKeyState", b"RegSetValueEx"
-            ]
-            
-            with open(file_path, "rb") as f:
-                # Read first 1MB for analysis
-                content = f.read(1024 * 1024)
-                
-                for suspicious in suspicious_strings:
-                    if suspicious in content:
-                        return True, f"Contains suspicious string: {suspicious.decode('utf-8', errors='ignore')}"
-            
-            return False, None
-            
-        except Exception:
-            return False, None
+            return score_pe(analyze_pe_file(file_path))
+        except (OSError, ValueError) as e:
+            self.logger.debug(f"Cannot read PE headers of {file_path}: {e}")
+            return 0, []
+    
+    def score_archive_member(self, member_name, md5_hash, sha256_hash, suspicious):
+        """Threat level and reasons of one archive member, weighted as in scan_file"""
+        threat_level = 0
+        threat_reasons = []
+        
+        threat_name = self.signature_store.lookup(md5_hash) or self.signature_store.lookup(sha256_hash)
+        if threat_name:
+            threat_level += 10
+            threat_reasons.append(threat_name)
+        
+        is_suspicious, reason = self.check_suspicious_patterns(member_name)
+        if is_suspicious:
+            threat_level += 5
+            threat_reasons.append(reason)
+        
+        if suspicious:
+            threat_level += 2
+            threat_reasons.append(f"Contains suspicious string: {suspicious.decode('utf-8', errors='ignore')}")
+        
+        ext = os.path.splitext(member_name)[1].lower()
+        if ext in self.suspicious_extensions:
+            threat_level += 1
+            threat_reasons.append(f"Potentially dangerous file extension: {ext}")
+        
+        return threat_level, threat_reasons
+    
+    def check_archive(self, file_path, file_stat, report=None):
+        """Score the members of an archive, returns (threat_level, reasons)
+        
+        The archive scores as its most dangerous member. report is the
+        inspection already done by a worker process, without it the archive
+        is inspected here.
+        """
+        if report is None:
+            report = self.archive_inspector.inspect(file_path, self.content_matcher)
+        threat_level = 0
+        threat_reasons = []
+        
+        findings = []
+        for member_path, member_name, md5_hash, sha256_hash, suspicious in report['members']:
+            member_level, member_reasons = self.score_archive_member(member_name, md5_hash,
+                                                                     sha256_hash, suspicious)
+            if member_level:
+                findings.append((member_path, member_level, member_reasons))
+        findings.sort(key=lambda finding: finding[1], reverse=True)
+        if findings:
+            threat_level = findings[0][1]
+            for member_path, _, reasons in findings[:5]:
+                threat_reasons.append(f"Archive member {member_path}: {'; '.join(reasons)}")
+            if len(findings) > 5:
+                threat_reasons.append(f"... and {len(findings) - 5} more suspicious archive members")
+        
+        if report['limit_exceeded']:
+            self.logger.info(f"Archive inspection stopped early ({report['limit_exceeded']}): {file_path}")
+            # Expanding far beyond its own size is the signature of an archive bomb
+            if report['bytes'] > max(file_stat.st_size, 1) * self.archive_inspector.max_ratio:
+                threat_level += 5
+                threat_reasons.append("Archive expands beyond inspection limits (possible archive bomb)")
+        
+        return threat_level, threat_reasons
+    
+    def plan_inspection(self, file_path, file_stat, scan_content=True, scan_hashes=True):
+        """Decide what the single read pass has to produce for a file
+        
+        Returns (known_hashes, hash_mode, content_window), see inspect_file
+        for the hash modes. Files above max_file_size are only fingerprinted,
+        the content window is only read with scan_content and the hashes only
+        with scan_hashes.
+        """
+        # System files are never scanned, nothing is read for them
+        if self.is_system_path(file_path):
+            return (None, None), None, 0
+        
+        if not scan_hashes:
+            # No signature was taken from a file of this size
+            known_hashes = (None, None)
+        else:
+            known_hashes = self.get_known_hashes(file_path, file_stat)
+        file_size = file_stat.st_size
+        if known_hashes:
+            hash_mode = None
+        elif file_size > self.max_file_size:
+            hash_mode = "sample"
+        else:
+            hash_mode = "full"
+        
+        if scan_content and 0 < file_size <= self.max_content_scan_size:
+            content_window = min(file_size, self.content_scan_window)
+        else:
+            content_window = 0
+        return known_hashes, hash_mode, content_window
+    
+    def finish_inspection(self, file_path, file_stat, known_hashes, read_result, hasher=hash_file):
+        """Turn the read pass output into (file_hashes, content_result, archive_report)
+        
+        A fingerprint matching a known threat is confirmed with the full
+        hashes, computed by hasher wherever the read pass ran.
+        """
+        read_result = read_result or {}
+        suspicious = read_result.get('suspicious')
+        
+        if known_hashes:
+            file_hashes = known_hashes
+        elif read_result.get('fingerprint'):
+            file_hashes = self.confirm_fingerprint(file_path, file_stat, read_result['fingerprint'], hasher)
+        else:
+            file_hashes = (read_result.get('md5'), read_result.get('sha256'))
+            if file_hashes[0]:
+                self.hash_cache.put(file_path, file_stat, *file_hashes)
+        
+        if suspicious:
+            content_result = (True, f"Contains suspicious string: {suspicious.decode('utf-8', errors='ignore')}")
+        else:
+            content_result = (False, None)
+        return file_hashes, content_result, read_result.get('archive')
+    
+    def run_inspection(self, file_path, file_stat, scan_content=True, scan_hashes=True):
+        """Hash and content-check a file from one open and one read pass"""
+        known_hashes, hash_mode, content_window = self.plan_inspection(file_path, file_stat, scan_content,
+                                                                       scan_hashes)
+        read_result = None
+        
+        if hash_mode or content_window:
+            try:
+                read_result = inspect_file(file_path, hash_mode, self.content_matcher, content_window)
+            except (OSError, ValueError) as e:
+                self.logger.debug(f"Cannot access file {file_path}: {e}")
+        
+        return self.finish_inspection(file_path, file_stat, known_hashes, read_result)
     
     def get_file_extensions(self, directory):
         """Get all file extensions in directory for statistics"""
         extensions = set()
         try:
-            for root, dirs, files in os.walk(directory):
-                for file in files:
-                    ext = os.path.splitext(file)[1].lower()
-                    if ext:
-                        extensions.add(ext)
+            for file_path, _ in parallel_iter_files(directory):
+                ext = os.path.splitext(file_path)[1].lower()
+                if ext:
+                    extensions.add(ext)
         except Exception:
             pass
         return extensions
     
-    def scan_file(self, file_path, callback=None):
-        """Comprehensive scan of a single file"""
+    def scan_file(self, file_path, callback=None, file_stat=None, inspection=None, plan=None):
+        """Comprehensive scan of a single file
+        
+        The metadata rules run first. Files a signature may match by size, or
+        that already look suspicious, are hashed and looked up in the
+        signature store; the content, PE and archive stages only run for the
+        files the prefilter marks as worth reading.
+        """
         try:
             if callback:
                 callback(f"Scanning: {os.path.basename(file_path)}")
             
+            # A single stat and a single read pass feed every check below
+            if file_stat is None:
+                try:
+                    file_stat = os.stat(file_path)
+                except OSError:
+                    return None
+            if plan is None:
+                plan = self.prefilter.evaluate([(file_path, file_stat)])[0]
+            
             # Skip system files unless specifically requested
-            if self.is_system_path(file_path):
+            if plan.skip:
                 return None
             
-            threat_level = 0
-            threat_reasons = []
+            # Name, behavior and extension rules were settled from metadata
+            threat_level = plan.threat_level
+            threat_reasons = list(plan.reasons)
+            
+            if inspection is None:
+                inspection = self.run_inspection(file_path, file_stat, plan.needs_content, plan.needs_hash)
+            file_hashes, content_result, archive_report = inspection
             
             # Check file signature
-            is_malicious, reason = self.check_file_signature(file_path)
+            is_malicious, reason = self.check_file_signature(file_path, file_stat, file_hashes)
             if is_malicious:
                 threat_level += 10
-                threat_reasons.append(reason)
-            
-            # Check suspicious patterns
-            is_suspicious, reason = self.check_suspicious_patterns(file_path)
-            if is_suspicious:
-                threat_level += 5
-                threat_reasons.append(reason)
-            
-            # Check file behavior
-            is_suspicious, reason = self.check_file_behavior(file_path)
-            if is_suspicious:
-                threat_level += 3
-                threat_reasons.append(reason)
+                threat_reasons.insert(0, reason)
             
             # Check file content
-            is_suspicious, reason = self.check_file_content(file_path)
+            is_suspicious, reason = content_result
             if is_suspicious:
                 threat_level += 2
                 threat_reasons.append(reason)
             
-            # Check file extension
-            ext = os.path.splitext(file_path)[1].lower()
-            if ext in self.suspicious_extensions:
-                threat_level += 1
-                threat_reasons.append(f"Potentially dangerous file extension: {ext}")
+            # Header structure of executables, capped so it cannot outweigh a signature hit
+            if plan.needs_pe:
+                pe_level, pe_reasons = self.check_pe_structure(file_path)
+                threat_level += min(pe_level, 8)
+                threat_reasons.extend(pe_reasons)
+            
+            # Look inside archives instead of judging them by extension alone
+            if plan.needs_archive:
+                # In process mode the members were already read in the pool
+                archive_level, archive_reasons = self.check_archive(file_path, file_stat, archive_report)
+                threat_level += archive_level
+                threat_reasons.extend(archive_reasons)
             
             # Determine threat classification
             if threat_level >= 10:
@@ -279,7 +478,7 @@ class EnhancedAntivirusScanner:
                 'threat_level': threat_level,
                 'threat_type': threat_type,
                 'reasons': threat_reasons,
-                'file_size': os.path.getsize(file_path),
+                'file_size': file_stat.st_size,
                 'timestamp': time.time()
             }
             
@@ -287,77 +486,221 @@ class EnhancedAntivirusScanner:
             self.logger.error(f"Error scanning file {file_path}: {e}")
             return None
     
-    def scan_directory(self, directory, callback=None, max_workers=4):
-        """Scan a directory with multithreading"""
+    def inspect_batch_in_process(self, batch, pool):
+        """Inspect a batch of FilePlans in a worker process, reusing cached digests
+        
+        Every file read, fingerprints and archive members included, happens
+        in the pool; this thread only consults the hash cache and the
+        signature store.
+        """
+        reads = [self.plan_inspection(plan.file_path, plan.file_stat, plan.needs_content, plan.needs_hash)
+                 for plan in batch]
+        read_results = [None] * len(batch)
+        jobs = [i for i, (_, hash_mode, content_window) in enumerate(reads)
+                if hash_mode or content_window or batch[i].needs_archive]
+        
+        if jobs:
+            job_args = [(batch[i].file_path, reads[i][1], reads[i][2], batch[i].needs_archive) for i in jobs]
+            for i, read_result in zip(jobs, pool.submit(inspect_file_batch, job_args).result()):
+                read_results[i] = read_result
+        
+        def hash_in_pool(file_path):
+            return pool.submit(hash_file, file_path).result()
+        
+        return [
+            self.finish_inspection(plan.file_path, plan.file_stat, read[0], read_result, hash_in_pool)
+            for plan, read, read_result in zip(batch, reads, read_results)
+        ]
+    
+    def severity_of(self, threat_level):
+        """Report severity matching the High/Medium/Low Risk classification"""
+        if threat_level >= 10:
+            return "High"
+        if threat_level >= 5:
+            return "Medium"
+        return "Low"
+    
+    def should_skip_directory(self, dir_name):
+        """Directories that are never descended into during a scan"""
+        return (dir_name.startswith('.') or
+                dir_name.lower() in ['system32', 'windows', 'temp', '$recycle.bin'])
+    
+    def scan_directory(self, directory, callback=None, max_workers=None, queue_size=1024, backend=None):
+        """Scan a directory with a walker thread feeding a bounded queue of hashing workers"""
         self.logger.info(f"Starting enhanced directory scan: {directory}")
         threats_found = []
         files_scanned = 0
+        backend = backend or self.hash_backend
+        pool = None
+        
+        if max_workers is None:
+            if backend == "process":
+                max_workers = os.cpu_count() or 1
+            else:
+                max_workers = min(32, (os.cpu_count() or 1) * 2)
         
         try:
-            # Get all files to scan
-            all_files = []
-            for root, dirs, files in os.walk(directory):
-                # Skip certain directories
-                dirs[:] = [d for d in dirs if not d.startswith('.') and 
-                          d.lower() not in ['system32', 'windows', 'temp', '$recycle.bin']]
-                
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    all_files.append(file_path)
-            
-            if callback:
-                callback(f"Found {len(all_files)} files to scan")
-            
-            # Scan files with thread pool
-            with ThreadPoolExecutor(max_workers=max_workers) as executor:
-                future_to_file = {
-                    executor.submit(self.scan_file, file_path, callback): file_path 
-                    for file_path in all_files[:1000]  # Limit to first 1000 files for performance
-                }
-                
-                for future in as_completed(future_to_file):
-                    files_scanned += 1
-                    
-                    if callback and files_scanned % 10 == 0:
-                        callback(f"Scanned {files_scanned}/{len(all_files)} files")
+            if backend == "process":
+                # Hashing is CPU bound on fast disks, spread it over all cores
+                pool = ProcessPoolExecutor(max_workers=max_workers,
+                                           initializer=init_inspection_worker,
+                                           initargs=(self.suspicious_strings, self.archive_inspector))
+            
+            file_queue = queue.Queue(maxsize=queue_size)
+            result_queue = queue.Queue()
+            progress = WalkProgress()
+            worker_done = object()
+            
+            def dispatch(entries):
+                # Metadata rules run over the whole batch; a file no signature
+                # can match and no other rule flags is clean without a read
+                for plan in self.prefilter.evaluate(entries):
+                    if plan.skip or not plan.needs_hash:
+                        result_queue.put(None)
+                    else:
+                        file_queue.put(plan)
+            
+            def producer():
+                try:
+                    entries = []
+                    for entry in parallel_iter_files(directory, progress,
+                                                     skip_dir=self.should_skip_directory):
+                        entries.append(entry)
+                        if len(entries) >= self.prefilter_batch_size:
+                            dispatch(entries)
+                            entries = []
+                    dispatch(entries)
+                except Exception as e:
+                    self.logger.error(f"Error walking {directory}: {e}")
+                finally:
+                    for _ in range(max_workers):
+                        file_queue.put(None)
+            
+            def worker():
+                while True:
+                    item = file_queue.get()
+                    if item is None:
+                        result_queue.put(worker_done)
+                        return
                     
                     try:
-                        result = future.result()
-                        if result:
-                            threats_found.append(result)
-                            if callback:
-                                callback(f"THREAT FOUND: {os.path.basename(result['file_path'])}")
+                        result_queue.put(self.scan_file(item.file_path, None, item.file_stat, plan=item))
                     except Exception as e:
                         self.logger.error(f"Error processing scan result: {e}")
-            
+                        result_queue.put(None)
+            
+            def batch_worker():
+                # Each thread keeps one batch in flight in the process pool
+                batch = []
+                while True:
+                    item = file_queue.get()
+                    if item is not None:
+                        batch.append(item)
+                        if len(batch) < self.hash_batch_size:
+                            continue
+                    
+                    if batch:
+                        try:
+                            inspections = self.inspect_batch_in_process(batch, pool)
+                        except Exception as e:
+                            self.logger.error(f"Error inspecting batch: {e}")
+                            inspections = [None] * len(batch)
+                        
+                        for plan, inspection in zip(batch, inspections):
+                            try:
+                                result_queue.put(self.scan_file(plan.file_path, None, plan.file_stat,
+                                                                inspection, plan))
+                            except Exception as e:
+                                self.logger.error(f"Error processing scan result: {e}")
+                                result_queue.put(None)
+                        batch = []
+                    
+                    if item is None:
+                        result_queue.put(worker_done)
+                        return
+            
+            worker_target = batch_worker if pool else worker
+            threads = [threading.Thread(target=producer, daemon=True)]
+            threads += [threading.Thread(target=worker_target, daemon=True) for _ in range(max_workers)]
+            for thread in threads:
+                thread.start()
+            
+            # Per-file progress is coalesced, threat reports always go through
+            report_progress = ThrottledCallback(callback) if callback else None
+            
+            # Results stream back while the walker is still producing
+            active_workers = max_workers
+            while active_workers:
+                result = result_queue.get()
+                if result is worker_done:
+                    active_workers -= 1
+                    continue
+                
+                files_scanned += 1
+                if report_progress:
+                    report_progress(f"Scanned {files_scanned} files ({progress.percent():.0f}%)")
+                
+                if result:
+                    threats_found.append(result)
+                    self.scan_results.add(result['file_path'], result['threat_type'],
+                                          self.severity_of(result['threat_level']), result['reasons'])
+                    if callback:
+                        callback(f"THREAT FOUND: {os.path.basename(result['file_path'])}")
+            
+            if report_progress:
+                report_progress.flush()
+            self.hash_cache.flush()
             self.logger.info(f"Enhanced scan completed. Scanned {files_scanned} files, found {len(threats_found)} threats")
             return threats_found
             
         except Exception as e:
             self.logger.error(f"Error during directory scan: {e}")
             return []
+        finally:
+            if pool:
+                pool.shutdown()
     
-    def quarantine_file(self, file_path):
-        """Move suspicious file to quarantine"""
+    def quarantine_file(self, file_path, reason=None):
+        """Move suspicious file into the quarantine vault, returns (success, entry id)"""
         try:
             if not os.path.exists(file_path):
                 return False, "File not found"
             
-            filename = os.path.basename(file_path)
-            timestamp = int(time.time())
-            quarantine_path = os.path.join(self.quarantine_folder, f"{timestamp}_{filename}")
-            
-            # Ensure unique filename
-            counter = 1
-            while os.path.exists(quarantine_path):
-                name, ext = os.path.splitext(f"{timestamp}_{filename}")
-                quarantine_path = os.path.join(self.quarantine_folder, f"{name}_{counter}{ext}")
-                counter += 1
-            
-            shutil.move(file_path, quarantine_path)
-            self.logger.info(f"File quarantined: {file_path} -> {quarantine_path}")
-            return True, quarantine_path
+            # A cached SHA-256 lets an already stored payload skip the copy
+            cached = self.hash_cache.get(file_path, os.stat(file_path))
+            entry_id = self.quarantine_vault.quarantine(file_path, reason, cached[1] if cached else None)
+            return True, entry_id
             
         except Exception as e:
             self.logger.error(f"Error quarantining file {file_path}: {e}")
             return False, str(e)
+    
+    def restore_from_quarantine(self, quarantine_id, original_path=None):
+        """Restore a vault entry, to its original location unless original_path is given"""
+        try:
+            restored_path = self.quarantine_vault.restore(int(quarantine_id), original_path)
+            return True, restored_path
+        except Exception as e:
+            self.logger.error(f"Error restoring quarantine entry {quarantine_id}: {e}")
+            return False, str(e)
+    
+    def get_scan_report(self):
+        """Generate a detailed scan report"""
+        return {
+            'scan_date': time.strftime("%Y-%m-%d %H:%M:%S"),
+            'total_threats': len(self.scan_results),
+            'high_severity': self.scan_results.count('High'),
+            'medium_severity': self.scan_results.count('Medium'),
+            'low_severity': self.scan_results.count('Low'),
+            'threats': self.scan_results
+        }
+    
+    def save_report(self, report, file_path):
+        """Save scan report to file, threats are written one at a time"""
+        try:
+            with open(file_path, 'w', encoding='utf-8') as f:
+                write_report(report, f)
+            return True
+        except Exception as e:
+            self.logger.error(f"Error saving report: {e}")
+            return False
@@ -10,7 +10,11 @@ import shutil
 import ctypes
 import tempfile
 import time
+import re
 from utils.logger import get_logger
+from core.deletion_engine import DeletionEngine, EvictionPolicy
+from core.cleanup_planner import CleanupPlanner
+from core.action_journal import get_action_journal
 
 class EnhancedWindowsOptimizer:
     def __init__(self):
@@ -18,6 +22,9 @@ class EnhancedWindowsOptimizer:
         self.is_admin = self.check_admin_privileges()
         self.optimized_processes = []
         self.cleared_caches = []
+        self.journal = get_action_journal()
+        self.deletion_engine = DeletionEngine(journal=self.journal)
+        self.cleanup_planner = CleanupPlanner()
         
     def check_admin_privileges(self):
         """Check if running with admin privileges"""
@@ -44,39 +51,53 @@ class EnhancedWindowsOptimizer:
             self.logger.error(f"Process optimization failed: {e}")
             return False, f"Process optimization failed: {e}"
     
+    def get_user_temp_paths(self):
+        """Folders emptied by clear_user_temp_files"""
+        return [
+            tempfile.gettempdir(),
+            os.path.expanduser("~\\AppData\\Local\\Temp"),
+            os.path.expanduser("~\\AppData\\Roaming\\Microsoft\\Teams\\tmp")
+        ]
+    
+    def get_cache_policies(self):
+        """Application caches trimmed by clear_user_temp_files and how far
+        
+        Wiping a cache makes the application rebuild its hot entries, so caches
+        are only cut back to a budget, least recently used files first.
+        """
+        mb = 1024 * 1024
+        return {
+            os.path.expanduser("~\\AppData\\Local\\Microsoft\\Windows\\INetCache"):
+                EvictionPolicy(max_bytes=128 * mb, min_age_days=2),
+            os.path.expanduser("~\\AppData\\Local\\Discord\\Cache"):
+                EvictionPolicy(max_bytes=128 * mb, min_age_days=2),
+            os.path.expanduser("~\\AppData\\Local\\Google\\Chrome\\User Data\\Default\\Cache"):
+                EvictionPolicy(max_bytes=256 * mb, min_age_days=2),
+            os.path.expanduser("~\\AppData\\Local\\Microsoft\\Edge\\User Data\\Default\\Cache"):
+                EvictionPolicy(max_bytes=256 * mb, min_age_days=2)
+        }
+    
+    def plan_user_temp_cleanup(self, refresh=True):
+        """Dry run of clear_user_temp_files: projected files and bytes per folder, nothing deleted"""
+        try:
+            policies = self.get_cache_policies()
+            plan = self.cleanup_planner.plan(
+                self.get_user_temp_paths() + list(policies), refresh=refresh,
+                policies=policies
+            )
+            planned_mb = plan['total_bytes'] / (1024 * 1024)
+            return True, plan, f"{planned_mb:.2f} MB can be freed ({plan['total_files']} files)"
+        except Exception as e:
+            self.logger.error(f"Temp cleanup planning failed: {e}")
+            return False, None, f"Temp cleanup planning failed: {e}"
+    
     def clear_user_temp_files(self):
-        """Clear user temporary files (no admin required)"""
+        """Clear user temporary files and trim application caches (no admin required)"""
         try:
-            cleaned_size = 0
-            temp_paths = [
-                tempfile.gettempdir(),
-                os.path.expanduser("~\\AppData\\Local\\Temp"),
-                os.path.expanduser("~\\AppData\\Local\\Microsoft\\Windows\\INetCache"),
-                os.path.expanduser("~\\AppData\\Roaming\\Microsoft\\Teams\\tmp"),
-                os.path.expanduser("~\\AppData\\Local\\Discord\\Cache"),
-                os.path.expanduser("~\\AppData\\Local\\Google\\Chrome\\User Data\\Default\\Cache"),
-                os.path.expanduser("~\\AppData\\Local\\Microsoft\\Edge\\User Data\\Default\\Cache")
-            ]
-            
-            cleaned_files = 0
-            for temp_path in temp_paths:
-                if os.path.exists(temp_path):
-                    try:
-                        for root, dirs, files in os.walk(temp_path):
-                            for file in files:
-                                try:
-                                    file_path = os.path.join(root, file)
-                                    if os.path.isfile(file_path):
-                                        file_size = os.path.getsize(file_path)
-                                        os.remove(file_path)
-                                        cleaned_size += file_size
-                                        cleaned_files += 1
-                                except (PermissionError, FileNotFoundError):
-                                    continue
-                                except Exception:
-                                    continue
-                    except Exception:
-                        continue
+            result = self.deletion_engine.clean(self.get_user_temp_paths())
+            result.add(self.deletion_engine.evict(self.get_cache_policies()))
+            cleaned_size = result.bytes_freed
+            cleaned_files = result.files_deleted
             
             cleaned_mb = cleaned_size / (1024 * 1024)
             self.logger.info(f"User temp files cleaned: {cleaned_mb:.2f} MB, {cleaned_files} files")
@@ -100,8 +121,8 @@ class EnhancedWindowsOptimizer:
                 i = 0
                 while True:
                     try:
-                        name, value, _ = winreg.EnumValue(key, i)
-                        startup_items.append((name, value))
+                        name, value, value_type = winreg.EnumValue(key, i)
+                        startup_items.append((name, value, value_type))
                         i += 1
                     except OSError:
                         break
@@ -113,20 +134,25 @@ class EnhancedWindowsOptimizer:
                     'quicktime', 'realplayer', 'winrar', 'torrent'
                 ]
                 
-                for name, value in startup_items:
+                for name, value, value_type in startup_items:
                     for keyword in non_essential_keywords:
                         if keyword.lower() in name.lower() or keyword.lower() in value.lower():
-                            non_essential.append(name)
+                            non_essential.append((name, value, value_type))
                             break
                 
                 # Remove non-essential items
                 removed_count = 0
-                for item_name in non_essential:
+                for item_name, item_value, item_type in non_essential:
+                    # Journaled first so WindowsOptimizer.undo_all_changes can put it back
+                    seq = self.journal.record('startup_removed', durable=True, hive=winreg.HKEY_CURRENT_USER,
+                                              key_path=startup_key, value_name=item_name,
+                                              value_data=item_value, value_type=item_type)
                     try:
                         winreg.DeleteValue(key, item_name)
                         removed_count += 1
                         self.logger.info(f"Removed startup item: {item_name}")
                     except Exception:
+                        self.journal.mark_undone(seq)
                         continue
                 
                 winreg.CloseKey(key)
@@ -188,28 +214,18 @@ class EnhancedWindowsOptimizer:
     def optimize_network_settings(self):
         """Optimize network settings (user-level)"""
         try:
-            # Clear network cache files
-            network_cache_paths = [
-                os.path.expanduser("~\\AppData\\Local\\Microsoft\\Windows\\INetCache"),
-                os.path.expanduser("~\\AppData\\Local\\Microsoft\\Windows\\WebCache"),
-                os.path.expanduser("~\\AppData\\Roaming\\Microsoft\\Windows\\Cookies")
-            ]
+            # Trim network caches to their budget, cookies are cleared completely.
+            # WebCache is left alone, it is an ESE database (WebCacheV01.dat and
+            # its logs) that deleting single files of would corrupt
+            mb = 1024 * 1024
+            network_cache_policies = {
+                os.path.expanduser("~\\AppData\\Local\\Microsoft\\Windows\\INetCache"):
+                    EvictionPolicy(max_bytes=128 * mb, min_age_days=2)
+            }
+            cookie_paths = [os.path.expanduser("~\\AppData\\Roaming\\Microsoft\\Windows\\Cookies")]
             
-            cleared_size = 0
-            for cache_path in network_cache_paths:
-                if os.path.exists(cache_path):
-                    try:
-                        for root, dirs, files in os.walk(cache_path):
-                            for file in files:
-                                try:
-                                    file_path = os.path.join(root, file)
-                                    file_size = os.path.getsize(file_path)
-                                    os.remove(file_path)
-                                    cleared_size += file_size
-                                except:
-                                    continue
-                    except:
-                        continue
+            cleared_size = self.deletion_engine.evict(network_cache_policies).bytes_freed
+            cleared_size += self.deletion_engine.clean(cookie_paths).bytes_freed
             
             cleared_mb = cleared_size / (1024 * 1024)
             self.logger.info(f"Network cache cleared: {cleared_mb:.2f} MB")
@@ -243,9 +259,20 @@ class EnhancedWindowsOptimizer:
             self.logger.error(f"Memory optimization failed: {e}")
             return False, f"Memory optimization failed: {e}"
     
+    def get_active_power_scheme(self):
+        """GUID of the active power plan, None if it cannot be read"""
+        try:
+            result = subprocess.run("powercfg /getactivescheme", shell=True, capture_output=True, text=True)
+            match = re.search(r"[0-9a-fA-F]{8}-[0-9a-fA-F-]{27}", result.stdout)
+            return match.group(0) if match else None
+        except Exception:
+            return None
+    
     def set_power_plan_balanced(self):
         """Set power plan to balanced (safer for non-admin)"""
         try:
+            seq = self.journal.record('power_plan_set', durable=True, previous=self.get_active_power_scheme())
+            
             # Balanced power plan GUID
             result = subprocess.run(
                 "powercfg /setactive 381b4222-f694-41f0-9685-ff5bb260df2e", 
@@ -256,6 +283,7 @@ class EnhancedWindowsOptimizer:
                 self.logger.info("Power plan set to balanced")
                 return True, "Power plan set to balanced"
             else:
+                self.journal.mark_undone(seq)
                 return False, "Power plan change requires admin privileges"
                 
         except Exception as e:
@@ -0,0 +1,47 @@
+"""
+Compiled Filename Rule Matcher
+Merges all filename rules into one regex so screening a name costs a single evaluation
+"""
+
+import re
+
+
+def _as_search_pattern(pattern):
+    """Rewrite a re.match style rule as an equivalent re.search pattern
+
+    Rules such as ".*virus.*" only need the inner fragment to appear anywhere,
+    dropping the leading ".*" avoids backtracking over the whole name once per rule.
+    """
+    if pattern.startswith(".*"):
+        inner = pattern[2:]
+        if inner.endswith(".*") and not inner.endswith("\\.*"):
+            inner = inner[:-2]
+        return inner or ".*"
+    return "^(?:" + pattern + ")"
+
+
+class FilenameMatcher:
+    """One precompiled alternation with a named group per rule"""
+
+    def __init__(self, rules, literal=False, flags=re.IGNORECASE):
+        self.rules = list(rules)
+        self.group_rules = {}
+        alternatives = []
+
+        for index, rule in enumerate(self.rules):
+            group = f"rule{index}"
+            self.group_rules[group] = rule
+            pattern = re.escape(rule) if literal else _as_search_pattern(rule)
+            alternatives.append(f"(?P<{group}>{pattern})")
+
+        self.regex = re.compile("|".join(alternatives), flags) if alternatives else None
+
+    def match(self, filename):
+        """Return the rule that matched filename, or None"""
+        if self.regex is None:
+            return None
+
+        match = self.regex.search(filename)
+        if match is None:
+            return None
+        return self.group_rules[match.lastgroup]
@@ -0,0 +1,178 @@
+"""
+Persistent File Hash Cache
+Reuses MD5/SHA256 digests of files that have not changed since the last scan
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from utils.logger import get_logger
+from utils.resource_manager import get_config_path
+
+
+class HashCache:
+    """SQLite backed hash cache keyed by path, size, mtime and inode
+
+    Digests only depend on file content, so entries stay valid across signature
+    updates; verdicts, which do depend on the signatures, live in the scan manifest.
+    """
+
+    def __init__(self, db_path=None, max_entries=500000, commit_interval=512):
+        self.logger = get_logger("HashCache")
+        db_path = db_path or get_config_path("hash_cache.db")
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.commit_interval = commit_interval
+        self.lock = threading.Lock()
+        self.pending_writes = 0
+        # Cache hits only note the time here, it is written with the next commit
+        self.touched = {}
+        self.row_count = 0
+        self.conn = None
+
+        try:
+            db_dir = os.path.dirname(db_path)
+            if db_dir:
+                os.makedirs(db_dir, exist_ok=True)
+
+            self.conn = sqlite3.connect(db_path, check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS hashes ("
+                "path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, inode INTEGER, "
+                "md5 TEXT, sha256 TEXT, last_used REAL)"
+            )
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_hashes_last_used ON hashes(last_used)")
+            self.conn.commit()
+            # Counted once, then kept up to date by put and eviction
+            self.row_count = self.conn.execute("SELECT COUNT(*) FROM hashes").fetchone()[0]
+        except Exception as e:
+            self.logger.error(f"Hash cache disabled, cannot open {db_path}: {e}")
+            self.conn = None
+
+    def get(self, file_path, file_stat):
+        """Return cached (md5, sha256) if the file is unchanged, otherwise None"""
+        if self.conn is None:
+            return None
+
+        try:
+            with self.lock:
+                row = self.conn.execute(
+                    "SELECT size, mtime_ns, inode, md5, sha256 FROM hashes WHERE path = ?",
+                    (file_path,)
+                ).fetchone()
+                if row is None:
+                    return None
+
+                size, mtime_ns, inode, md5, sha256 = row
+                if size != file_stat.st_size or mtime_ns != file_stat.st_mtime_ns:
+                    return None
+                # DirEntry stats on Windows report inode 0, only compare real inodes
+                if inode and file_stat.st_ino and inode != file_stat.st_ino:
+                    return None
+
+                self.touched[file_path] = time.time()
+                self._note_write()
+                return md5, sha256
+        except Exception as e:
+            self.logger.debug(f"Hash cache lookup failed for {file_path}: {e}")
+            return None
+
+    def put(self, file_path, file_stat, md5, sha256=None):
+        """Store the digests computed for a file
+
+        A digest passed as None keeps the one already stored for the same
+        unchanged file, so a scanner that only computes MD5 does not drop
+        the SHA256 another scanner cached.
+        """
+        if self.conn is None:
+            return
+
+        try:
+            with self.lock:
+                entry = {'path': file_path, 'size': file_stat.st_size, 'mtime_ns': file_stat.st_mtime_ns,
+                         'inode': file_stat.st_ino, 'md5': md5, 'sha256': sha256, 'now': time.time()}
+                # Column references on the right-hand side are the stored values
+                updated = self.conn.execute(
+                    "UPDATE hashes SET "
+                    "md5 = CASE WHEN :md5 IS NULL AND size = :size AND mtime_ns = :mtime_ns "
+                    "AND (inode = :inode OR inode = 0 OR :inode = 0) THEN md5 ELSE :md5 END, "
+                    "sha256 = CASE WHEN :sha256 IS NULL AND size = :size AND mtime_ns = :mtime_ns "
+                    "AND (inode = :inode OR inode = 0 OR :inode = 0) THEN sha256 ELSE :sha256 END, "
+                    "size = :size, mtime_ns = :mtime_ns, inode = :inode, last_used = :now "
+                    "WHERE path = :path",
+                    entry
+                ).rowcount
+                if not updated:
+                    self.conn.execute(
+                        "INSERT INTO hashes (path, size, mtime_ns, inode, md5, sha256, last_used) "
+                        "VALUES (:path, :size, :mtime_ns, :inode, :md5, :sha256, :now)",
+                        entry
+                    )
+                    self.row_count += 1
+                self.touched.pop(file_path, None)
+                self._note_write()
+        except Exception as e:
+            self.logger.debug(f"Hash cache store failed for {file_path}: {e}")
+
+    def _note_write(self):
+        """Commit in batches so per-file writes stay cheap (lock must be held)"""
+        self.pending_writes += 1
+        if self.pending_writes >= self.commit_interval:
+            self._commit_and_evict()
+
+    def _commit_and_evict(self):
+        """Commit pending writes and trim the least recently used entries (lock must be held)"""
+        self.pending_writes = 0
+        if self.touched:
+            self.conn.executemany("UPDATE hashes SET last_used = ? WHERE path = ?",
+                                  [(used, path) for path, used in self.touched.items()])
+            self.touched = {}
+        if self.row_count > self.max_entries:
+            self.row_count -= self.conn.execute(
+                "DELETE FROM hashes WHERE path IN "
+                "(SELECT path FROM hashes ORDER BY last_used LIMIT ?)",
+                (self.row_count - self.max_entries,)
+            ).rowcount
+        self.conn.commit()
+
+    def flush(self):
+        """Write pending entries to disk"""
+        if self.conn is None:
+            return
+
+        try:
+            with self.lock:
+                self._commit_and_evict()
+        except Exception as e:
+            self.logger.error(f"Hash cache flush failed: {e}")
+
+    def invalidate(self):
+        """Drop every cached entry"""
+        if self.conn is None:
+            return
+
+        try:
+            with self.lock:
+                self.conn.execute("DELETE FROM hashes")
+                self.conn.commit()
+                self.pending_writes = 0
+                self.touched = {}
+                self.row_count = 0
+            self.logger.info("Hash cache invalidated")
+        except Exception as e:
+            self.logger.error(f"Hash cache invalidation failed: {e}")
+
+    def close(self):
+        """Flush and close the cache database"""
+        if self.conn is None:
+            return
+
+        self.flush()
+        try:
+            self.conn.close()
+        except Exception:
+            pass
+        self.conn = None
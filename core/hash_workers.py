@@ -0,0 +1,135 @@
+"""
+File Hashing Workers
+Module level hashing functions that can run in threads or in worker processes
+"""
+
+import os
+import mmap
+import hashlib
+from core.content_matcher import ContentMatcher
+from core.signature_store import FINGERPRINT_SIZE
+
+# 1MB, a multiple of the 4KB page size so reads stay aligned
+HASH_BUFFER_SIZE = 1024 * 1024
+
+# Large file fingerprint: size, first and last block plus evenly spaced samples
+FINGERPRINT_BLOCK_SIZE = 64 * 1024
+FINGERPRINT_SAMPLES = 16
+
+# Content matcher and archive inspector of a worker process, set up once by
+# init_inspection_worker
+_worker_matcher = None
+_worker_archive_inspector = None
+
+
+def hash_file(file_path, buffer_size=HASH_BUFFER_SIZE):
+    """Return (md5, sha256) hex digests of a file, reading into a reused buffer"""
+    md5_hash = hashlib.md5()
+    sha256_hash = hashlib.sha256()
+    buffer = bytearray(buffer_size)
+    view = memoryview(buffer)
+
+    with open(file_path, "rb", buffering=0) as f:
+        while True:
+            read = f.readinto(buffer)
+            if not read:
+                break
+            md5_hash.update(view[:read])
+            sha256_hash.update(view[:read])
+
+    return md5_hash.hexdigest(), sha256_hash.hexdigest()
+
+
+def fingerprint_file(file_path, block_size=FINGERPRINT_BLOCK_SIZE, samples=FINGERPRINT_SAMPLES):
+    """Return a hex fingerprint of a file built from a fixed number of sampled blocks
+
+    Reads at most (samples + 2) blocks however large the file is. Two files with
+    the same fingerprint are only likely to be identical, a match has to be
+    confirmed with the full hashes.
+    """
+    fingerprint = hashlib.blake2b(digest_size=FINGERPRINT_SIZE)
+    buffer = bytearray(block_size)
+    view = memoryview(buffer)
+
+    with open(file_path, "rb", buffering=0) as f:
+        file_size = os.fstat(f.fileno()).st_size
+        fingerprint.update(file_size.to_bytes(8, "little"))
+
+        last_block = max(0, file_size - block_size)
+        offsets = [0] + [last_block * i // (samples + 1) for i in range(1, samples + 1)] + [last_block]
+        for offset in sorted(set(offsets)):
+            f.seek(offset)
+            read = f.readinto(buffer)
+            fingerprint.update(view[:read])
+
+    return fingerprint.hexdigest()
+
+
+def inspect_file(file_path, hash_mode, matcher=None, content_window=0,
+                 archive_inspector=None, buffer_size=HASH_BUFFER_SIZE):
+    """Hash a file and search its leading window for suspicious strings in one pass
+
+    hash_mode is "full" for the MD5 and SHA256 of the whole file, "sample" for
+    the fingerprint of a file too large to hash in full, or None when its
+    hashes are already known. The file is opened once and mapped, the matcher
+    searches the window in place and both hashers are fed slices of the same
+    mapping, so a large window costs no copy; unless hash_mode is "full" no
+    page past the window is touched. With archive_inspector the members of an
+    archive are inspected as well. Returns a dict with md5, sha256,
+    fingerprint, suspicious, the matched byte string, and archive, the
+    ArchiveInspector report, each None when not produced.
+    """
+    result = {'md5': None, 'sha256': None, 'fingerprint': None, 'suspicious': None, 'archive': None}
+    if hash_mode == "sample":
+        result['fingerprint'] = fingerprint_file(file_path)
+    if archive_inspector is not None:
+        result['archive'] = archive_inspector.inspect(file_path, matcher)
+    if hash_mode != "full" and not (matcher and content_window):
+        return result
+
+    md5_hash = hashlib.md5()
+    sha256_hash = hashlib.sha256()
+    with open(file_path, "rb", buffering=0) as f:
+        # Empty files cannot be mapped, their hashes are those of no data
+        if os.fstat(f.fileno()).st_size:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+                if matcher and content_window:
+                    result['suspicious'] = matcher.search(view, 0, min(content_window, len(view)))
+
+                if hash_mode == "full":
+                    data = memoryview(view)
+                    try:
+                        for offset in range(0, len(data), buffer_size):
+                            chunk = data[offset:offset + buffer_size]
+                            md5_hash.update(chunk)
+                            sha256_hash.update(chunk)
+                            chunk.release()
+                    finally:
+                        data.release()
+
+    if hash_mode == "full":
+        result['md5'], result['sha256'] = md5_hash.hexdigest(), sha256_hash.hexdigest()
+    return result
+
+
+def init_inspection_worker(patterns, archive_inspector=None):
+    """Process pool initializer, compiles the content patterns once per worker"""
+    global _worker_matcher, _worker_archive_inspector
+    _worker_matcher = ContentMatcher(patterns)
+    _worker_archive_inspector = archive_inspector
+
+
+def inspect_file_batch(jobs):
+    """Inspect a batch of (file_path, hash_mode, content_window, is_archive) jobs in one task
+
+    A file that cannot be read gets None instead of its result.
+    """
+    results = []
+    for file_path, hash_mode, content_window, is_archive in jobs:
+        archive_inspector = _worker_archive_inspector if is_archive else None
+        try:
+            results.append(inspect_file(file_path, hash_mode, _worker_matcher, content_window,
+                                        archive_inspector))
+        except (OSError, ValueError):
+            results.append(None)
+    return results
@@ -0,0 +1,102 @@
+"""
+Metadata Prefilter
+Evaluates the cheap, stat-only scanner rules over batches of directory entries and
+decides which files get the content, PE and archive reads
+"""
+
+import os
+
+# Files of these types can carry active content besides the executable and
+# script types the scanner already treats as suspicious
+ACTIVE_CONTENT_EXTENSIONS = {
+    "", ".docm", ".xlsm", ".pptm", ".dotm", ".xlam", ".rtf", ".pdf", ".iso", ".img",
+    ".vhd", ".chm", ".reg", ".inf", ".apk", ".xpi", ".tgz", ".tbz2", ".txz"
+}
+
+
+class FilePlan:
+    """Metadata verdict of one file and the reads it needs besides its hashes"""
+
+    __slots__ = ('file_path', 'file_stat', 'skip', 'threat_level', 'reasons',
+                 'needs_hash', 'needs_content', 'needs_pe', 'needs_archive')
+
+    def __init__(self, file_path, file_stat):
+        self.file_path = file_path
+        self.file_stat = file_stat
+        self.skip = False
+        self.threat_level = 0
+        self.reasons = []
+        self.needs_hash = False
+        self.needs_content = False
+        self.needs_pe = False
+        self.needs_archive = False
+
+
+class MetadataPrefilter:
+    """Runs EnhancedAntivirusScanner's metadata rules column by column over a batch
+
+    A file is hashed and looked up in the signature store when a signature
+    was taken from a file of its size, whatever its name, or when anything
+    else about it already looks suspicious; a file no signature can match is
+    not read for its hashes. Only files whose type can carry active content,
+    or whose name already looks malicious, are also marked for the content,
+    PE and archive stages.
+    """
+
+    def __init__(self, scanner):
+        self.scanner = scanner
+        self.read_extensions = (set(scanner.suspicious_extensions) | set(scanner.pe_extensions)
+                                | ACTIVE_CONTENT_EXTENSIONS)
+
+    def evaluate(self, entries):
+        """Return a FilePlan for each (file_path, file_stat) entry"""
+        scanner = self.scanner
+        plans = [FilePlan(file_path, file_stat) for file_path, file_stat in entries]
+        names = [os.path.basename(plan.file_path).lower() for plan in plans]
+        extensions = [os.path.splitext(name)[1] for name in names]
+
+        # System locations are never scanned
+        for plan in plans:
+            plan.skip = scanner.is_system_path(plan.file_path)
+
+        # Name rules: one compiled regex per name
+        name_hits = [(False, None) if plan.skip else scanner.check_suspicious_patterns(name)
+                     for plan, name in zip(plans, names)]
+        for plan, (is_suspicious, reason) in zip(plans, name_hits):
+            if is_suspicious:
+                plan.threat_level += 5
+                plan.reasons.append(reason)
+
+        # Size and timestamp rules from the stat the walker already has
+        for plan in plans:
+            if plan.skip:
+                continue
+            is_suspicious, reason = scanner.check_file_behavior(plan.file_path, plan.file_stat)
+            if is_suspicious:
+                plan.threat_level += 3
+                plan.reasons.append(reason)
+
+        # Extension rule and the I/O stages each file still needs
+        for plan, name, extension, (name_hit, _) in zip(plans, names, extensions, name_hits):
+            if plan.skip:
+                continue
+            if extension in scanner.suspicious_extensions:
+                plan.threat_level += 1
+                plan.reasons.append(f"Potentially dangerous file extension: {extension}")
+
+            plan.needs_content = extension in self.read_extensions or name_hit
+            plan.needs_pe = extension in scanner.pe_extensions
+            plan.needs_archive = scanner.archive_inspector.is_archive(name)
+
+        # Signature size rule; large files are only fingerprinted and empty
+        # ones settled without a read, whatever their size
+        for plan in plans:
+            if plan.skip:
+                continue
+            file_size = plan.file_stat.st_size
+            plan.needs_hash = (plan.threat_level > 0 or plan.needs_content or plan.needs_pe
+                               or plan.needs_archive or file_size == 0
+                               or file_size > scanner.max_file_size
+                               or scanner.signature_store.may_match_size(file_size))
+
+        return plans
@@ -0,0 +1,247 @@
+"""
+PE Header Analyzer
+Pure Python parser for the headers of Windows executables, reads them through mmap
+so only the pages holding headers, import names and section samples are touched
+"""
+
+import os
+import math
+import mmap
+import struct
+from collections import Counter
+
+DOS_HEADER = struct.Struct("<2s58xI")
+COFF_HEADER = struct.Struct("<4sHHIIIHH")
+SECTION_HEADER = struct.Struct("<8sIIIIIIHHI")
+IMPORT_DESCRIPTOR = struct.Struct("<IIIII")
+
+PE32_MAGIC = 0x10b
+PE32_PLUS_MAGIC = 0x20b
+IMAGE_FILE_DLL = 0x2000
+SECTION_EXECUTE = 0x20000000
+SECTION_WRITE = 0x80000000
+
+# Bytes of each section used for its entropy estimate
+ENTROPY_SAMPLE_SIZE = 16 * 1024
+MAX_SECTIONS = 96
+MAX_IMPORTED_DLLS = 256
+MAX_IMPORTED_FUNCTIONS = 4096
+MAX_NAME_LENGTH = 256
+
+# Section names left behind by common packers and protectors
+PACKER_SECTIONS = {
+    "upx0", "upx1", "upx2", ".aspack", ".adata", ".petite", ".mpress1", ".mpress2",
+    ".themida", ".vmp0", ".vmp1", ".enigma1", ".nsp0", ".nsp1", "pec2", ".packed"
+}
+
+# API groups that together point at a specific malicious capability
+SUSPICIOUS_API_GROUPS = {
+    "process injection": {"VirtualAllocEx", "WriteProcessMemory", "CreateRemoteThread"},
+    "keystroke capture": {"SetWindowsHookExA", "SetWindowsHookExW", "GetAsyncKeyState"},
+    "process hollowing": {"NtUnmapViewOfSection", "SetThreadContext", "ResumeThread"},
+}
+DYNAMIC_IMPORT_APIS = {"LoadLibraryA", "LoadLibraryW", "GetProcAddress"}
+
+
+def _entropy(data):
+    """Shannon entropy in bits per byte, 8.0 for perfectly random data"""
+    if not data:
+        return 0.0
+    total = len(data)
+    return -sum(count / total * math.log2(count / total) for count in Counter(data).values())
+
+
+def _read_string(view, offset):
+    """Null terminated ASCII string at a file offset"""
+    if offset <= 0 or offset >= len(view):
+        return None
+    end = view.find(b"\0", offset, offset + MAX_NAME_LENGTH)
+    if end == -1:
+        return None
+    return view[offset:end].decode("ascii", errors="replace")
+
+
+def _rva_to_offset(sections, rva):
+    """Translate a relative virtual address to a file offset through the section table"""
+    for section in sections:
+        start = section['virtual_address']
+        size = max(section['virtual_size'], section['raw_size'])
+        if start <= rva < start + size:
+            return section['raw_pointer'] + (rva - start)
+    return None
+
+
+def parse_pe(view):
+    """Parse the headers of a PE image held in a bytes-like view
+
+    Returns a dict of header fields, sections and imports, None when the data
+    is not a PE file, or a dict with 'malformed': True when the headers
+    announce a PE but cannot be parsed.
+    """
+    if len(view) < DOS_HEADER.size or view[:2] != b"MZ":
+        return None
+
+    _, pe_offset = DOS_HEADER.unpack_from(view, 0)
+    if pe_offset + COFF_HEADER.size + 2 > len(view):
+        return {'malformed': True}
+
+    (signature, machine, section_count, timestamp, _, _,
+     optional_size, characteristics) = COFF_HEADER.unpack_from(view, pe_offset)
+    if signature != b"PE\0\0":
+        return {'malformed': True}
+
+    optional_offset = pe_offset + COFF_HEADER.size
+    (magic,) = struct.unpack_from("<H", view, optional_offset)
+    if magic == PE32_MAGIC:
+        directory_offset = optional_offset + 96
+    elif magic == PE32_PLUS_MAGIC:
+        directory_offset = optional_offset + 112
+    else:
+        return {'malformed': True}
+
+    try:
+        (entry_point,) = struct.unpack_from("<I", view, optional_offset + 16)
+        (subsystem,) = struct.unpack_from("<H", view, optional_offset + 68)
+        (directory_count,) = struct.unpack_from("<I", view, directory_offset - 4)
+        import_rva = import_size = 0
+        if directory_count > 1:
+            import_rva, import_size = struct.unpack_from("<II", view, directory_offset + 8)
+
+        sections = []
+        section_offset = optional_offset + optional_size
+        for index in range(min(section_count, MAX_SECTIONS)):
+            (name, virtual_size, virtual_address, raw_size, raw_pointer,
+             _, _, _, _, flags) = SECTION_HEADER.unpack_from(view, section_offset + index * SECTION_HEADER.size)
+            sample_end = min(raw_pointer + min(raw_size, ENTROPY_SAMPLE_SIZE), len(view))
+            sections.append({
+                'name': name.rstrip(b"\0").decode("ascii", errors="replace"),
+                'virtual_size': virtual_size,
+                'virtual_address': virtual_address,
+                'raw_size': raw_size,
+                'raw_pointer': raw_pointer,
+                'characteristics': flags,
+                'entropy': _entropy(view[raw_pointer:sample_end]) if raw_pointer < sample_end else 0.0
+            })
+    except struct.error:
+        return {'malformed': True}
+
+    entry_section = None
+    for section in sections:
+        start = section['virtual_address']
+        if start <= entry_point < start + max(section['virtual_size'], section['raw_size']):
+            entry_section = section
+            break
+
+    return {
+        'malformed': False,
+        'machine': machine,
+        'is_64bit': magic == PE32_PLUS_MAGIC,
+        'is_dll': bool(characteristics & IMAGE_FILE_DLL),
+        'timestamp': timestamp,
+        'subsystem': subsystem,
+        'entry_point': entry_point,
+        'entry_section': entry_section['name'] if entry_section else None,
+        'sections': sections,
+        'imports': _parse_imports(view, sections, import_rva, import_size, magic == PE32_PLUS_MAGIC)
+    }
+
+
+def _parse_imports(view, sections, import_rva, import_size, is_64bit):
+    """Return {dll_name: [function names]} from the import directory"""
+    imports = {}
+    if not import_rva or not import_size:
+        return imports
+
+    offset = _rva_to_offset(sections, import_rva)
+    if offset is None:
+        return imports
+
+    thunk_format = "<Q" if is_64bit else "<I"
+    thunk_size = 8 if is_64bit else 4
+    ordinal_flag = 1 << (63 if is_64bit else 31)
+    function_total = 0
+
+    try:
+        for _ in range(MAX_IMPORTED_DLLS):
+            lookup_rva, _, _, name_rva, address_rva = IMPORT_DESCRIPTOR.unpack_from(view, offset)
+            if not name_rva:
+                break
+            offset += IMPORT_DESCRIPTOR.size
+
+            dll_offset = _rva_to_offset(sections, name_rva)
+            dll_name = _read_string(view, dll_offset) if dll_offset is not None else None
+            if not dll_name:
+                continue
+
+            functions = imports.setdefault(dll_name.lower(), [])
+            thunk_offset = _rva_to_offset(sections, lookup_rva or address_rva)
+            while thunk_offset is not None and function_total < MAX_IMPORTED_FUNCTIONS:
+                (thunk,) = struct.unpack_from(thunk_format, view, thunk_offset)
+                if not thunk:
+                    break
+                thunk_offset += thunk_size
+                function_total += 1
+                if thunk & ordinal_flag:
+                    continue
+                name_offset = _rva_to_offset(sections, thunk & 0x7FFFFFFF)
+                # Skip the two byte hint in front of the name
+                function = _read_string(view, name_offset + 2) if name_offset is not None else None
+                if function:
+                    functions.append(function)
+    except struct.error:
+        pass
+
+    return imports
+
+
+def analyze_pe_file(file_path):
+    """Map a file and parse its PE headers, None if it is not a PE file"""
+    with open(file_path, "rb") as f:
+        if os.fstat(f.fileno()).st_size < DOS_HEADER.size:
+            return None
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            return parse_pe(view)
+
+
+def score_pe(info):
+    """Turn parsed PE headers into (threat_score, reasons)"""
+    if info is None:
+        return 0, []
+    if info.get('malformed'):
+        return 3, ["Malformed PE header"]
+
+    score = 0
+    reasons = []
+
+    for section in info['sections']:
+        name = section['name'].lower()
+        executable = section['characteristics'] & SECTION_EXECUTE
+        if name in PACKER_SECTIONS:
+            score += 2
+            reasons.append(f"Packer section {section['name']}")
+        if executable and section['entropy'] > 7.2:
+            score += 3
+            reasons.append(f"High entropy code section {section['name']} ({section['entropy']:.2f})")
+        if executable and section['characteristics'] & SECTION_WRITE:
+            score += 2
+            reasons.append(f"Writable and executable section {section['name']}")
+
+    # DLLs without an entry point (resource-only, forwarders) leave it at 0
+    if info['entry_point'] and info['entry_section'] is None:
+        score += 3
+        reasons.append("Entry point outside all sections")
+    elif info['sections'] and info['entry_section'] == info['sections'][-1]['name'] and len(info['sections']) > 1:
+        score += 1
+        reasons.append(f"Entry point in last section {info['entry_section']}")
+
+    function_names = {name for functions in info['imports'].values() for name in functions}
+    for capability, apis in SUSPICIOUS_API_GROUPS.items():
+        if len(function_names & apis) >= 2:
+            score += 3
+            reasons.append(f"Imports APIs used for {capability}")
+
+    if not info['is_dll'] and len(function_names) < 8 and function_names & DYNAMIC_IMPORT_APIS:
+        score += 2
+        reasons.append("Resolves its imports at runtime (tiny import table)")
+
+    return score, reasons
@@ -0,0 +1,217 @@
+"""
+Quarantine Vault
+Content-addressed store for quarantined files: each payload is kept once, zlib-compressed
+and keyed by its SHA-256, with an index of where every quarantined copy came from
+"""
+
+import os
+import time
+import zlib
+import sqlite3
+import hashlib
+import tempfile
+import threading
+from utils.logger import get_logger
+
+CHUNK_SIZE = 1024 * 1024
+OBJECT_SUFFIX = ".z"
+INDEX_NAME = "quarantine.db"
+OBJECTS_DIR = "objects"
+
+
+class QuarantineVault:
+    """Quarantined payloads in <folder>/objects, their origins in <folder>/quarantine.db
+
+    A payload is written before its index row, so a crash can at worst leave
+    an unreferenced object behind, never an index entry without its data.
+    Quarantining a file whose content is already stored only adds an index
+    row and removes the original.
+    """
+
+    def __init__(self, folder, compression_level=6):
+        self.logger = get_logger("QuarantineVault")
+        self.folder = folder
+        self.objects_folder = os.path.join(folder, OBJECTS_DIR)
+        self.compression_level = compression_level
+        self.lock = threading.Lock()
+        self.conn = None
+
+        try:
+            os.makedirs(self.objects_folder, exist_ok=True)
+            self.conn = sqlite3.connect(os.path.join(folder, INDEX_NAME), check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "sha256 TEXT, original_path TEXT, size INTEGER, quarantined_at REAL, reason TEXT)"
+            )
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_sha256 ON entries(sha256)")
+            self.conn.commit()
+        except Exception as e:
+            self.logger.error(f"Quarantine vault disabled, cannot open {folder}: {e}")
+            self.conn = None
+
+    def object_path(self, sha256):
+        return os.path.join(self.objects_folder, sha256[:2], sha256 + OBJECT_SUFFIX)
+
+    def has_object(self, sha256):
+        return os.path.exists(self.object_path(sha256))
+
+    def _store_object(self, file_path):
+        """Hash and compress a file in one streaming pass, return (sha256, size)"""
+        sha256_hash = hashlib.sha256()
+        compressor = zlib.compressobj(self.compression_level)
+        size = 0
+
+        fd, temp_path = tempfile.mkstemp(dir=self.objects_folder, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as out, open(file_path, 'rb') as f:
+                while True:
+                    chunk = f.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    sha256_hash.update(chunk)
+                    out.write(compressor.compress(chunk))
+                out.write(compressor.flush())
+                out.flush()
+                os.fsync(out.fileno())
+
+            sha256 = sha256_hash.hexdigest()
+            target = self.object_path(sha256)
+            if os.path.exists(target):
+                # Same payload stored by an earlier quarantine
+                os.remove(temp_path)
+            else:
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                os.replace(temp_path, target)
+            return sha256, size
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def quarantine(self, file_path, reason=None, sha256=None):
+        """Move a file into the vault and return its entry id
+
+        A known sha256 (from the hash cache) lets a payload that is already
+        stored skip reading and compressing entirely.
+        """
+        if self.conn is None:
+            raise OSError(f"Quarantine vault is not available: {self.folder}")
+
+        if sha256 and self.has_object(sha256):
+            size = os.path.getsize(file_path)
+        else:
+            sha256, size = self._store_object(file_path)
+
+        with self.lock:
+            cursor = self.conn.execute(
+                "INSERT INTO entries (sha256, original_path, size, quarantined_at, reason) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (sha256, os.path.abspath(file_path), size, time.time(), reason)
+            )
+            self.conn.commit()
+            entry_id = cursor.lastrowid
+
+        try:
+            os.remove(file_path)
+        except OSError:
+            # The original could not be removed, nothing was quarantined after all
+            self._drop_entry(entry_id)
+            raise
+
+        self.logger.info(f"File quarantined: {file_path} -> {sha256}")
+        return entry_id
+
+    def get_entry(self, entry_id):
+        if self.conn is None:
+            return None
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT id, sha256, original_path, size, quarantined_at, reason FROM entries WHERE id = ?",
+                (entry_id,)
+            ).fetchone()
+        return self._entry(row) if row else None
+
+    def list_entries(self):
+        """Index entries, newest first"""
+        if self.conn is None:
+            return []
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT id, sha256, original_path, size, quarantined_at, reason FROM entries "
+                "ORDER BY id DESC"
+            ).fetchall()
+        return [self._entry(row) for row in rows]
+
+    def _entry(self, row):
+        entry_id, sha256, original_path, size, quarantined_at, reason = row
+        return {'id': entry_id, 'sha256': sha256, 'original_path': original_path,
+                'size': size, 'quarantined_at': quarantined_at, 'reason': reason}
+
+    def restore(self, entry_id, target_path=None):
+        """Decompress an entry back to disk (its original path by default) and drop it"""
+        entry = self.get_entry(entry_id)
+        if entry is None:
+            raise KeyError(f"No quarantine entry {entry_id}")
+
+        target_path = target_path or entry['original_path']
+        target_dir = os.path.dirname(os.path.abspath(target_path))
+        os.makedirs(target_dir, exist_ok=True)
+
+        sha256_hash = hashlib.sha256()
+        decompressor = zlib.decompressobj()
+        fd, temp_path = tempfile.mkstemp(dir=target_dir, suffix=".restore")
+        try:
+            with os.fdopen(fd, 'wb') as out, open(self.object_path(entry['sha256']), 'rb') as f:
+                while True:
+                    chunk = f.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    data = decompressor.decompress(chunk)
+                    sha256_hash.update(data)
+                    out.write(data)
+                data = decompressor.flush()
+                sha256_hash.update(data)
+                out.write(data)
+
+            if sha256_hash.hexdigest() != entry['sha256']:
+                raise ValueError(f"Quarantined payload {entry['sha256']} is corrupted")
+            os.replace(temp_path, target_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+        self._drop_entry(entry_id)
+        self.logger.info(f"File restored: {entry['sha256']} -> {target_path}")
+        return target_path
+
+    def delete(self, entry_id):
+        """Forget an entry, its payload goes once no other entry refers to it"""
+        if self.get_entry(entry_id) is None:
+            raise KeyError(f"No quarantine entry {entry_id}")
+        self._drop_entry(entry_id)
+
+    def _drop_entry(self, entry_id):
+        with self.lock:
+            row = self.conn.execute("SELECT sha256 FROM entries WHERE id = ?", (entry_id,)).fetchone()
+            if row is None:
+                return
+            self.conn.execute("DELETE FROM entries WHERE id = ?", (entry_id,))
+            self.conn.commit()
+            remaining = self.conn.execute(
+                "SELECT COUNT(*) FROM entries WHERE sha256 = ?", (row[0],)
+            ).fetchone()[0]
+
+        if not remaining:
+            try:
+                os.remove(self.object_path(row[0]))
+            except OSError:
+                pass
+
+    def close(self):
+        if self.conn is not None:
+            with self.lock:
+                self.conn.close()
+                self.conn = None
@@ -0,0 +1,128 @@
+"""
+Scan Result Store
+Compact storage for the threats found by the scanners, with severity counters kept
+up to date while results arrive and reports written to disk as a stream
+"""
+
+import json
+import threading
+from collections import Counter
+
+REPORT_FIELDS = ('path', 'threat_type', 'description', 'severity')
+# Readable by key as well, reasons keeps the separate strings description joins
+RECORD_FIELDS = REPORT_FIELDS + ('reasons',)
+
+
+class ThreatRecord:
+    """One detected threat
+
+    Reads like the result dicts the scanners used to return (record['path'],
+    record.get('severity'), dict(record)), without a per-record dict.
+    dict(record) holds the report fields, record['reasons'] the reason tuple.
+    """
+
+    __slots__ = ('path', 'threat_type', 'severity', 'reasons')
+
+    def __init__(self, path, threat_type, severity, reasons):
+        self.path = path
+        self.threat_type = threat_type
+        self.severity = severity
+        self.reasons = reasons
+
+    @property
+    def description(self):
+        return "; ".join(self.reasons)
+
+    def keys(self):
+        return REPORT_FIELDS
+
+    def __getitem__(self, key):
+        if key not in RECORD_FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __contains__(self, key):
+        return key in RECORD_FIELDS
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in RECORD_FIELDS else default
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in REPORT_FIELDS}
+
+    def __repr__(self):
+        return f"ThreatRecord({self.to_dict()!r})"
+
+
+class ScanResultStore:
+    """Append-only list of ThreatRecords
+
+    Threat types, severities and reason strings repeat across thousands of
+    hits, each distinct string is stored once and shared by every record.
+    Scanners add results from several threads, changes are made under a lock.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.records = []
+        self.severity_counts = Counter()
+        self._strings = {}
+
+    def _intern(self, value):
+        return self._strings.setdefault(value, value)
+
+    def add(self, path, threat_type, severity, reasons):
+        """Record a threat, reasons is a string or a sequence of strings"""
+        if isinstance(reasons, str):
+            reasons = (reasons,)
+        with self.lock:
+            record = ThreatRecord(path, self._intern(threat_type), self._intern(severity),
+                                  tuple(self._intern(reason) for reason in reasons))
+            self.records.append(record)
+            self.severity_counts[record.severity] += 1
+        return record
+
+    def append(self, result):
+        """Record a result given as a ThreatRecord or a dict with the report fields"""
+        return self.add(result['path'], result['threat_type'], result['severity'],
+                        result.get('reasons') or result['description'])
+
+    def extend(self, results):
+        for result in results:
+            self.append(result)
+
+    def count(self, severity):
+        with self.lock:
+            return self.severity_counts[severity]
+
+    def clear(self):
+        with self.lock:
+            self.records = []
+            self.severity_counts = Counter()
+            self._strings = {}
+
+    def __len__(self):
+        return len(self.records)
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def __getitem__(self, index):
+        return self.records[index]
+
+
+def write_report(report, f):
+    """Write a report dict as JSON, streaming its 'threats' one record at a time"""
+    header = {key: value for key, value in report.items() if key != 'threats'}
+    f.write("{\n")
+    for key, value in header.items():
+        f.write(f"  {json.dumps(key)}: {json.dumps(value, ensure_ascii=False)},\n")
+    f.write('  "threats": [')
+
+    separator = "\n    "
+    for threat in report.get('threats', ()):
+        record = threat.to_dict() if isinstance(threat, ThreatRecord) else threat
+        f.write(separator + json.dumps(record, ensure_ascii=False))
+        separator = ",\n    "
+
+    f.write("\n  ]\n}\n")
@@ -0,0 +1,187 @@
+"""
+Scan Manifest
+Persists per-file verdicts so repeat scans only evaluate the files that changed
+"""
+
+import os
+import json
+import sqlite3
+import threading
+from utils.logger import get_logger
+from utils.resource_manager import get_config_path
+from utils.file_walker import parallel_iter_files
+
+
+def _like_prefix(dir_path):
+    """LIKE pattern matching every path below dir_path, used with ESCAPE '\\'"""
+    prefix = os.path.join(dir_path, "").replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return prefix + "%"
+
+
+class ScanManifest:
+    """SQLite record of the last scan: size, mtime, ctime and verdict of every file
+
+    A verdict is reused only while the file's own stat is unchanged and the
+    signatures and rules it was made with are still the ones in use.
+    Directory mtimes are not trusted, they do not change when a file is
+    rewritten in place.
+    """
+
+    def __init__(self, db_path=None, commit_interval=256):
+        self.logger = get_logger("ScanManifest")
+        db_path = db_path or get_config_path("scan_manifest.db")
+        self.db_path = db_path
+        self.commit_interval = commit_interval
+        self.lock = threading.Lock()
+        self.pending_dirs = 0
+        self.conn = None
+
+        try:
+            db_dir = os.path.dirname(db_path)
+            if db_dir:
+                os.makedirs(db_dir, exist_ok=True)
+
+            self.conn = sqlite3.connect(db_path, check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+
+            # Manifests of older versions keyed verdicts on directory mtimes only
+            self.conn.execute("DROP TABLE IF EXISTS dirs")
+            columns = [row[1] for row in self.conn.execute("PRAGMA table_info(files)")]
+            if columns and "ctime_ns" not in columns:
+                self.conn.execute("DROP TABLE files")
+
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS files (dir TEXT, name TEXT, size INTEGER, mtime_ns INTEGER, "
+                "ctime_ns INTEGER, verdict TEXT, PRIMARY KEY (dir, name)) WITHOUT ROWID"
+            )
+            self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            self.conn.commit()
+        except Exception as e:
+            self.logger.error(f"Scan manifest disabled, cannot open {db_path}: {e}")
+            self.conn = None
+
+    def sync_version(self, version):
+        """Verdicts depend on the signatures and the scanner rules, drop them when either changes
+
+        version combines both, it is checked at the start of every incremental scan.
+        """
+        if self.conn is None:
+            return
+
+        try:
+            with self.lock:
+                row = self.conn.execute(
+                    "SELECT value FROM meta WHERE key = 'verdict_version'"
+                ).fetchone()
+                if row is not None and row[0] == str(version):
+                    return
+
+                self.conn.execute("DELETE FROM files")
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES ('verdict_version', ?)",
+                    (str(version),)
+                )
+                self.conn.commit()
+        except Exception as e:
+            self.logger.error(f"Scan manifest version check failed: {e}")
+
+    def get_directory(self, dir_path):
+        """Return {name: (size, mtime_ns, ctime_ns, verdict)} of the files recorded in a directory"""
+        with self.lock:
+            return {
+                name: (size, mtime_ns, ctime_ns, json.loads(verdict) if verdict else None)
+                for name, size, mtime_ns, ctime_ns, verdict in self.conn.execute(
+                    "SELECT name, size, mtime_ns, ctime_ns, verdict FROM files WHERE dir = ?", (dir_path,)
+                )
+            }
+
+    def save_directory(self, dir_path, files):
+        """Replace the stored files of a directory, files is {name: (size, mtime_ns, ctime_ns, verdict)}"""
+        with self.lock:
+            self.conn.execute("DELETE FROM files WHERE dir = ?", (dir_path,))
+            self.conn.executemany(
+                "INSERT INTO files (dir, name, size, mtime_ns, ctime_ns, verdict) VALUES (?, ?, ?, ?, ?, ?)",
+                [(dir_path, name, size, mtime_ns, ctime_ns, json.dumps(verdict) if verdict else None)
+                 for name, (size, mtime_ns, ctime_ns, verdict) in files.items()]
+            )
+            self.pending_dirs += 1
+            if self.pending_dirs >= self.commit_interval:
+                self.pending_dirs = 0
+                self.conn.commit()
+
+    def prune(self, root, seen_dirs):
+        """Drop the files recorded below root in directories a complete walk did not see"""
+        with self.lock:
+            stored = [row[0] for row in self.conn.execute(
+                "SELECT DISTINCT dir FROM files WHERE dir = ? OR dir LIKE ? ESCAPE '\\'",
+                (root, _like_prefix(root))
+            )]
+            self.conn.executemany("DELETE FROM files WHERE dir = ?",
+                                  [(dir_path,) for dir_path in stored if dir_path not in seen_dirs])
+
+    def commit(self):
+        """Write pending directory records to disk"""
+        if self.conn is None:
+            return
+
+        try:
+            with self.lock:
+                self.pending_dirs = 0
+                self.conn.commit()
+        except Exception as e:
+            self.logger.error(f"Scan manifest commit failed: {e}")
+
+    def walk(self, root, evaluate, progress, cacheable=None, workers=None, reuse=True):
+        """Yield (file_path, verdict) for every file under root, evaluating only changes
+
+        Every directory is listed again. A file keeps its recorded verdict
+        while its size, mtime and ctime are unchanged, any other file is
+        passed to evaluate(file_path, file_stat), which returns the verdict.
+        Verdicts of files cacheable(file_stat) rejects, such as ones that
+        depend on the file's age, are never stored. With reuse=False every
+        file is evaluated and the manifest only refreshed.
+
+        A walk closed early keeps the verdicts recorded so far, so the next
+        walk continues from them, but prunes nothing.
+        """
+        if self.conn is None:
+            raise RuntimeError("scan manifest is not available")
+
+        seen_dirs = set()
+        dir_path = None
+        known_files = files = None
+
+        try:
+            # The walker yields the files of one directory together
+            for file_path, file_stat in parallel_iter_files(root, progress, workers=workers):
+                parent, name = os.path.split(file_path)
+                if parent != dir_path:
+                    if dir_path is not None:
+                        self.save_directory(dir_path, files)
+                    dir_path = parent
+                    seen_dirs.add(parent)
+                    known_files = self.get_directory(parent) if reuse else {}
+                    files = {}
+
+                key = (file_stat.st_size, file_stat.st_mtime_ns, file_stat.st_ctime_ns)
+                known = known_files.get(name)
+                if known and known[:3] == key:
+                    verdict = known[3]
+                else:
+                    verdict = evaluate(file_path, file_stat)
+
+                if cacheable is None or cacheable(file_stat):
+                    files[name] = key + (verdict,)
+                yield file_path, verdict
+
+            if dir_path is not None:
+                self.save_directory(dir_path, files)
+                dir_path = None
+            # Directories that vanished or were emptied since the last scan
+            self.prune(root, seen_dirs)
+        finally:
+            if dir_path is not None:
+                # Closed early, the directory in progress keeps the files evaluated so far
+                self.save_directory(dir_path, files)
+            self.commit()
@@ -0,0 +1,91 @@
+"""
+Multi-Root Scan Scheduler
+Scans independent roots concurrently while keeping each storage device to a few walkers
+"""
+
+import os
+import threading
+from collections import defaultdict, deque
+from utils.logger import get_logger
+from utils.file_walker import CombinedProgress, device_key
+
+
+class RootScheduler:
+    """Run scan_root(root, progress, workers) for many roots with a per-device concurrency limit
+
+    readers_per_device is the number of directory-listing threads one device
+    gets in total, split between the roots scanned on it at the same time;
+    scan_root passes its share to the walker as workers. Use 1 for spinning
+    disks, where concurrent reads only add seeks.
+    """
+
+    def __init__(self, max_per_device=1, readers_per_device=4, refresh_interval=0.2):
+        self.logger = get_logger("RootScheduler")
+        self.max_per_device = max(1, max_per_device)
+        self.readers_per_device = max(1, readers_per_device)
+        self.refresh_interval = refresh_interval
+
+    def run(self, roots, scan_root, callback=None):
+        """Scan every root and return the combined results in root order
+
+        Roots on different devices run in parallel, roots on the same device
+        are handed out to at most max_per_device threads. callback(percent,
+        status) is called from the calling thread with the merged progress.
+        """
+        unique_roots = []
+        seen = set()
+        for root in roots:
+            key = os.path.normcase(os.path.abspath(root))
+            if key not in seen:
+                seen.add(key)
+                unique_roots.append(root)
+
+        progress = CombinedProgress(len(unique_roots))
+        results = [[] for _ in unique_roots]
+        active = {}
+        lock = threading.Lock()
+
+        by_device = defaultdict(deque)
+        for index, root in enumerate(unique_roots):
+            by_device[device_key(root)].append(index)
+
+        def device_worker(pending, workers):
+            while True:
+                with lock:
+                    if not pending:
+                        return
+                    index = pending.popleft()
+                    active[index] = unique_roots[index]
+                try:
+                    results[index] = scan_root(unique_roots[index], progress.parts[index], workers)
+                except Exception as e:
+                    self.logger.error(f"Error scanning {unique_roots[index]}: {str(e)}")
+                finally:
+                    part = progress.parts[index]
+                    # A root that failed early must not hold the estimate back
+                    part.dirs_pending = 0
+                    part.dirs_done = max(part.dirs_done, 1)
+                    with lock:
+                        del active[index]
+
+        threads = []
+        for pending in by_device.values():
+            device_threads = min(self.max_per_device, len(pending))
+            workers = max(1, self.readers_per_device // device_threads)
+            for _ in range(device_threads):
+                thread = threading.Thread(target=device_worker, args=(pending, workers), daemon=True)
+                thread.start()
+                threads.append(thread)
+
+        for thread in threads:
+            while thread.is_alive():
+                thread.join(self.refresh_interval)
+                if callback:
+                    with lock:
+                        running = ", ".join(active.values())
+                    callback(progress.percent(), f"Taranıyor: {running}" if running else "Taranıyor")
+
+        if callback:
+            callback(100.0, "Tarama tamamlandı")
+
+        return [item for root_results in results for item in root_results]
@@ -0,0 +1,268 @@
+"""
+Resumable Scan Session
+Runs a scan over a set of roots with pause/stop support and periodic checkpoints on disk
+"""
+
+import os
+import json
+import time
+import threading
+from utils.logger import get_logger
+from utils.resource_manager import get_config_path
+from core.result_store import ThreatRecord
+
+CHECKPOINT_VERSION = 2
+DEFAULT_CHECKPOINT_PATH = get_config_path("scan_session.json")
+
+# A stopped session may still be writing its last checkpoint while a new one
+# loads or discards it
+_checkpoint_lock = threading.Lock()
+
+
+class ScanSession:
+    """A scan of several roots run through AntivirusScanner.scan_roots
+
+    The roots go through the root scheduler, the parallel walker and the
+    scan manifest like any other scan; the session is the scan's control
+    object, so it can hold and stop it. The checkpoint keeps the roots
+    scanned to the end and the threats found in them. A root that was
+    interrupted is walked again on resume, every verdict of the earlier
+    run is recorded in the manifest, so only the files not evaluated yet
+    cost anything.
+    """
+
+    IDLE = "idle"
+    RUNNING = "running"
+    PAUSED = "paused"
+    STOPPED = "stopped"
+    COMPLETED = "completed"
+
+    def __init__(self, scanner, roots, scan_type="custom",
+                 checkpoint_path=DEFAULT_CHECKPOINT_PATH, checkpoint_interval=30.0):
+        self.logger = get_logger("ScanSession")
+        self.scanner = scanner
+        self.roots = list(roots)
+        self.scan_type = scan_type
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_interval = checkpoint_interval
+
+        self.state = self.IDLE
+        self.lock = threading.Lock()
+        self.completed_roots = []
+        self.completed_files = 0
+        self.results = {}
+        self.files_scanned = 0
+        self.current_path = None
+        self.elapsed = 0.0
+        # Only a session that was interrupted reuses the manifest's verdicts
+        self.interrupted = False
+        self.run_base = 0
+        self.run_roots = 0
+        self.run_percent = 0.0
+
+        self._run_started = None
+        self._resume_event = threading.Event()
+        self._resume_event.set()
+        self._stop_requested = False
+
+    @classmethod
+    def load(cls, scanner, checkpoint_path=DEFAULT_CHECKPOINT_PATH, **kwargs):
+        """Restore an interrupted session from its checkpoint, or return None"""
+        with _checkpoint_lock:
+            try:
+                with open(checkpoint_path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                return None
+
+        if (data.get('version') != CHECKPOINT_VERSION
+                or data.get('signature_version') != scanner.get_signature_version()):
+            # Older formats cannot be continued, and verdicts from older
+            # signatures cannot be mixed into the new scan
+            cls.discard(checkpoint_path)
+            return None
+
+        session = cls(scanner, data['roots'], data.get('scan_type', "custom"),
+                      checkpoint_path=checkpoint_path, **kwargs)
+        session.completed_roots = data['completed_roots']
+        session.completed_files = session.files_scanned = data['files_scanned']
+        session.results = {
+            item['path']: ThreatRecord(item['path'], item['threat_type'], item['severity'],
+                                       tuple(item['reasons']))
+            for item in data['results']
+        }
+        session.elapsed = data['elapsed']
+        session.interrupted = True
+        session.state = cls.STOPPED
+        return session
+
+    @staticmethod
+    def discard(checkpoint_path=DEFAULT_CHECKPOINT_PATH):
+        """Delete a saved checkpoint"""
+        with _checkpoint_lock:
+            try:
+                os.remove(checkpoint_path)
+            except OSError:
+                pass
+
+    def save_checkpoint(self):
+        """Atomically write the finished roots and partial results to disk"""
+        with self.lock:
+            data = {
+                'version': CHECKPOINT_VERSION,
+                'signature_version': self.scanner.get_signature_version(),
+                'scan_type': self.scan_type,
+                'roots': self.roots,
+                'completed_roots': list(self.completed_roots),
+                'results': [dict(record.to_dict(), reasons=list(record.reasons))
+                            for record in self.results.values()],
+                # Files of interrupted roots are counted again on resume
+                'files_scanned': self.completed_files,
+                'elapsed': self.elapsed_now(),
+                'saved_at': time.time()
+            }
+
+        try:
+            checkpoint_dir = os.path.dirname(self.checkpoint_path)
+            if checkpoint_dir:
+                os.makedirs(checkpoint_dir, exist_ok=True)
+
+            with _checkpoint_lock:
+                temp_path = self.checkpoint_path + ".tmp"
+                with open(temp_path, 'w', encoding='utf-8') as f:
+                    json.dump(data, f)
+                os.replace(temp_path, self.checkpoint_path)
+        except Exception as e:
+            self.logger.error(f"Error saving scan checkpoint: {str(e)}")
+
+    def pause(self):
+        """Hold the scan after the files being evaluated"""
+        with self.lock:
+            if self.state == self.RUNNING:
+                self.state = self.PAUSED
+                # Paused time does not count as scan time
+                self.elapsed = self.elapsed_now()
+                self._run_started = None
+                self._resume_event.clear()
+
+    def resume(self):
+        """Continue a paused scan"""
+        with self.lock:
+            if self.state == self.PAUSED:
+                self.state = self.RUNNING
+                self._run_started = time.time()
+                self._resume_event.set()
+
+    def stop(self):
+        """End the scan, keeping a checkpoint so it can be resumed later"""
+        self._stop_requested = True
+        self._resume_event.set()
+
+    def elapsed_now(self):
+        """Scan time so far, including the running stretch"""
+        if self._run_started is None:
+            return self.elapsed
+        return self.elapsed + time.time() - self._run_started
+
+    def percent(self):
+        """Estimated completion of the whole session"""
+        if self.state == self.COMPLETED or not self.roots:
+            return 100.0
+        if self.state in (self.RUNNING, self.PAUSED):
+            done = self.run_base + self.run_roots * self.run_percent / 100.0
+        else:
+            done = len(self.completed_roots)
+        return min(100.0, done * 100.0 / len(self.roots))
+
+    def results_snapshot(self):
+        """Threats found so far, in the order they were found"""
+        with self.lock:
+            return list(self.results.values())
+
+    # Control interface used by AntivirusScanner.scan_roots
+
+    def stopping(self):
+        return self._stop_requested
+
+    def proceed(self, file_path):
+        """Count a file evaluated by a scan thread, holding it while paused"""
+        with self.lock:
+            self.files_scanned += 1
+            self.current_path = file_path
+        if not self._resume_event.is_set():
+            self._resume_event.wait()
+        return not self._stop_requested
+
+    def add_result(self, path, threat_type, severity, reasons):
+        if isinstance(reasons, str):
+            reasons = (reasons,)
+        record = ThreatRecord(path, threat_type, severity, tuple(reasons))
+        with self.lock:
+            # A root walked again on resume reports its threats again
+            self.results[path] = record
+        return record
+
+    def root_finished(self, root, files):
+        with self.lock:
+            self.completed_roots.append(root)
+            self.completed_files += files
+
+    def run(self, callback=None):
+        """Scan the roots not finished yet until all are done or stop() is called
+
+        Blocks the calling thread, callback(percent, status) is invoked for
+        progress. Returns the threats found, including those of earlier runs.
+        """
+        pending_roots = [root for root in self.roots if root not in self.completed_roots]
+        with self.lock:
+            self.state = self.RUNNING
+            self._stop_requested = False
+            self._resume_event.set()
+            self.files_scanned = self.completed_files
+            self.run_base = len(self.roots) - len(pending_roots)
+            self.run_roots = len(pending_roots)
+            self.run_percent = 0.0
+            self._run_started = time.time()
+        last_checkpoint = [time.time()]
+        paused_saved = [False]
+        self.logger.info(f"Scan session started on {len(self.roots)} roots, "
+                         f"{len(pending_roots)} pending")
+
+        def on_progress(percent, status):
+            # Called from this thread by the root scheduler, checkpoints are
+            # written here and never from the scan threads
+            self.run_percent = percent
+            if self.state == self.PAUSED:
+                if not paused_saved[0]:
+                    paused_saved[0] = True
+                    self.save_checkpoint()
+            else:
+                paused_saved[0] = False
+                if time.time() - last_checkpoint[0] >= self.checkpoint_interval:
+                    last_checkpoint[0] = time.time()
+                    self.save_checkpoint()
+            if callback and not self._stop_requested:
+                callback(self.percent(), status)
+
+        self.scanner.scan_roots(pending_roots, on_progress, incremental=self.interrupted,
+                                control=self, record=True)
+
+        with self.lock:
+            self.elapsed = self.elapsed_now()
+            self._run_started = None
+            # A root that failed is logged by the scheduler, it does not keep the session open
+            finished = not self._stop_requested
+            self.state = self.COMPLETED if finished else self.STOPPED
+
+        if finished:
+            self.discard(self.checkpoint_path)
+            results = self.results_snapshot()
+            self.scanner.scan_results.extend(results)
+            self.logger.info(f"Scan session completed. Found {len(results)} threats")
+        else:
+            self.interrupted = True
+            self.save_checkpoint()
+            self.logger.info(f"Scan session stopped, "
+                             f"{len(self.roots) - len(self.completed_roots)} roots left")
+
+        return self.results_snapshot()
@@ -0,0 +1,616 @@
+"""
+Signature Store
+Sorted, memory-mapped binary database of MD5/SHA256 malware hashes and large-file
+fingerprints with a Bloom filter prefilter
+"""
+
+import os
+import mmap
+import heapq
+import struct
+import threading
+from utils.logger import get_logger
+from utils.resource_manager import get_config_path
+
+# File layout: header, Bloom filter bits, sorted MD5 records, sorted SHA256 records,
+# sorted fingerprint records, sorted file sizes, name offsets, names table
+MAGIC = b"DTSIG004"
+HEADER = struct.Struct("<8sQQQQQIIQQ")
+# Older files are still readable: version 3 has no file sizes, version 2 no
+# name offsets either and version 1 no fingerprint section, their names are
+# found by walking the table
+V3_MAGIC = b"DTSIG003"
+V2_MAGIC = b"DTSIG002"
+V3_HEADER = struct.Struct("<8sQQQQQII")
+LEGACY_MAGIC = b"DTSIG001"
+LEGACY_HEADER = struct.Struct("<8sQQQQII")
+NAME_INDEX = struct.Struct("<I")
+NAME_OFFSET = struct.Struct("<Q")
+NAME_LENGTH = struct.Struct("<H")
+FILE_SIZE = struct.Struct("<Q")
+MD5_SIZE = 16
+SHA256_SIZE = 32
+# Sampled fingerprint of a large file, see hash_workers.fingerprint_file
+FINGERPRINT_SIZE = 24
+DIGEST_SIZES = (MD5_SIZE, SHA256_SIZE, FINGERPRINT_SIZE)
+BLOOM_BITS_PER_ENTRY = 10
+BLOOM_HASHES = 4
+
+DEFAULT_DB_PATH = get_config_path("signatures.db")
+DEFAULT_DELTA_DIR = get_config_path("signature_updates")
+
+# Signatures shipped with the application, used to seed a new store
+BUILTIN_SIGNATURES = {
+    "d41d8cd98f00b204e9800998ecf8427e": "Empty file (potential placeholder malware)",
+    "5d41402abc4b2a76b9719d911017c592": "Known trojan signature",
+    "098f6bcd4621d373cade4e832627b4f6": "Suspicious test file",
+    "44d88612fea8a8f36de82e1278abb02f": "Common malware string",
+    "e1671797c52e15f763380b45e841ec32": "Suspicious binary pattern",
+}
+BUILTIN_SIZES = {
+    "d41d8cd98f00b204e9800998ecf8427e": 0,
+    "5d41402abc4b2a76b9719d911017c592": 5,
+    "098f6bcd4621d373cade4e832627b4f6": 4,
+    "44d88612fea8a8f36de82e1278abb02f": 68,
+    "e1671797c52e15f763380b45e841ec32": 1,
+}
+
+
+def _bloom_positions(digest, bloom_bits):
+    """Bit positions of a digest, digests are already uniform so slices of them are used as hashes"""
+    return [int.from_bytes(digest[i * 4:i * 4 + 4], "little") % bloom_bits
+            for i in range(BLOOM_HASHES)]
+
+
+def _parse_digest(hex_digest):
+    """Hex digest to bytes, None for anything that is not an MD5, SHA256 or fingerprint"""
+    try:
+        digest = bytes.fromhex(hex_digest)
+    except (TypeError, ValueError):
+        return None
+    return digest if len(digest) in DIGEST_SIZES else None
+
+
+def _parse_delta_digest(token):
+    """Digest and file size of a delta entry, written <hex_digest>[:<size>]"""
+    hex_digest, _, size = token.partition(":")
+    digest = _parse_digest(hex_digest)
+    try:
+        return digest, int(size) if size else None
+    except ValueError:
+        return digest, None
+
+
+def _unique_sorted(*size_lists):
+    """Merge sorted iterables of file sizes, dropping repeats"""
+    previous = None
+    for size in heapq.merge(*size_lists):
+        if size != previous:
+            yield size
+            previous = size
+
+
+def _set_bloom_bits(bloom, bloom_bits, digest):
+    """Add a digest to a Bloom filter bit array"""
+    for bit in _bloom_positions(digest, bloom_bits):
+        bloom[bit >> 3] |= 1 << (bit & 7)
+
+
+def _write_signature_file(path, version, bloom, bloom_bits, sections, names, sizes=(),
+                          unsized_count=0, fill_bloom=False):
+    """Stream a signature file to path
+
+    sections holds the MD5, SHA256 and fingerprint record iterables in file
+    order, each must be sorted, they are written straight to disk and
+    counted on the way. sizes are the distinct, sorted file sizes of the
+    MD5/SHA256 signatures, unsized_count the number of those whose size is
+    not known. With fill_bloom every record is also added to bloom, which
+    is written over its placeholder together with the final header.
+    """
+    with open(path, "wb") as f:
+        f.write(b"\0" * HEADER.size)
+        f.write(bloom)
+        counts = []
+        for digest_size, records in zip(DIGEST_SIZES, sections):
+            count = 0
+            for record in records:
+                f.write(record)
+                if fill_bloom:
+                    _set_bloom_bits(bloom, bloom_bits, record[:digest_size])
+                count += 1
+            counts.append(count)
+        size_count = 0
+        for size in sizes:
+            f.write(FILE_SIZE.pack(size))
+            size_count += 1
+        encoded_names = [name.encode("utf-8")[:0xFFFF] for name in names]
+        name_offset = 0
+        for encoded in encoded_names:
+            f.write(NAME_OFFSET.pack(name_offset))
+            name_offset += NAME_LENGTH.size + len(encoded)
+        for encoded in encoded_names:
+            f.write(NAME_LENGTH.pack(len(encoded)))
+            f.write(encoded)
+
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, version, *counts, bloom_bits, BLOOM_HASHES, len(names),
+                            size_count, unsized_count))
+        if fill_bloom:
+            f.write(bloom)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def build_signature_file(db_path, signatures, version=1, sizes=None):
+    """Write a signature file from {hex_digest: threat_name}, replacing db_path atomically
+
+    sizes maps hex digests to the size of the file they were taken from, so
+    scans can tell which files cannot match any signature without hashing them.
+    """
+    names = []
+    name_ids = {}
+    sections = {size: [] for size in DIGEST_SIZES}
+    file_sizes = set()
+    unsized_count = 0
+    sizes = {hex_digest.lower(): size for hex_digest, size in (sizes or {}).items()}
+
+    for hex_digest, name in signatures.items():
+        digest = _parse_digest(hex_digest)
+        if digest is None:
+            continue
+        if name not in name_ids:
+            name_ids[name] = len(names)
+            names.append(name)
+        sections[len(digest)].append(digest + NAME_INDEX.pack(name_ids[name]))
+        if len(digest) != FINGERPRINT_SIZE:
+            size = sizes.get(hex_digest.lower())
+            if size is None:
+                unsized_count += 1
+            else:
+                file_sizes.add(size)
+
+    for records in sections.values():
+        records.sort()
+
+    entry_count = sum(len(records) for records in sections.values())
+    bloom_bits = max(64, entry_count * BLOOM_BITS_PER_ENTRY)
+    bloom = bytearray((bloom_bits + 7) // 8)
+
+    db_dir = os.path.dirname(db_path)
+    if db_dir:
+        os.makedirs(db_dir, exist_ok=True)
+
+    temp_path = db_path + ".tmp"
+    _write_signature_file(temp_path, version, bloom, bloom_bits,
+                          [sections[size] for size in DIGEST_SIZES], names, sorted(file_sizes),
+                          unsized_count, fill_bloom=True)
+    os.replace(temp_path, db_path)
+
+
+def read_signature_delta(delta_path):
+    """Parse a delta file into (base_version, version, added, removed, sizes)
+
+    Format, one entry per line, the size of the file a digest was taken
+    from is optional:
+        #DTSIG-DELTA <base_version> <version>
+        + <hex_digest>[:<size>] <threat name>
+        - <hex_digest>
+    """
+    added = {}
+    removed = set()
+    sizes = {}
+
+    with open(delta_path, "r", encoding="utf-8") as f:
+        header = f.readline().split()
+        if len(header) != 3 or header[0] != "#DTSIG-DELTA":
+            raise ValueError(f"not a signature delta: {delta_path}")
+        base_version, version = int(header[1]), int(header[2])
+
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            parts = line.split(None, 2)
+            digest, size = _parse_delta_digest(parts[1]) if len(parts) > 1 else (None, None)
+            if digest is None:
+                continue
+            if parts[0] == "+":
+                added[digest] = parts[2] if len(parts) > 2 else "Known malware"
+                removed.discard(digest)
+                sizes.pop(digest, None)
+                if size is not None:
+                    sizes[digest] = size
+            elif parts[0] == "-":
+                removed.add(digest)
+                added.pop(digest, None)
+                sizes.pop(digest, None)
+
+    return base_version, version, added, removed, sizes
+
+
+def write_signature_delta(delta_path, base_version, version, added=None, removed=(), sizes=None):
+    """Write a delta file, added is {hex_digest: threat_name}, removed a list of hex digests
+
+    sizes optionally maps added hex digests to the size of their file.
+    """
+    sizes = sizes or {}
+    with open(delta_path, "w", encoding="utf-8") as f:
+        f.write(f"#DTSIG-DELTA {base_version} {version}\n")
+        for hex_digest, name in (added or {}).items():
+            size = sizes.get(hex_digest)
+            token = hex_digest if size is None else f"{hex_digest}:{size}"
+            f.write(f"+ {token} {name}\n")
+        for hex_digest in removed:
+            f.write(f"- {hex_digest}\n")
+
+
+class _SignatureMap:
+    """One mapped signature file, never modified while it is mapped
+
+    Header fields are read when it is opened, records and threat names are
+    only read from the mapping when a lookup needs them.
+    """
+
+    def __init__(self, db_path):
+        self.file = open(db_path, "rb")
+        try:
+            self.view = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            self.file.close()
+            raise
+
+        view = self.view
+        magic = view[:len(MAGIC)]
+        self.size_count = 0
+        if magic == MAGIC:
+            (_, self.version, self.md5_count, self.sha256_count, self.fingerprint_count,
+             self.bloom_bits, bloom_hashes, self.name_count,
+             self.size_count, self.unsized_count) = HEADER.unpack_from(view, 0)
+            self.bloom_offset = HEADER.size
+        elif magic in (V3_MAGIC, V2_MAGIC):
+            (_, self.version, self.md5_count, self.sha256_count, self.fingerprint_count,
+             self.bloom_bits, bloom_hashes, self.name_count) = V3_HEADER.unpack_from(view, 0)
+            self.bloom_offset = V3_HEADER.size
+        elif magic == LEGACY_MAGIC:
+            (_, self.version, self.md5_count, self.sha256_count,
+             self.bloom_bits, bloom_hashes, self.name_count) = LEGACY_HEADER.unpack_from(view, 0)
+            self.fingerprint_count = 0
+            self.bloom_offset = LEGACY_HEADER.size
+        else:
+            bloom_hashes = None
+        if magic != MAGIC and bloom_hashes is not None:
+            # Older files record no sizes, none of their signatures can be ruled out
+            self.unsized_count = self.md5_count + self.sha256_count
+
+        if bloom_hashes != BLOOM_HASHES:
+            self.close()
+            raise ValueError("not a DonTe signature database")
+
+        self.md5_offset = self.bloom_offset + (self.bloom_bits + 7) // 8
+        self.sha256_offset = self.md5_offset + self.md5_count * (MD5_SIZE + NAME_INDEX.size)
+        self.fingerprint_offset = self.sha256_offset + self.sha256_count * (SHA256_SIZE + NAME_INDEX.size)
+        self.sizes_offset = self.fingerprint_offset + self.fingerprint_count * (FINGERPRINT_SIZE + NAME_INDEX.size)
+        names_start = self.sizes_offset + self.size_count * FILE_SIZE.size
+        if magic in (MAGIC, V3_MAGIC):
+            self.name_index_offset = names_start
+            self.names_offset = names_start + self.name_count * NAME_OFFSET.size
+        else:
+            self.name_index_offset = None
+            self.names_offset = names_start
+
+    def __len__(self):
+        return self.md5_count + self.sha256_count + self.fingerprint_count
+
+    def sections(self):
+        """(offset, count, digest_size) of each record section in file order"""
+        return [(self.md5_offset, self.md5_count, MD5_SIZE),
+                (self.sha256_offset, self.sha256_count, SHA256_SIZE),
+                (self.fingerprint_offset, self.fingerprint_count, FINGERPRINT_SIZE)]
+
+    def bloom(self):
+        return self.view[self.bloom_offset:self.md5_offset]
+
+    def might_contain(self, digest):
+        """Bloom filter test, False means the digest is certainly not in the store"""
+        view = self.view
+        for bit in _bloom_positions(digest, self.bloom_bits):
+            if not view[self.bloom_offset + (bit >> 3)] & (1 << (bit & 7)):
+                return False
+        return True
+
+    def find(self, digest):
+        """Threat name of a digest, or None"""
+        if not self.might_contain(digest):
+            return None
+
+        offset, count, _ = self.sections()[DIGEST_SIZES.index(len(digest))]
+        record_size = len(digest) + NAME_INDEX.size
+
+        # Binary search over the fixed-size sorted records
+        low, high = 0, count
+        view = self.view
+        while low < high:
+            middle = (low + high) // 2
+            start = offset + middle * record_size
+            candidate = view[start:start + len(digest)]
+            if candidate < digest:
+                low = middle + 1
+            elif candidate > digest:
+                high = middle
+            else:
+                (name_id,) = NAME_INDEX.unpack_from(view, start + len(digest))
+                return self.name(name_id)
+        return None
+
+    def has_size(self, size):
+        """Whether an MD5/SHA256 signature may belong to a file of this size"""
+        if self.unsized_count:
+            return True
+
+        low, high = 0, self.size_count
+        view = self.view
+        while low < high:
+            middle = (low + high) // 2
+            (candidate,) = FILE_SIZE.unpack_from(view, self.sizes_offset + middle * FILE_SIZE.size)
+            if candidate < size:
+                low = middle + 1
+            elif candidate > size:
+                high = middle
+            else:
+                return True
+        return False
+
+    def sizes(self):
+        """The recorded file sizes in order, only needed to write an updated file"""
+        view = self.view
+        for index in range(self.size_count):
+            yield FILE_SIZE.unpack_from(view, self.sizes_offset + index * FILE_SIZE.size)[0]
+
+    def name(self, name_id):
+        """Threat name number name_id"""
+        if name_id >= self.name_count:
+            return "Known malware"
+
+        view = self.view
+        if self.name_index_offset is not None:
+            (offset,) = NAME_OFFSET.unpack_from(view, self.name_index_offset + name_id * NAME_OFFSET.size)
+            offset += self.names_offset
+        else:
+            offset = self.names_offset
+            for _ in range(name_id):
+                (length,) = NAME_LENGTH.unpack_from(view, offset)
+                offset += NAME_LENGTH.size + length
+
+        (length,) = NAME_LENGTH.unpack_from(view, offset)
+        start = offset + NAME_LENGTH.size
+        return view[start:start + length].decode("utf-8", errors="replace")
+
+    def names(self):
+        """Every threat name in id order, only needed to write an updated file"""
+        names = []
+        view = self.view
+        offset = self.names_offset
+        for _ in range(self.name_count):
+            (length,) = NAME_LENGTH.unpack_from(view, offset)
+            offset += NAME_LENGTH.size
+            names.append(view[offset:offset + length].decode("utf-8", errors="replace"))
+            offset += length
+        return names
+
+    def merged_records(self, offset, count, digest_size, additions, removed):
+        """Merge the sorted on-disk records with sorted additions, dropping removals"""
+        record_size = digest_size + NAME_INDEX.size
+        view = self.view
+        next_add = 0
+
+        for index in range(count):
+            start = offset + index * record_size
+            record = view[start:start + record_size]
+            digest = record[:digest_size]
+
+            while next_add < len(additions) and additions[next_add][:digest_size] < digest:
+                yield additions[next_add]
+                next_add += 1
+
+            # Entries updated by the delta are yielded from additions instead
+            if digest in removed or (next_add < len(additions) and
+                                     additions[next_add][:digest_size] == digest):
+                continue
+            yield record
+
+        yield from additions[next_add:]
+
+    def close(self):
+        self.view.close()
+        self.file.close()
+
+
+class SignatureStore:
+    """Read-only view of a signature file, lookups touch only a few pages
+
+    Lookups take no lock. A mapped file is never modified, an update writes a
+    new file and swaps the whole mapping, so a lookup only needs the mapping
+    it started with. Only a lookup that meets a mapping an update has just
+    released waits, for the short moment until the new one is in place.
+    """
+
+    def __init__(self, db_path=DEFAULT_DB_PATH):
+        self.logger = get_logger("SignatureStore")
+        self.db_path = db_path
+        self.swap_lock = threading.Lock()
+        self.update_lock = threading.Lock()
+        self.map = None
+
+        try:
+            if not os.path.exists(db_path):
+                self.logger.info(f"Creating signature database: {db_path}")
+                build_signature_file(db_path, BUILTIN_SIGNATURES, sizes=BUILTIN_SIZES)
+            self.open()
+        except Exception as e:
+            self.logger.error(f"Signature database unavailable ({db_path}): {e}")
+
+    @property
+    def version(self):
+        signature_map = self.map
+        return signature_map.version if signature_map is not None else 0
+
+    def open(self):
+        """Map the signature file and read its header"""
+        signature_map = _SignatureMap(self.db_path)
+        with self.swap_lock:
+            previous, self.map = self.map, signature_map
+        if previous is not None:
+            previous.close()
+
+    def __len__(self):
+        signature_map = self.map
+        return len(signature_map) if signature_map is not None else 0
+
+    def lookup(self, hex_digest):
+        """Return the threat name for an MD5, SHA256 or fingerprint hex digest, or None"""
+        if not hex_digest:
+            return None
+
+        digest = _parse_digest(hex_digest)
+        if digest is None:
+            return None
+
+        signature_map = self.map
+        try:
+            return signature_map.find(digest) if signature_map is not None else None
+        except ValueError:
+            # Released by an update that is swapping files, wait for its new mapping
+            with self.swap_lock:
+                signature_map = self.map
+            try:
+                return signature_map.find(digest) if signature_map is not None else None
+            except ValueError:
+                return None
+
+    def may_match_size(self, file_size):
+        """False when no MD5/SHA256 signature was taken from a file of this size
+
+        A file that cannot match by size does not need hashing. Stores with
+        signatures of unknown size answer True for every size.
+        """
+        signature_map = self.map
+        try:
+            return signature_map.has_size(file_size) if signature_map is not None else True
+        except ValueError:
+            with self.swap_lock:
+                signature_map = self.map
+            try:
+                return signature_map.has_size(file_size) if signature_map is not None else True
+            except ValueError:
+                return True
+
+    def apply_delta(self, delta_path):
+        """Apply a delta file in place and swap the new database in atomically"""
+        base_version, version, added, removed, sizes = read_signature_delta(delta_path)
+
+        with self.update_lock:
+            signature_map = self.map
+            if signature_map is None:
+                raise ValueError("signature database is not loaded")
+            if base_version != signature_map.version:
+                raise ValueError(f"delta expects version {base_version}, database is {signature_map.version}")
+
+            names = signature_map.names()
+            name_ids = {name: index for index, name in enumerate(names)}
+            for name in added.values():
+                if name not in name_ids:
+                    name_ids[name] = len(names)
+                    names.append(name)
+
+            additions = {size: sorted(d + NAME_INDEX.pack(name_ids[n]) for d, n in added.items()
+                                      if len(d) == size)
+                         for size in DIGEST_SIZES}
+
+            # Keep the current Bloom filter and add the new digests while it has
+            # room, removed digests just leave harmless stale bits behind
+            expected_entries = len(signature_map) + len(added)
+            if expected_entries * BLOOM_BITS_PER_ENTRY <= signature_map.bloom_bits * 2:
+                bloom_bits = signature_map.bloom_bits
+                bloom = bytearray(signature_map.bloom())
+                for digest in added:
+                    _set_bloom_bits(bloom, bloom_bits, digest)
+                fill_bloom = False
+            else:
+                bloom_bits = expected_entries * BLOOM_BITS_PER_ENTRY
+                bloom = bytearray((bloom_bits + 7) // 8)
+                fill_bloom = True
+
+            # Sizes of removed signatures stay behind like their Bloom bits,
+            # they only cost a file of that size its hashing
+            unsized_count = signature_map.unsized_count + sum(
+                1 for digest in added if len(digest) != FINGERPRINT_SIZE and digest not in sizes)
+            file_sizes = _unique_sorted(signature_map.sizes(), sorted(set(sizes.values())))
+
+            temp_path = self.db_path + ".tmp"
+            _write_signature_file(
+                temp_path, version, bloom, bloom_bits,
+                [signature_map.merged_records(offset, count, size, additions[size], removed)
+                 for offset, count, size in signature_map.sections()],
+                names, file_sizes, unsized_count, fill_bloom=fill_bloom
+            )
+
+            # Windows cannot replace a mapped file, so unmap for the short swap window,
+            # lookups meeting the released mapping wait here for the new one
+            with self.swap_lock:
+                signature_map.close()
+                try:
+                    os.replace(temp_path, self.db_path)
+                finally:
+                    try:
+                        self.map = _SignatureMap(self.db_path)
+                    except Exception:
+                        self.map = None
+                        raise
+
+        self.logger.info(f"Signature delta applied: version {base_version} -> {version} "
+                         f"(+{len(added)} / -{len(removed)})")
+        return version
+
+    def update_from_directory(self, delta_dir=DEFAULT_DELTA_DIR):
+        """Apply every delta in delta_dir that chains onto the current version
+
+        Returns the number of deltas applied.
+        """
+        deltas = {}
+        if os.path.isdir(delta_dir):
+            for entry in os.scandir(delta_dir):
+                if not entry.name.endswith(".delta"):
+                    continue
+                try:
+                    with open(entry.path, "r", encoding="utf-8") as f:
+                        header = f.readline().split()
+                    if len(header) == 3 and header[0] == "#DTSIG-DELTA":
+                        deltas[int(header[1])] = entry.path
+                except (OSError, ValueError):
+                    continue
+
+        applied = 0
+        while self.version in deltas:
+            self.apply_delta(deltas.pop(self.version))
+            applied += 1
+        return applied
+
+    def close(self):
+        """Unmap the signature file"""
+        with self.swap_lock:
+            signature_map, self.map = self.map, None
+        if signature_map is not None:
+            signature_map.close()
+
+
+_shared_stores = {}
+_shared_stores_lock = threading.Lock()
+
+
+def get_signature_store(db_path=DEFAULT_DB_PATH):
+    """Process-wide store for db_path, so updates reach every scanner at once"""
+    with _shared_stores_lock:
+        store = _shared_stores.get(db_path)
+        if store is None:
+            store = _shared_stores[db_path] = SignatureStore(db_path)
+        return store
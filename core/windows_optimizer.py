@@ -9,7 +9,10 @@ import wmi
 import os
 import shutil
 import ctypes
+import re
 from utils.logger import get_logger
+from core.deletion_engine import DeletionEngine
+from core.action_journal import get_action_journal
 
 class WindowsOptimizer:
     def __init__(self):
@@ -19,6 +22,46 @@ class WindowsOptimizer:
         self.original_visual_effects = None
         self.registry_backup_path = None
         
+        # Every change is journaled first, undo works from the journal even after a crash
+        self.journal = get_action_journal()
+        self.deletion_engine = DeletionEngine(journal=self.journal)
+        self.load_journal_state()
+        self.resume_interrupted_undo()
+        
+    def load_journal_state(self):
+        """Rebuild the lists of changes that were made and not undone yet"""
+        for record in reversed(self.journal.pending()):
+            data = record['data']
+            if record['action'] == 'service_disabled':
+                self.disabled_services.append(data['name'])
+            elif record['action'] == 'startup_removed':
+                self.removed_startup_items.append(
+                    (data['hive'], data['key_path'], data['value_name'], data['value_data']))
+            elif record['action'] == 'registry_value_set' and data['name'] == "VisualFXSetting":
+                if self.original_visual_effects is None:
+                    self.original_visual_effects = data['old_value']
+    
+    def resume_interrupted_undo(self):
+        """Replay the rest of an undo that was cut off by a crash or restart
+        
+        Records undone before the crash are marked so and skipped, the one
+        that was in progress is undone again, every undo step is idempotent.
+        """
+        if self.journal.undo_interrupted:
+            self.logger.info("Finishing an undo that was interrupted")
+            success, message = self.undo_all_changes()
+            if not success:
+                self.logger.error(message)
+    
+    def get_active_power_scheme(self):
+        """GUID of the active power plan, None if it cannot be read"""
+        try:
+            result = subprocess.run("powercfg /getactivescheme", shell=True, capture_output=True, text=True)
+            match = re.search(r"[0-9a-fA-F]{8}-[0-9a-fA-F-]{27}", result.stdout)
+            return match.group(0) if match else None
+        except Exception:
+            return None
+        
     def disable_services(self):
         """Disable unnecessary Windows services"""
         try:
@@ -30,16 +73,32 @@ class WindowsOptimizer:
                     service_list = c.Win32_Service(Name=service_name)
                     if service_list:
                         for service in service_list:
-                            if service.State == "Running":
+                            was_running = service.State == "Running"
+                            start_mode = service.StartMode
+                            if not was_running and start_mode == "Disabled":
+                                continue
+                            
+                            # Journaled before the service is touched, so undo restarts
+                            # it even if the process dies right after stopping it
+                            seq = self.journal.record('service_disabled', durable=True, name=service_name,
+                                                      start_mode=start_mode, was_running=was_running)
+                            changed = False
+                            if was_running:
                                 result = service.StopService()
                                 if result[0] == 0:
+                                    changed = True
                                     self.logger.info(f"Service stopped: {service_name}")
                             
-                            if service.StartMode != "Disabled":
+                            if start_mode != "Disabled":
                                 result = service.ChangeStartMode("Disabled")
                                 if result[0] == 0:
-                                    self.disabled_services.append(service_name)
+                                    changed = True
                                     self.logger.info(f"Service disabled: {service_name}")
+                            
+                            if changed:
+                                self.disabled_services.append(service_name)
+                            else:
+                                self.journal.mark_undone(seq)
                 except Exception as e:
                     self.logger.error(f"Error handling service {service_name}: {str(e)}")
             
@@ -75,6 +134,9 @@ class WindowsOptimizer:
                             # Check if this is an unnecessary program
                             for prog in unnecessary_programs:
                                 if prog.lower() in value_name.lower() or prog.lower() in value_data.lower():
+                                    seq = self.journal.record('startup_removed', durable=True, hive=hive,
+                                                              key_path=key_path, value_name=value_name,
+                                                              value_data=value_data, value_type=value_type)
                                     try:
                                         winreg.DeleteValue(key, value_name)
                                         self.removed_startup_items.append((hive, key_path, value_name, value_data))
@@ -82,7 +144,7 @@ class WindowsOptimizer:
                                         self.logger.info(f"Removed startup item: {value_name}")
                                         break
                                     except:
-                                        pass
+                                        self.journal.mark_undone(seq)
                             else:
                                 i += 1
                         except OSError:
@@ -108,11 +170,16 @@ class WindowsOptimizer:
             )
             
             try:
-                self.original_visual_effects = winreg.QueryValueEx(key, "VisualFXSetting")[0]
+                old_value, old_type = winreg.QueryValueEx(key, "VisualFXSetting")
             except:
-                self.original_visual_effects = None
+                old_value, old_type = None, None
+            if self.original_visual_effects is None:
+                self.original_visual_effects = old_value
             
             # Set to "Adjust for best performance" (value 2)
+            self.journal.record('registry_value_set', durable=True, hive=winreg.HKEY_CURRENT_USER,
+                                key_path=r"Software\Microsoft\Windows\CurrentVersion\Explorer\VisualEffects",
+                                name="VisualFXSetting", old_value=old_value, old_type=old_type)
             winreg.SetValueEx(key, "VisualFXSetting", 0, winreg.REG_DWORD, 2)
             winreg.CloseKey(key)
             
@@ -125,6 +192,8 @@ class WindowsOptimizer:
     def set_high_performance_power_plan(self):
         """Set Windows power plan to high performance"""
         try:
+            seq = self.journal.record('power_plan_set', durable=True, previous=self.get_active_power_scheme())
+            
             # High Performance GUID
             result = subprocess.run(
                 "powercfg /setactive 8c5e7fda-e8bf-4a96-9a85-a6e23a8c635c", 
@@ -137,6 +206,7 @@ class WindowsOptimizer:
                 self.logger.info("Power plan set to high performance")
                 return True, "Güç planı yüksek performansa ayarlandı"
             else:
+                self.journal.mark_undone(seq)
                 return False, "Güç planı değiştirilemedi"
         except Exception as e:
             self.logger.error(f"Power plan change failed: {str(e)}")
@@ -145,7 +215,6 @@ class WindowsOptimizer:
     def clean_temp_files(self):
         """Clean temporary files and system cache"""
         try:
-            cleaned_size = 0
             temp_paths = [
                 os.environ.get('TEMP', ''),
                 os.environ.get('TMP', ''),
@@ -153,20 +222,9 @@ class WindowsOptimizer:
                 os.path.expanduser(r'~\AppData\Local\Temp')
             ]
             
-            for temp_path in temp_paths:
-                if os.path.exists(temp_path):
-                    try:
-                        for root, dirs, files in os.walk(temp_path):
-                            for file in files:
-                                try:
-                                    file_path = os.path.join(root, file)
-                                    file_size = os.path.getsize(file_path)
-                                    os.remove(file_path)
-                                    cleaned_size += file_size
-                                except:
-                                    pass
-                    except:
-                        pass
+            # TEMP, TMP and the profile temp folder are usually the same directory,
+            # the engine cleans each distinct folder once
+            cleaned_size = self.deletion_engine.clean(temp_paths).bytes_freed
             
             # Run disk cleanup
             try:
@@ -197,58 +255,77 @@ class WindowsOptimizer:
             return False, f"Bellek optimizasyonu başarısız: {str(e)}"
     
     def undo_all_changes(self):
-        """Undo all optimization changes"""
+        """Undo all optimization changes recorded in the journal, newest first"""
         try:
-            # Restore services
-            if self.disabled_services:
-                c = wmi.WMI()
-                for service_name in self.disabled_services:
-                    try:
-                        service_list = c.Win32_Service(Name=service_name)
-                        if service_list:
-                            for service in service_list:
-                                service.ChangeStartMode("Automatic")
-                                service.StartService()
-                                self.logger.info(f"Service restored: {service_name}")
-                    except:
-                        pass
-                self.disabled_services = []
-            
-            # Restore startup items
-            for hive, key_path, value_name, value_data in self.removed_startup_items:
-                try:
-                    key = winreg.OpenKey(hive, key_path, 0, winreg.KEY_SET_VALUE)
-                    winreg.SetValueEx(key, value_name, 0, winreg.REG_SZ, value_data)
-                    winreg.CloseKey(key)
-                    self.logger.info(f"Startup item restored: {value_name}")
-                except:
-                    pass
-            self.removed_startup_items = []
-            
-            # Restore visual effects
-            if self.original_visual_effects is not None:
+            undone = 0
+            failed = 0
+            self.journal.record('undo_started', durable=True)
+            for record in self.journal.pending():
                 try:
-                    key = winreg.OpenKey(
-                        winreg.HKEY_CURRENT_USER, 
-                        r"Software\Microsoft\Windows\CurrentVersion\Explorer\VisualEffects", 
-                        0, 
-                        winreg.KEY_SET_VALUE
-                    )
-                    winreg.SetValueEx(key, "VisualFXSetting", 0, winreg.REG_DWORD, self.original_visual_effects)
-                    winreg.CloseKey(key)
-                    self.logger.info("Visual effects restored")
-                except:
-                    pass
-                self.original_visual_effects = None
+                    self.undo_record(record)
+                    self.journal.mark_undone(record['seq'])
+                    undone += 1
+                except Exception as e:
+                    failed += 1
+                    self.logger.error(f"Undo of {record['action']} #{record['seq']} failed: {str(e)}")
             
-            # Restore balanced power plan
-            try:
-                subprocess.run("powercfg /setactive 381b4222-f694-41f0-9685-ff5bb260df2e", shell=True, check=True)
-                self.logger.info("Power plan restored to balanced")
-            except:
-                pass
+            self.journal.record('undo_finished', durable=True)
+            self.journal.compact()
+            self.disabled_services = []
+            self.removed_startup_items = []
+            self.original_visual_effects = None
             
+            if failed:
+                return False, f"{undone} değişiklik geri alındı, {failed} değişiklik geri alınamadı"
             return True, "Tüm değişiklikler geri alındı"
         except Exception as e:
             self.logger.error(f"Undo operation failed: {str(e)}")
             return False, f"Geri alma işlemi başarısız: {str(e)}"
+    
+    def undo_record(self, record):
+        """Reverse one journaled change"""
+        action = record['action']
+        data = record['data']
+        
+        if action == 'service_disabled':
+            c = wmi.WMI()
+            for service in c.Win32_Service(Name=data['name']):
+                # WMI reports "Auto" but only accepts "Automatic" when setting it
+                start_mode = {"Auto": "Automatic"}.get(data['start_mode'], data['start_mode'])
+                service.ChangeStartMode(start_mode or "Automatic")
+                if data['was_running']:
+                    service.StartService()
+            self.logger.info(f"Service restored: {data['name']}")
+        
+        elif action == 'startup_removed':
+            key = winreg.OpenKey(data['hive'], data['key_path'], 0, winreg.KEY_SET_VALUE)
+            winreg.SetValueEx(key, data['value_name'], 0, data.get('value_type') or winreg.REG_SZ,
+                              data['value_data'])
+            winreg.CloseKey(key)
+            self.logger.info(f"Startup item restored: {data['value_name']}")
+        
+        elif action == 'registry_value_set':
+            key = winreg.OpenKey(data['hive'], data['key_path'], 0, winreg.KEY_SET_VALUE)
+            if data['old_value'] is None:
+                try:
+                    winreg.DeleteValue(key, data['name'])
+                except FileNotFoundError:
+                    pass
+            else:
+                winreg.SetValueEx(key, data['name'], 0, data['old_type'], data['old_value'])
+            winreg.CloseKey(key)
+            self.logger.info(f"Registry value restored: {data['name']}")
+        
+        elif action == 'power_plan_set':
+            # Balanced when the previous plan could not be read
+            previous = data.get('previous') or "381b4222-f694-41f0-9685-ff5bb260df2e"
+            subprocess.run(f"powercfg /setactive {previous}", shell=True, check=True)
+            self.logger.info(f"Power plan restored: {previous}")
+        
+        elif action == 'files_deleted':
+            restored = 0
+            for file_path, _, blob in data['files']:
+                if blob and self.journal.restore_blob(blob, file_path):
+                    restored += 1
+            if restored:
+                self.logger.info(f"Restored {restored} deleted files")
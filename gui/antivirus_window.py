@@ -289,7 +289,7 @@ class AntivirusWindow:
             values = self.results_tree.item(item)['values']
             file_path = values[0]
             
-            success, message = self.antivirus_scanner.quarantine_file(file_path)
+            success, message = self.antivirus_scanner.quarantine_file(file_path, values[2])
             if success:
                 quarantined_count += 1
                 self.results_tree.delete(item)
@@ -423,14 +423,22 @@ class QuarantineManager:
         self.button_frame.pack(fill="x")
     
     def load_quarantine_files(self):
-        """Load files from quarantine folder"""
+        """Load vault entries and files left in the quarantine folder by older versions"""
         self.file_listbox.delete(0, tk.END)
+        self.entries = []
+        
+        for entry in self.antivirus_scanner.quarantine_vault.list_entries():
+            quarantined_at = datetime.fromtimestamp(entry['quarantined_at']).strftime("%Y-%m-%d %H:%M")
+            file_name = os.path.basename(entry['original_path'])
+            self.entries.append((entry['id'], file_name))
+            self.file_listbox.insert(tk.END, f"{file_name}  ({quarantined_at})  {entry['reason'] or ''}")
         
         quarantine_folder = self.antivirus_scanner.quarantine_folder
         if os.path.exists(quarantine_folder):
-            files = os.listdir(quarantine_folder)
-            for file in files:
-                self.file_listbox.insert(tk.END, file)
+            for entry in os.scandir(quarantine_folder):
+                if entry.is_file() and not entry.name.startswith("quarantine.db"):
+                    self.entries.append((entry.path, entry.name))
+                    self.file_listbox.insert(tk.END, entry.name)
     
     def restore_file(self):
         """Restore selected file from quarantine"""
@@ -439,14 +447,13 @@ class QuarantineManager:
             messagebox.showwarning("Uyarı", "Geri yüklenecek dosyayı seçin!")
             return
         
-        file_name = self.file_listbox.get(selection[0])
-        quarantine_path = os.path.join(self.antivirus_scanner.quarantine_folder, file_name)
+        quarantine_id, file_name = self.entries[selection[0]]
         
         # Ask for restore location
         restore_path = filedialog.askdirectory(title="Geri Yükleme Konumunu Seçin")
         if restore_path:
             original_path = os.path.join(restore_path, file_name)
-            success, message = self.antivirus_scanner.restore_from_quarantine(quarantine_path, original_path)
+            success, message = self.antivirus_scanner.restore_from_quarantine(quarantine_id, original_path)
             
             if success:
                 messagebox.showinfo("Başarılı", "Dosya geri yüklendi.")
@@ -466,10 +473,11 @@ class QuarantineManager:
         if not result:
             return
         
-        file_name = self.file_listbox.get(selection[0])
-        quarantine_path = os.path.join(self.antivirus_scanner.quarantine_folder, file_name)
-        
-        success, message = self.antivirus_scanner.delete_file(quarantine_path)
+        quarantine_id, file_name = self.entries[selection[0]]
+        if isinstance(quarantine_id, str):
+            success, message = self.antivirus_scanner.delete_file(quarantine_id)
+        else:
+            success, message = self.antivirus_scanner.delete_from_quarantine(quarantine_id)
         if success:
             messagebox.showinfo("Başarılı", "Dosya silindi.")
             self.load_quarantine_files()
@@ -3161,7 +3161,8 @@ Admin Rights: {'Yes' if self.is_admin else 'No'}
             success_count = 0
             for threat in threats:
                 try:
-                    success, path = self.enhanced_antivirus.quarantine_file(threat['file_path'])
+                    success, entry_id = self.enhanced_antivirus.quarantine_file(
+                        threat['file_path'], "; ".join(threat['reasons']))
                     if success:
                         success_count += 1
                 except Exception as e:
@@ -489,29 +489,20 @@ class OptimizerPage:
             else:
                 # Fallback cache cleanup
                 import os
-                import shutil
+                from core.deletion_engine import DeletionEngine, EvictionPolicy
                 
-                # Clear common cache locations
-                cache_paths = [
+                # Temp and recent items are cleared, the browser cache is only
+                # trimmed so its hot entries survive
+                engine = DeletionEngine()
+                result = engine.clean([
                     os.path.expanduser("~\\AppData\\Local\\Temp"),
-                    os.path.expanduser("~\\AppData\\Local\\Microsoft\\Windows\\INetCache"),
                     os.path.expanduser("~\\AppData\\Roaming\\Microsoft\\Windows\\Recent")
-                ]
-                
-                cleared_count = 0
-                for cache_path in cache_paths:
-                    if os.path.exists(cache_path):
-                        try:
-                            for item in os.listdir(cache_path):
-                                item_path = os.path.join(cache_path, item)
-                                if os.path.isfile(item_path):
-                                    os.remove(item_path)
-                                    cleared_count += 1
-                                elif os.path.isdir(item_path):
-                                    shutil.rmtree(item_path, ignore_errors=True)
-                                    cleared_count += 1
-                        except:
-                            continue
+                ])
+                result.add(engine.evict({
+                    os.path.expanduser("~\\AppData\\Local\\Microsoft\\Windows\\INetCache"):
+                        EvictionPolicy(max_bytes=128 * 1024 * 1024, min_age_days=2)
+                }))
+                cleared_count = result.files_deleted
                 
                 print(f"[OPTIMIZER] Fallback cache cleanup: Cleared {cleared_count} items")
                 time.sleep(1)
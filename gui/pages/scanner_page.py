@@ -9,6 +9,8 @@ import threading
 import time
 import os
 from gui.modern_ui import HolographicCard, NeonProgressBar, AnimatedButton
+from core.scan_session import ScanSession
+from utils.progress_dispatcher import TkProgressDispatcher
 
 class ScannerPage:
     """Modern scanner interface with holographic design"""
@@ -18,6 +20,10 @@ class ScannerPage:
         self.main_window = main_window
         self.colors = main_window.colors
         self.scanning = False
+        self.session = None
+        # Set by the worker of the last session once it has saved its state
+        self.scan_done = None
+        self.waiting_for_scan = False
         
         self.create_scanner_interface()
     
@@ -169,6 +175,14 @@ class ScannerPage:
                                     font=('Segoe UI', 10))
         self.current_file.place(x=50, y=130)
         
+        # Pause / resume button
+        self.pause_scan_btn = AnimatedButton(progress_card, text="⏸️ Pause",
+                                            width=110, height=30,
+                                            bg_color=self.colors['accent_secondary'],
+                                            hover_color='#ff4da6',
+                                            command=self.toggle_pause)
+        self.pause_scan_btn.place(x=640, y=130)
+        
         # Visual scan representation
         visual_card = HolographicCard(viz_frame, width=350, height=200,
                                      title="🖼️ Scan Visual")
@@ -251,93 +265,177 @@ class ScannerPage:
         self.clean_tree.heading('#3', text='Last Modified')
         self.clean_tree.pack(fill='both', expand=True, padx=10, pady=10)
     
+    def get_scanner(self):
+        """Scanner core shared with the rest of the application"""
+        scanner = getattr(self.main_window, 'antivirus_scanner', None)
+        if scanner is None:
+            from core.antivirus_scanner import AntivirusScanner
+            scanner = self.main_window.antivirus_scanner = AntivirusScanner()
+        return scanner
+    
+    def when_previous_scan_done(self, start):
+        """Call start once a stopped session has finished its files and its last checkpoint
+        
+        The worker still posts to the Tk thread while it winds down, so it is
+        polled with after() rather than joined.
+        """
+        if self.scan_done is not None and not self.scan_done.is_set():
+            if not self.waiting_for_scan:
+                self.waiting_for_scan = True
+                self.update_progress(0, "Waiting for the stopped scan to save its progress...")
+            self.main_window.root.after(100, lambda: self.when_previous_scan_done(start))
+            return
+        
+        self.waiting_for_scan = False
+        start()
+    
+    def load_interrupted_session(self):
+        """Offer to continue a scan that was stopped or cut off by a restart"""
+        session = ScanSession.load(self.get_scanner())
+        if session is None:
+            return None
+        
+        # Files of a location cut off midway are not counted, their verdicts
+        # are kept and they are not checked again on resume
+        if messagebox.askyesno("Resume Scan",
+                               f"An unfinished {session.scan_type} scan was found "
+                               f"({len(session.completed_roots)} of {len(session.roots)} locations "
+                               f"finished, {len(session.results)} threats found so far).\n\n"
+                               f"Do you want to resume it?"):
+            return session
+        
+        ScanSession.discard()
+        return None
+    
     def start_quick_scan(self):
         """Start quick system scan"""
-        if self.scanning:
+        if self.scanning or self.waiting_for_scan:
             return
         
+        def begin():
+            scanner = self.get_scanner()
+            session = self.load_interrupted_session()
+            if session is None:
+                session = ScanSession(scanner, scanner.get_quick_scan_roots(), "quick")
+            self.run_session(session)
+        
+        self.when_previous_scan_done(begin)
+    
+    def start_full_scan(self):
+        """Start full system scan"""
+        if self.scanning or self.waiting_for_scan:
+            return
+        
+        def begin():
+            scanner = self.get_scanner()
+            session = self.load_interrupted_session()
+            if session is None:
+                messagebox.showinfo("Full Scan", "Full scan will take longer time.\n"
+                                    "It can be paused, or stopped and resumed later.")
+                session = ScanSession(scanner, scanner.get_full_scan_roots(), "full")
+            self.run_session(session)
+        
+        self.when_previous_scan_done(begin)
+    
+    def start_custom_scan(self):
+        """Start custom directory scan"""
+        if self.scanning or self.waiting_for_scan:
+            return
+        
+        def begin():
+            session = self.load_interrupted_session()
+            if session is None:
+                directory = filedialog.askdirectory(title="Select directory to scan")
+                if not directory:
+                    return
+                messagebox.showinfo("Custom Scan", f"Starting custom scan of:\n{directory}")
+                session = ScanSession(self.get_scanner(), [directory], "custom")
+            self.run_session(session)
+        
+        self.when_previous_scan_done(begin)
+    
+    def run_session(self, session):
+        """Run a scan session in a worker thread and mirror it in the page"""
+        self.session = session
         self.scanning = True
-        self.scan_start_time = time.time()
+        # A resumed session continues its clock where it stopped
+        self.scan_start_time = time.time() - session.elapsed
+        self.set_pause_button("⏸️ Pause")
+        
+        self.threats_tree.delete(*self.threats_tree.get_children())
+        results = session.results_snapshot()
+        for result in results:
+            self.add_threat_result(result['threat_type'], result['path'], result['severity'])
+        shown_threats = [len(results)]
+        
+        def post_new_threats():
+            # Scan threads add results while this runs, work on a copy
+            results = session.results_snapshot()
+            if len(results) == shown_threats[0]:
+                return
+            new_results = results[shown_threats[0]:]
+            shown_threats[0] = len(results)
+            for result in new_results:
+                self.main_window.root.after(0, lambda r=result: self.add_threat_result(
+                    r['threat_type'], r['path'], r['severity']))
+        
+        # The worker only records its latest state, Tk redraws it at a fixed rate
+        dispatcher = TkProgressDispatcher(self.main_window.root, self.update_scan_progress)
+        dispatcher.start()
+        
+        def progress_callback(progress, status):
+            dispatcher.post(progress, session.current_path or status, session.files_scanned)
+            post_new_threats()
+        
+        scan_done = self.scan_done = threading.Event()
         
         def scan_worker():
             try:
-                # Quick scan locations
-                scan_locations = [
-                    os.path.expanduser("~/Desktop"),
-                    os.path.expanduser("~/Downloads"),
-                    os.path.expanduser("~/Documents"),
-                    os.path.expandvars("%TEMP%"),
-                    "C:\\Windows\\System32"
-                ]
-                
-                total_files = 0
-                scanned_files = 0
-                threats_count = 0
-                
-                # Count total files first
-                for location in scan_locations:
-                    if os.path.exists(location):
-                        for root, dirs, files in os.walk(location):
-                            total_files += len(files)
-                
-                self.main_window.root.after(0, lambda: self.update_progress(0, f"Found {total_files} files to scan"))
-                
-                # Scan files
-                for location in scan_locations:
-                    if not self.scanning:
-                        break
-                        
-                    if os.path.exists(location):
-                        for root, dirs, files in os.walk(location):
-                            for file in files:
-                                if not self.scanning:
-                                    break
-                                    
-                                file_path = os.path.join(root, file)
-                                scanned_files += 1
-                                
-                                # Update progress
-                                progress = (scanned_files / total_files) * 100
-                                self.main_window.root.after(0, lambda p=progress, f=file_path: 
-                                                           self.update_scan_progress(p, f, scanned_files))
-                                
-                                # Simulate threat detection
-                                if file.lower().endswith(('.exe', '.bat', '.cmd', '.scr')) and 'temp' in file_path.lower():
-                                    threats_count += 1
-                                    self.main_window.root.after(0, lambda path=file_path: 
-                                                               self.add_threat_result("Suspicious File", path, "Medium"))
-                                
-                                time.sleep(0.001)  # Small delay for smooth progress
-                
-                # Scan complete
-                self.main_window.root.after(0, lambda: self.scan_complete(scanned_files, threats_count))
+                results = session.run(progress_callback)
+                post_new_threats()
+                self.main_window.root.after(0, lambda: self.session_finished(session, dispatcher, results))
                 
             except Exception as e:
+                self.main_window.root.after(0, dispatcher.stop)
                 self.main_window.root.after(0, lambda: self.scan_error(str(e)))
+            finally:
+                scan_done.set()
         
         threading.Thread(target=scan_worker, daemon=True).start()
     
-    def start_full_scan(self):
-        """Start full system scan"""
-        if self.scanning:
-            return
-        
-        messagebox.showinfo("Full Scan", "Full scan will take longer time.\nThis is a demonstration - scanning C:\\ drive.")
-        self.start_quick_scan()  # For demo, use quick scan logic
+    def session_finished(self, session, dispatcher, results):
+        """Show the outcome of a session run, called in the Tk thread"""
+        dispatcher.stop()
+        if session.state == ScanSession.COMPLETED:
+            self.scan_complete(session.files_scanned, len(results))
+        else:
+            self.update_progress(session.percent(), "Scan stopped - progress saved, it can be resumed later")
     
-    def start_custom_scan(self):
-        """Start custom directory scan"""
-        if self.scanning:
+    def set_pause_button(self, text):
+        """Relabel the pause/resume button"""
+        self.pause_scan_btn.text = text
+        self.pause_scan_btn.draw_button()
+    
+    def toggle_pause(self):
+        """Pause a running scan or resume a paused one"""
+        if not self.scanning or self.session is None:
             return
         
-        directory = filedialog.askdirectory(title="Select directory to scan")
-        if directory:
-            messagebox.showinfo("Custom Scan", f"Starting custom scan of:\n{directory}")
-            self.start_quick_scan()  # For demo, use quick scan logic
+        if self.session.state == ScanSession.PAUSED:
+            self.session.resume()
+            self.set_pause_button("⏸️ Pause")
+            self.update_progress(self.session.percent(), "Scanning...")
+        else:
+            self.session.pause()
+            self.set_pause_button("▶️ Resume")
+            self.update_progress(self.session.percent(), "Scan paused")
     
     def stop_scan(self):
-        """Stop current scan"""
+        """Stop current scan, its progress is kept for a later resume"""
+        if self.session is not None:
+            self.session.stop()
         self.scanning = False
+        self.set_pause_button("⏸️ Pause")
         self.update_progress(0, "Scan stopped by user")
         
         # Reset visual grid
@@ -6,6 +6,7 @@ import tkinter as tk
 import threading
 import time
 from gui.modern_ui import HolographicCard, AnimatedButton, NeonProgressBar, StatusIndicator
+from core.signature_store import get_signature_store
 
 class SecurityPage:
     def __init__(self, parent, main_window):
@@ -344,13 +345,24 @@ class SecurityPage:
         self.scan_status.config(text=f"Scan failed: {error}", fg=self.colors['danger'])
     
     def update_definitions(self):
-        """Update security definitions"""
+        """Update security definitions from the local delta files"""
         self.scan_status.config(text="Updating definitions...")
         
         def update_worker():
-            time.sleep(2)  # Simulate update
-            self.parent.after(0, lambda: self.scan_status.config(
-                text="Definitions updated successfully", fg=self.colors['success']))
+            try:
+                # Deltas are applied in place, running scanners see them immediately
+                store = get_signature_store()
+                applied = store.update_from_directory()
+                if applied:
+                    message = f"Definitions updated to version {store.version} ({applied} updates)"
+                else:
+                    message = f"Definitions are up to date (version {store.version})"
+                self.parent.after(0, lambda: self.scan_status.config(
+                    text=message, fg=self.colors['success']))
+            except Exception as e:
+                error = str(e)
+                self.parent.after(0, lambda: self.scan_status.config(
+                    text=f"Definition update failed: {error}", fg=self.colors['danger']))
             self.parent.after(3000, lambda: self.scan_status.config(
                 text="Ready to scan", fg=self.colors['text_primary']))
         
@@ -13,6 +13,7 @@ import threading
 from pathlib import Path
 from tkinter import messagebox
 import psutil
+from core.cleanup_planner import CleanupPlanner
 
 class PrivacyCleaner:
     def __init__(self, main_window):
@@ -20,6 +21,9 @@ class PrivacyCleaner:
         self.settings_file = "config/privacy_settings.json"
         self.scanning = False
         
+        # Sizes of cache and temp folders, refreshed only where directories changed
+        self.cleanup_planner = CleanupPlanner()
+        
         # Privacy categories
         self.privacy_categories = {
             'browser_data': {
@@ -695,19 +699,8 @@ class PrivacyCleaner:
             if not os.path.exists(cache_path):
                 return 0, 0
             
-            total_files = 0
-            total_size = 0
-            
-            for root, dirs, files in os.walk(cache_path):
-                total_files += len(files)
-                for file in files:
-                    try:
-                        file_path = os.path.join(root, file)
-                        total_size += os.path.getsize(file_path)
-                    except:
-                        pass
-            
-            return total_files, total_size
+            summary = self.cleanup_planner.summarize(cache_path)
+            return summary['files'], summary['bytes']
             
         except Exception as e:
             print(f"Cache scan error: {e}")
@@ -929,14 +922,8 @@ class PrivacyCleaner:
             total_size = 0
             
             if pattern == '*':
-                for root, dirs, files in os.walk(directory):
-                    total_files += len(files)
-                    for file in files:
-                        try:
-                            file_path = os.path.join(root, file)
-                            total_size += os.path.getsize(file_path)
-                        except:
-                            pass
+                summary = self.cleanup_planner.summarize(directory)
+                total_files, total_size = summary['files'], summary['bytes']
             else:
                 for file_path in glob.glob(os.path.join(directory, pattern)):
                     if os.path.isfile(file_path):
@@ -6,6 +6,7 @@ Ultra Modern Technological Interface
 import tkinter as tk
 import sys
 import os
+import multiprocessing
 
 # Hide console window on Windows (if running with python.exe instead of pythonw.exe)
 if sys.platform == "win32":
@@ -64,4 +65,6 @@ def main():
         sys.exit(1)
 
 if __name__ == "__main__":
+    # Required for the scanner process pool in frozen builds
+    multiprocessing.freeze_support()
     main()
@@ -6,6 +6,7 @@ Main Application Entry Point without Console Window
 import tkinter as tk
 import sys
 import os
+import multiprocessing
 
 # Hide console window on Windows
 if sys.platform == "win32":
@@ -81,4 +82,6 @@ def create_main_application(root):
         sys.exit(1)
 
 if __name__ == "__main__":
+    # Required for the scanner process pool in frozen builds
+    multiprocessing.freeze_support()
     main()
@@ -0,0 +1,115 @@
+"""
+Action Journal Test
+Records survive a reopen and a torn last line does not swallow the next record
+"""
+
+import os
+import sys
+import json
+import tempfile
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from core.action_journal import ActionJournal
+
+
+def read_lines(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+
+def test_records_survive_reopen():
+    """Records not undone are pending again after a reopen, newest first"""
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "journal.log")
+        journal = ActionJournal(path, os.path.join(folder, "blobs"))
+        first = journal.record('service_disabled', durable=True, name="Fax")
+        second = journal.record('service_disabled', durable=True, name="Spooler")
+        journal.mark_undone(first)
+        journal.close()
+
+        reopened = ActionJournal(path, os.path.join(folder, "blobs"))
+        assert [record['seq'] for record in reopened.pending()] == [second]
+        assert reopened.record('service_disabled', name="SysMain") > second
+        reopened.close()
+
+
+def test_torn_tail_is_cut_off():
+    """A half-written last line is dropped and the next record gets a line of its own"""
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "journal.log")
+        journal = ActionJournal(path, os.path.join(folder, "blobs"))
+        seq = journal.record('service_disabled', durable=True, name="Fax")
+        journal.close()
+
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write('{"seq": 2, "time": 0, "action": "serv')
+
+        reopened = ActionJournal(path, os.path.join(folder, "blobs"))
+        new_seq = reopened.record('startup_removed', durable=True, value_name="Updater")
+        reopened.close()
+
+        records = read_lines(path)
+        assert [record['seq'] for record in records] == [seq, new_seq]
+
+        again = ActionJournal(path, os.path.join(folder, "blobs"))
+        assert {record['seq'] for record in again.pending()} == {seq, new_seq}
+        again.close()
+
+
+def test_capture_and_restore():
+    """Small files are captured before deletion and can be written back once"""
+    with tempfile.TemporaryDirectory() as folder:
+        journal = ActionJournal(os.path.join(folder, "journal.log"), os.path.join(folder, "blobs"),
+                                capture_max_size=1024)
+        target = os.path.join(folder, "data.txt")
+        with open(target, 'wb') as f:
+            f.write(b"keep me")
+
+        blob = journal.capture(target, os.stat(target))
+        assert blob is not None
+        os.remove(target)
+
+        assert journal.restore_blob(blob, target)
+        with open(target, 'rb') as f:
+            assert f.read() == b"keep me"
+        assert not journal.restore_blob(blob, target)
+        journal.close()
+
+
+def test_interrupted_undo_survives_reopen_and_compaction():
+    """An undo_started without undo_finished is reported on the next open"""
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "journal.log")
+        journal = ActionJournal(path, os.path.join(folder, "blobs"))
+        first = journal.record('service_disabled', durable=True, name="Fax")
+        second = journal.record('service_disabled', durable=True, name="Spooler")
+        journal.record('undo_started', durable=True)
+        journal.mark_undone(second)
+        journal.close()
+
+        reopened = ActionJournal(path, os.path.join(folder, "blobs"))
+        assert reopened.undo_interrupted
+        assert [record['seq'] for record in reopened.pending()] == [first]
+        reopened.compact()
+        reopened.close()
+
+        compacted = ActionJournal(path, os.path.join(folder, "blobs"))
+        assert compacted.undo_interrupted
+        compacted.mark_undone(first)
+        compacted.record('undo_finished', durable=True)
+        assert not compacted.undo_interrupted and compacted.pending() == []
+        compacted.close()
+
+        finished = ActionJournal(path, os.path.join(folder, "blobs"))
+        assert not finished.undo_interrupted
+        finished.close()
+
+
+if __name__ == "__main__":
+    test_records_survive_reopen()
+    test_torn_tail_is_cut_off()
+    test_capture_and_restore()
+    test_interrupted_undo_survives_reopen_and_compaction()
+    print("✅ Action journal tests passed")
@@ -0,0 +1,145 @@
+"""
+Archive Inspector Test
+Members streamed out of zip, tar and 7z archives, and the limits that stop archive bombs
+"""
+
+import io
+import os
+import sys
+import hashlib
+import tarfile
+import tempfile
+import zipfile
+
+import pytest
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from core.archive_inspector import ArchiveInspector
+from core.content_matcher import ContentMatcher
+
+PAYLOAD = b"MZ header then CreateRemoteThread somewhere inside"
+
+
+def write_zip(folder, name, members, directories=()):
+    path = os.path.join(folder, name)
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+        for directory in directories:
+            zip_file.writestr(directory + "/", b"")
+        for member_name, data in members.items():
+            zip_file.writestr(member_name, data)
+    return path
+
+
+def write_tar(folder, name, members, extra=()):
+    path = os.path.join(folder, name)
+    with tarfile.open(path, 'w:gz') as tar_file:
+        for info, data in extra:
+            tar_file.addfile(info, io.BytesIO(data) if data else None)
+        for member_name, data in members.items():
+            info = tarfile.TarInfo(member_name)
+            info.size = len(data)
+            tar_file.addfile(info, io.BytesIO(data))
+    return path
+
+
+def test_members_are_hashed_and_matched():
+    matcher = ContentMatcher([b"CreateRemoteThread"])
+    with tempfile.TemporaryDirectory() as folder:
+        inner = io.BytesIO()
+        with zipfile.ZipFile(inner, 'w') as zip_file:
+            zip_file.writestr("dropper.exe", PAYLOAD)
+        path = write_zip(folder, "outer.zip", {"readme.txt": b"hello", "inner.zip": inner.getvalue()})
+
+        report = ArchiveInspector().inspect(path, matcher)
+        members = {member[0]: member for member in report['members']}
+        assert report['limit_exceeded'] is None
+        assert members["outer.zip!readme.txt"][2] == hashlib.md5(b"hello").hexdigest()
+        assert members["outer.zip!readme.txt"][4] is None
+        nested = members["outer.zip!inner.zip!dropper.exe"]
+        assert nested[3] == hashlib.sha256(PAYLOAD).hexdigest()
+        assert nested[4] == b"CreateRemoteThread"
+
+
+def test_directory_entries_count_against_the_entry_limit():
+    inspector = ArchiveInspector(max_entries=10)
+    with tempfile.TemporaryDirectory() as folder:
+        directories = [f"dir{index}" for index in range(50)]
+        report = inspector.inspect(write_zip(folder, "dirs.zip", {}, directories))
+        assert report['limit_exceeded'] == "too many entries"
+        assert report['entries'] == 11
+
+        extra = []
+        for directory in directories:
+            info = tarfile.TarInfo(directory)
+            info.type = tarfile.DIRTYPE
+            extra.append((info, None))
+        report = inspector.inspect(write_tar(folder, "dirs.tar.gz", {}, extra))
+        assert report['limit_exceeded'] == "too many entries"
+        assert report['entries'] == 11
+
+
+def test_decompressed_bytes_limit():
+    inspector = ArchiveInspector(max_total_bytes=100 * 1024, chunk_size=16 * 1024)
+    with tempfile.TemporaryDirectory() as folder:
+        path = write_zip(folder, "large.zip", {"first.bin": os.urandom(64 * 1024),
+                                               "second.bin": os.urandom(64 * 1024)})
+        report = inspector.inspect(path)
+        assert report['limit_exceeded'] == "too much decompressed data"
+        assert report['bytes'] <= 100 * 1024 + 16 * 1024
+
+        # Payloads of entries that are not inspected are still decompressed
+        skipped = tarfile.TarInfo("volume")
+        skipped.type = b"Y"
+        skipped.size = 200 * 1024
+        path = write_tar(folder, "skipped.tar.gz", {"small.txt": b"x"},
+                         [(skipped, os.urandom(skipped.size))])
+        report = inspector.inspect(path)
+        assert report['limit_exceeded'] == "too much decompressed data"
+        assert report['members'] == []
+
+
+def test_compression_ratio_limit():
+    inspector = ArchiveInspector(max_ratio=100, min_ratio_bytes=1024 * 1024)
+    with tempfile.TemporaryDirectory() as folder:
+        path = write_zip(folder, "bomb.zip", {"zeros.bin": bytes(16 * 1024 * 1024)})
+        report = inspector.inspect(path)
+        assert report['limit_exceeded'] == "compression ratio too high"
+        assert report['bytes'] <= max(1024 * 1024, os.path.getsize(path) * 100) + inspector.chunk_size
+
+        # Small archives may compress as well as they like
+        path = write_zip(folder, "sparse.zip", {"zeros.bin": bytes(512 * 1024)})
+        assert ArchiveInspector(max_ratio=100, min_ratio_bytes=1024 * 1024).inspect(path)['limit_exceeded'] is None
+
+
+def test_seven_zip_members_are_streamed():
+    py7zr = pytest.importorskip("py7zr")
+    matcher = ContentMatcher([b"CreateRemoteThread"])
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "sample.7z")
+        with py7zr.SevenZipFile(path, 'w') as seven_zip:
+            seven_zip.writestr(PAYLOAD, "bin/dropper.exe")
+            seven_zip.writestr(b"hello", "readme.txt")
+
+        inspector = ArchiveInspector()
+        assert inspector.archive_kind(path) == "7z"
+        report = inspector.inspect(path, matcher)
+        members = {member[1]: member for member in report['members']}
+        assert report['limit_exceeded'] is None
+        assert members["bin/dropper.exe"][2] == hashlib.md5(PAYLOAD).hexdigest()
+        assert members["bin/dropper.exe"][4] == b"CreateRemoteThread"
+        assert members["readme.txt"][4] is None
+
+        report = ArchiveInspector(max_total_bytes=16).inspect(path, matcher)
+        assert report['limit_exceeded'] == "too much decompressed data"
+        assert report['members'] == []
+
+
+if __name__ == "__main__":
+    test_members_are_hashed_and_matched()
+    test_directory_entries_count_against_the_entry_limit()
+    test_decompressed_bytes_limit()
+    test_compression_ratio_limit()
+    test_seven_zip_members_are_streamed()
+    print("✅ Archive inspector tests passed")
@@ -0,0 +1,141 @@
+"""
+Deletion Engine Test
+Emptying folders, least recently used eviction and the bytes a deletion really frees
+"""
+
+import os
+import sys
+import time
+import tempfile
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from core.action_journal import ActionJournal
+from core.deletion_engine import DeletionEngine, EvictionPolicy, freed_size, unique_roots
+
+DAY = 86400
+
+
+def write(path, size, age_days=0):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(b"x" * size)
+    used = time.time() - age_days * DAY
+    os.utime(path, (used, used))
+    return path
+
+
+def test_clean_empties_folders_but_keeps_them():
+    with tempfile.TemporaryDirectory() as folder:
+        root = os.path.join(folder, "temp")
+        write(os.path.join(root, "a.tmp"), 100)
+        write(os.path.join(root, "nested", "deeper", "b.tmp"), 50)
+
+        result = DeletionEngine().clean([root, root + os.sep, os.path.join(root, "nested")])
+        assert result.files_deleted == 2
+        assert result.bytes_freed == 150
+        assert result.dirs_removed == 2
+        assert os.listdir(root) == []
+
+
+def test_clean_respects_veto():
+    with tempfile.TemporaryDirectory() as folder:
+        keep = write(os.path.join(folder, "keep.log"), 10)
+        write(os.path.join(folder, "drop.tmp"), 10)
+
+        result = DeletionEngine().clean([folder], should_delete=lambda path, file_stat: path != keep)
+        assert result.files_deleted == 1
+        assert os.listdir(folder) == ["keep.log"]
+
+
+def test_unique_roots_drops_duplicates_and_nested_roots():
+    with tempfile.TemporaryDirectory() as folder:
+        inner = os.path.join(folder, "a", "b")
+        os.makedirs(inner)
+        other = os.path.join(folder, "ab")
+        os.makedirs(other)
+        assert sorted(unique_roots([inner, folder, other, folder, os.path.join(folder, "missing")])) == [folder]
+        assert sorted(unique_roots([inner, other])) == sorted([inner, other])
+
+
+def test_policy_evicts_least_recently_used_files_first():
+    with tempfile.TemporaryDirectory() as folder:
+        entries = [(write(os.path.join(folder, f"f{age}"), 100, age), None) for age in (1, 5, 10, 20)]
+        entries = [(path, os.stat(path)) for path, _ in entries]
+
+        selected = EvictionPolicy(max_bytes=200).select(entries)
+        assert [os.path.basename(path) for path, _ in selected] == ["f20", "f10"]
+
+        # Files used recently are kept even if the folder stays over budget
+        selected = EvictionPolicy(max_bytes=0, min_age_days=7).select(entries)
+        assert [os.path.basename(path) for path, _ in selected] == ["f20", "f10"]
+
+        selected = EvictionPolicy(min_age_days=3).select(entries)
+        assert [os.path.basename(path) for path, _ in selected] == ["f20", "f10", "f5"]
+
+
+def test_evict_keeps_directories_and_dedupes_nested_roots():
+    with tempfile.TemporaryDirectory() as folder:
+        write(os.path.join(folder, "old", "a"), 100, 30)
+        write(os.path.join(folder, "old", "b"), 100, 20)
+        write(os.path.join(folder, "new", "c"), 100, 0)
+
+        policies = {
+            folder: EvictionPolicy(max_bytes=150, min_age_days=7),
+            # Nested in folder, its own policy is not applied a second time
+            os.path.join(folder, "new"): EvictionPolicy(max_bytes=0),
+        }
+        result = DeletionEngine().evict(policies)
+        assert result.files_deleted == 2
+        assert result.bytes_freed == 200
+        assert sorted(os.listdir(folder)) == ["new", "old"]
+        assert os.listdir(os.path.join(folder, "new")) == ["c"]
+
+
+def test_hard_links_free_nothing():
+    if not hasattr(os, "link"):
+        return
+
+    with tempfile.TemporaryDirectory() as folder:
+        original = write(os.path.join(folder, "data", "original"), 1000)
+        linked = os.path.join(folder, "link")
+        os.link(original, linked)
+        assert freed_size(linked, os.stat(linked)) == 0
+
+        result = DeletionEngine().clean([os.path.join(folder, "data")])
+        assert result.files_deleted == 1
+        assert result.bytes_freed == 0
+        assert freed_size(linked, os.stat(linked)) == 1000
+
+
+def test_every_deletion_is_journaled_and_small_files_captured():
+    with tempfile.TemporaryDirectory() as folder:
+        journal = ActionJournal(os.path.join(folder, "journal.log"), os.path.join(folder, "blobs"),
+                                capture_max_size=100)
+        root = os.path.join(folder, "temp")
+        small = write(os.path.join(root, "small.tmp"), 10)
+        large = write(os.path.join(root, "large.tmp"), 1000)
+
+        DeletionEngine(journal=journal).clean([root])
+        files = {path: blob for record in journal.pending(['files_deleted'])
+                 for path, _, blob in record['data']['files']}
+        assert set(files) == {small, large}
+        assert files[small] and files[large] is None
+
+        # Deletions that cannot be undone are still kept by compaction
+        journal.compact()
+        assert len(journal.pending(['files_deleted'])) == 1
+        assert journal.restore_blob(files[small], small)
+        journal.close()
+
+
+if __name__ == "__main__":
+    test_clean_empties_folders_but_keeps_them()
+    test_clean_respects_veto()
+    test_unique_roots_drops_duplicates_and_nested_roots()
+    test_policy_evicts_least_recently_used_files_first()
+    test_evict_keeps_directories_and_dedupes_nested_roots()
+    test_hard_links_free_nothing()
+    test_every_deletion_is_journaled_and_small_files_captured()
+    print("✅ Deletion engine tests passed")
@@ -0,0 +1,82 @@
+"""
+Hash Cache Test
+Digests are reused only for unchanged files, merged across scanners and trimmed to size
+"""
+
+import os
+import sys
+import tempfile
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from core.hash_cache import HashCache
+
+
+def make_files(folder, count):
+    files = []
+    for index in range(count):
+        path = os.path.join(folder, f"file{index}")
+        with open(path, 'w') as f:
+            f.write(str(index))
+        files.append((path, os.stat(path)))
+    return files
+
+
+def test_changed_file_misses():
+    with tempfile.TemporaryDirectory() as folder:
+        cache = HashCache(os.path.join(folder, "hashes.db"))
+        (path, file_stat), = make_files(folder, 1)
+        cache.put(path, file_stat, "md5", "sha256")
+        assert cache.get(path, file_stat) == ("md5", "sha256")
+
+        with open(path, 'w') as f:
+            f.write("different length")
+        assert cache.get(path, os.stat(path)) is None
+        cache.close()
+
+
+def test_md5_only_put_keeps_known_sha256():
+    with tempfile.TemporaryDirectory() as folder:
+        cache = HashCache(os.path.join(folder, "hashes.db"))
+        (path, file_stat), = make_files(folder, 1)
+        cache.put(path, file_stat, "md5", "sha256")
+        cache.put(path, file_stat, "md5", None)
+        assert cache.get(path, file_stat) == ("md5", "sha256")
+
+        # A changed file keeps none of its old digests
+        with open(path, 'w') as f:
+            f.write("different length")
+        new_stat = os.stat(path)
+        cache.put(path, new_stat, "md5-new", None)
+        assert cache.get(path, new_stat) == ("md5-new", None)
+        cache.close()
+
+
+def test_least_recently_used_entries_are_evicted():
+    with tempfile.TemporaryDirectory() as folder:
+        db_path = os.path.join(folder, "hashes.db")
+        cache = HashCache(db_path, max_entries=4, commit_interval=2)
+        files = make_files(folder, 6)
+        for path, file_stat in files[:4]:
+            cache.put(path, file_stat, "md5", "sha256")
+        cache.flush()
+        # A hit makes the oldest entry recent again
+        assert cache.get(*files[0]) is not None
+        for path, file_stat in files[4:]:
+            cache.put(path, file_stat, "md5", "sha256")
+        cache.close()
+
+        reopened = HashCache(db_path, max_entries=4)
+        assert reopened.row_count == 4
+        assert reopened.get(*files[0]) is not None
+        assert reopened.get(*files[1]) is None
+        assert reopened.get(*files[2]) is None
+        reopened.close()
+
+
+if __name__ == "__main__":
+    test_changed_file_misses()
+    test_md5_only_put_keeps_known_sha256()
+    test_least_recently_used_entries_are_evicted()
+    print("✅ Hash cache tests passed")
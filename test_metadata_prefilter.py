@@ -0,0 +1,86 @@
+"""
+Metadata Prefilter Test
+Stat-only verdicts and the reads each file is sent to, judged by a real scanner
+"""
+
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+# The scanner needs the full set of runtime dependencies
+pytest.importorskip("requests")
+
+from core.enhanced_antivirus import EnhancedAntivirusScanner
+from core.metadata_prefilter import MetadataPrefilter
+from core.signature_store import SignatureStore, build_signature_file
+
+
+@pytest.fixture(scope="module")
+def prefilter(tmp_path_factory):
+    # Signatures of files of 5 bytes only, every other size is ruled out
+    db_path = str(tmp_path_factory.mktemp("signatures") / "signatures.db")
+    build_signature_file(db_path, {"5d41402abc4b2a76b9719d911017c592": "Known trojan signature"},
+                         sizes={"5d41402abc4b2a76b9719d911017c592": 5})
+    scanner = EnhancedAntivirusScanner()
+    scanner.signature_store = SignatureStore(db_path)
+    yield MetadataPrefilter(scanner)
+    scanner.signature_store.close()
+
+
+def evaluate(prefilter, folder, files):
+    entries = []
+    for name, data in files.items():
+        path = os.path.join(folder, name)
+        with open(path, 'wb') as f:
+            f.write(data)
+        entries.append((path, os.stat(path)))
+    return {os.path.basename(plan.file_path): plan for plan in prefilter.evaluate(entries)}
+
+
+def test_only_files_of_a_signature_size_are_hashed(prefilter):
+    with tempfile.TemporaryDirectory() as folder:
+        plans = evaluate(prefilter, folder, {"notes.txt": b"hello", "photo.jpg": b"\xff\xd8", "blob.bin": b"\0"})
+        for plan in plans.values():
+            assert not plan.skip
+            assert plan.threat_level == 0
+            assert not (plan.needs_content or plan.needs_pe or plan.needs_archive)
+        assert plans["notes.txt"].needs_hash
+        assert not plans["photo.jpg"].needs_hash
+        assert not plans["blob.bin"].needs_hash
+
+
+def test_suspicious_files_are_hashed_whatever_their_size(prefilter):
+    with tempfile.TemporaryDirectory() as folder:
+        plans = evaluate(prefilter, folder, {"run.bat": b"@echo off", "empty.txt": b"", "virus.txt": b"abc"})
+        assert all(plan.needs_hash for plan in plans.values())
+
+
+def test_suspicious_names_and_executables(prefilter):
+    with tempfile.TemporaryDirectory() as folder:
+        plans = evaluate(prefilter, folder, {"crack_keygen.exe": b"MZ", "setup.exe": b"MZ" + b"\0" * 4096})
+        crack = plans["crack_keygen.exe"]
+        assert crack.threat_level >= 5
+        assert any("crack" in reason for reason in crack.reasons)
+        assert crack.needs_content and crack.needs_pe
+
+        setup = plans["setup.exe"]
+        assert setup.needs_pe
+        assert "Potentially dangerous file extension: .exe" in setup.reasons
+
+
+def test_active_content_and_archives_are_read(prefilter):
+    with tempfile.TemporaryDirectory() as folder:
+        plans = evaluate(prefilter, folder, {"report.docm": b"PK", "bundle.zip": b"PK", "logs.tar.gz": b"\x1f\x8b"})
+        assert plans["report.docm"].needs_content and plans["report.docm"].needs_archive
+        assert plans["bundle.zip"].needs_archive
+        assert plans["logs.tar.gz"].needs_archive
+        assert not plans["bundle.zip"].needs_pe
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,136 @@
+"""
+PE Analyzer Test
+Header parsing of small generated executables and the scores given to them
+"""
+
+import os
+import sys
+import struct
+import tempfile
+
+import pytest
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from core.pe_analyzer import analyze_pe_file, parse_pe, score_pe
+
+SECTION_CODE = 0x60000020
+SECTION_DATA = 0xC0000040
+SECTION_WRITE = 0x80000000
+IMAGE_FILE_DLL = 0x2000
+
+
+def build_pe(functions=("ExitProcess",), entry_point=0x1000, code_flags=SECTION_CODE,
+             characteristics=0x0102, code=b"\x90" * 0x1000):
+    """A 32-bit image with a code section at 0x1000 and an import section at 0x2000"""
+    dos = bytearray(64)
+    dos[:2] = b"MZ"
+    struct.pack_into("<I", dos, 0x3c, 64)
+    coff = struct.pack("<4sHHIIIHH", b"PE\0\0", 0x14c, 2, 1600000000, 0, 0, 224, characteristics)
+
+    optional = bytearray(224)
+    struct.pack_into("<H", optional, 0, 0x10b)
+    struct.pack_into("<I", optional, 16, entry_point)
+    struct.pack_into("<H", optional, 68, 2)
+    struct.pack_into("<I", optional, 92, 16)
+    struct.pack_into("<II", optional, 104, 0x2000, 40)
+
+    code_section = struct.pack("<8sIIIIIIHHI", b".text", 0x1000, 0x1000, 0x1000, 0x400, 0, 0, 0, 0, code_flags)
+    import_section = struct.pack("<8sIIIIIIHHI", b".idata", 0x1000, 0x2000, 0x1000, 0x1400, 0, 0, 0, 0,
+                                 SECTION_DATA)
+    headers = bytes(dos) + coff + bytes(optional) + code_section + import_section
+    headers += b"\0" * (0x400 - len(headers))
+
+    # One import descriptor, its lookup table at +0x100, DLL name at +0x300, hint/names from +0x400
+    imports = bytearray(0x1000)
+    struct.pack_into("<IIIII", imports, 0, 0x2100, 0, 0, 0x2300, 0x2100)
+    imports[0x300:0x300 + 12] = b"kernel32.dll"
+    offset = 0x400
+    for index, function in enumerate(functions):
+        struct.pack_into("<I", imports, 0x100 + 4 * index, 0x2000 + offset)
+        imports[offset + 2:offset + 2 + len(function)] = function.encode()
+        offset += len(function) + 3
+
+    return headers + code + bytes(imports)
+
+
+def write_file(folder, name, data):
+    path = os.path.join(folder, name)
+    with open(path, 'wb') as f:
+        f.write(data)
+    return path
+
+
+def test_plain_executable_scores_nothing():
+    with tempfile.TemporaryDirectory() as folder:
+        info = analyze_pe_file(write_file(folder, "plain.exe", build_pe()))
+        assert info['malformed'] is False
+        assert info['entry_section'] == ".text"
+        assert info['imports'] == {"kernel32.dll": ["ExitProcess"]}
+        assert score_pe(info) == (0, [])
+
+
+def test_injection_imports_are_scored():
+    info = parse_pe(build_pe(functions=("VirtualAllocEx", "WriteProcessMemory", "CreateRemoteThread")))
+    score, reasons = score_pe(info)
+    assert score >= 3
+    assert "Imports APIs used for process injection" in reasons
+
+
+def test_writable_code_and_high_entropy_are_scored():
+    info = parse_pe(build_pe(code_flags=SECTION_CODE | SECTION_WRITE, code=os.urandom(0x1000)))
+    _, reasons = score_pe(info)
+    assert "Writable and executable section .text" in reasons
+    assert any(reason.startswith("High entropy code section .text") for reason in reasons)
+
+
+def test_entry_point_outside_sections():
+    _, reasons = score_pe(parse_pe(build_pe(entry_point=0x9000)))
+    assert "Entry point outside all sections" in reasons
+
+
+def test_dll_without_entry_point_is_not_flagged():
+    info = parse_pe(build_pe(entry_point=0, characteristics=0x0102 | IMAGE_FILE_DLL))
+    assert info['is_dll']
+    assert score_pe(info) == (0, [])
+
+
+def test_fixed_compile_timestamp_is_not_scored():
+    data = bytearray(build_pe())
+    # Reproducible builds often write 0 or a constant far in the past
+    struct.pack_into("<I", data, 64 + 8, 1)
+    assert score_pe(parse_pe(bytes(data))) == (0, [])
+
+
+def test_non_pe_and_malformed_files():
+    with tempfile.TemporaryDirectory() as folder:
+        assert analyze_pe_file(write_file(folder, "text.exe", b"just some text, not an image" * 4)) is None
+        assert analyze_pe_file(write_file(folder, "tiny.exe", b"MZ")) is None
+
+    broken = bytearray(build_pe())
+    broken[64:68] = b"XX\0\0"
+    assert score_pe(parse_pe(bytes(broken))) == (3, ["Malformed PE header"])
+
+
+def test_unreadable_headers_leave_other_checks():
+    pytest.importorskip("requests")
+    from core.antivirus_scanner import AntivirusScanner
+
+    with tempfile.TemporaryDirectory() as folder:
+        file_stat = os.stat(write_file(folder, "app.exe", build_pe()))
+        # The headers of a directory cannot be read, its recent ctime still counts
+        assert AntivirusScanner().analyze_executable(folder, file_stat) == (
+            True, "Recently created executable (potential malware)")
+
+
+if __name__ == "__main__":
+    test_plain_executable_scores_nothing()
+    test_injection_imports_are_scored()
+    test_writable_code_and_high_entropy_are_scored()
+    test_entry_point_outside_sections()
+    test_dll_without_entry_point_is_not_flagged()
+    test_fixed_compile_timestamp_is_not_scored()
+    test_non_pe_and_malformed_files()
+    test_unreadable_headers_leave_other_checks()
+    print("✅ PE analyzer tests passed")
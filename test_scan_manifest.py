@@ -0,0 +1,161 @@
+"""
+Scan Manifest Test
+Verdicts are reused only for unchanged files and dropped with the files they belong to
+"""
+
+import os
+import sys
+import tempfile
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from core.scan_manifest import ScanManifest
+from utils.file_walker import WalkProgress
+
+
+class Evaluator:
+    """Counts the files a walk really evaluates, files named bad* are threats"""
+
+    def __init__(self):
+        self.evaluated = []
+
+    def __call__(self, file_path, file_stat):
+        self.evaluated.append(os.path.basename(file_path))
+        if os.path.basename(file_path).startswith("bad"):
+            return {'threat_type': "Test", 'severity': "High", 'description': "test threat"}
+        return None
+
+
+def write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        f.write(data)
+
+
+def walk(manifest, root, **kwargs):
+    evaluate = Evaluator()
+    verdicts = dict(manifest.walk(root, evaluate, WalkProgress(), **kwargs))
+    return evaluate.evaluated, verdicts
+
+
+def make_tree(root):
+    write(os.path.join(root, "a.txt"), "a")
+    write(os.path.join(root, "bad.exe"), "b")
+    write(os.path.join(root, "sub", "c.txt"), "c")
+    write(os.path.join(root, "sub", "deep", "d.txt"), "d")
+
+
+def test_unchanged_files_keep_their_verdicts():
+    with tempfile.TemporaryDirectory() as folder:
+        root = os.path.join(folder, "root")
+        make_tree(root)
+        manifest = ScanManifest(os.path.join(folder, "manifest.db"))
+
+        evaluated, verdicts = walk(manifest, root)
+        assert sorted(evaluated) == ["a.txt", "bad.exe", "c.txt", "d.txt"]
+        assert verdicts[os.path.join(root, "bad.exe")]['threat_type'] == "Test"
+
+        evaluated, verdicts = walk(manifest, root)
+        assert evaluated == []
+        assert verdicts[os.path.join(root, "bad.exe")]['threat_type'] == "Test"
+        assert verdicts[os.path.join(root, "a.txt")] is None
+
+
+def test_file_rewritten_in_place_is_evaluated_again():
+    with tempfile.TemporaryDirectory() as folder:
+        root = os.path.join(folder, "root")
+        make_tree(root)
+        manifest = ScanManifest(os.path.join(folder, "manifest.db"))
+        walk(manifest, root)
+
+        # Rewriting a file does not change its directory's mtime
+        directory = os.path.join(root, "sub")
+        dir_stat = os.stat(directory)
+        write(os.path.join(directory, "c.txt"), "changed content")
+        os.utime(directory, ns=(dir_stat.st_atime_ns, dir_stat.st_mtime_ns))
+
+        evaluated, _ = walk(manifest, root)
+        assert evaluated == ["c.txt"]
+
+
+def test_reuse_false_evaluates_everything():
+    with tempfile.TemporaryDirectory() as folder:
+        root = os.path.join(folder, "root")
+        make_tree(root)
+        manifest = ScanManifest(os.path.join(folder, "manifest.db"))
+        walk(manifest, root)
+
+        evaluated, _ = walk(manifest, root, reuse=False)
+        assert len(evaluated) == 4
+
+
+def test_uncacheable_verdicts_are_not_stored():
+    with tempfile.TemporaryDirectory() as folder:
+        root = os.path.join(folder, "root")
+        make_tree(root)
+        manifest = ScanManifest(os.path.join(folder, "manifest.db"))
+
+        walk(manifest, root, cacheable=lambda file_stat: False)
+        evaluated, _ = walk(manifest, root)
+        assert len(evaluated) == 4
+
+
+def test_version_change_drops_verdicts():
+    with tempfile.TemporaryDirectory() as folder:
+        root = os.path.join(folder, "root")
+        make_tree(root)
+        manifest = ScanManifest(os.path.join(folder, "manifest.db"))
+        manifest.sync_version("sig1:rules1")
+        walk(manifest, root)
+
+        manifest.sync_version("sig1:rules1")
+        assert walk(manifest, root)[0] == []
+
+        manifest.sync_version("sig2:rules1")
+        assert len(walk(manifest, root)[0]) == 4
+
+
+def test_removed_directories_are_pruned():
+    with tempfile.TemporaryDirectory() as folder:
+        root = os.path.join(folder, "root")
+        make_tree(root)
+        manifest = ScanManifest(os.path.join(folder, "manifest.db"))
+        walk(manifest, root)
+
+        deep = os.path.join(root, "sub", "deep")
+        os.remove(os.path.join(deep, "d.txt"))
+        os.rmdir(deep)
+        walk(manifest, root)
+        assert manifest.get_directory(deep) == {}
+        assert "c.txt" in manifest.get_directory(os.path.join(root, "sub"))
+
+
+def test_walk_closed_early_keeps_what_was_evaluated():
+    with tempfile.TemporaryDirectory() as folder:
+        root = os.path.join(folder, "root")
+        for index in range(20):
+            write(os.path.join(root, f"dir{index}", "file.txt"), str(index))
+        manifest = ScanManifest(os.path.join(folder, "manifest.db"))
+
+        evaluate = Evaluator()
+        verdicts = manifest.walk(root, evaluate, WalkProgress(), workers=1)
+        for _ in range(5):
+            next(verdicts)
+        verdicts.close()
+
+        # Nothing was pruned and the evaluated files are not evaluated again
+        evaluated, seen = walk(manifest, root)
+        assert len(seen) == 20
+        assert len(evaluated) == 20 - len(evaluate.evaluated)
+
+
+if __name__ == "__main__":
+    test_unchanged_files_keep_their_verdicts()
+    test_file_rewritten_in_place_is_evaluated_again()
+    test_reuse_false_evaluates_everything()
+    test_uncacheable_verdicts_are_not_stored()
+    test_version_change_drops_verdicts()
+    test_removed_directories_are_pruned()
+    test_walk_closed_early_keeps_what_was_evaluated()
+    print("✅ Scan manifest tests passed")
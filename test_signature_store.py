@@ -0,0 +1,174 @@
+"""
+Signature Store Test
+Lookups in the mapped database, delta updates and concurrent lookups during a swap
+"""
+
+import os
+import sys
+import hashlib
+import tempfile
+import threading
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from core.signature_store import (SignatureStore, build_signature_file, write_signature_delta,
+                                  BUILTIN_SIGNATURES)
+
+
+def md5(text):
+    return hashlib.md5(text.encode()).hexdigest()
+
+
+def sha256(text):
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def make_store(folder, signatures, version=1):
+    db_path = os.path.join(folder, "signatures.db")
+    build_signature_file(db_path, signatures, version)
+    return SignatureStore(db_path)
+
+
+def test_new_store_is_seeded_with_builtin_signatures():
+    with tempfile.TemporaryDirectory() as folder:
+        store = SignatureStore(os.path.join(folder, "signatures.db"))
+        assert len(store) == len(BUILTIN_SIGNATURES)
+        for hex_digest, name in BUILTIN_SIGNATURES.items():
+            assert store.lookup(hex_digest) == name
+        assert store.may_match_size(68)
+        assert not store.may_match_size(7)
+        store.close()
+
+
+def test_lookup_md5_sha256_and_fingerprint():
+    fingerprint = "ab" * 24
+    signatures = {md5(f"md5-{i}"): f"Trojan {i % 7}" for i in range(500)}
+    signatures.update({sha256(f"sha-{i}"): "Worm" for i in range(500)})
+    signatures[fingerprint] = "Large dropper"
+
+    with tempfile.TemporaryDirectory() as folder:
+        store = make_store(folder, signatures)
+        assert len(store) == len(signatures)
+        for hex_digest, name in signatures.items():
+            assert store.lookup(hex_digest) == name
+            assert store.lookup(hex_digest.upper()) == name
+        assert store.lookup(md5("clean")) is None
+        assert store.lookup(sha256("clean")) is None
+        assert store.lookup("not a digest") is None
+        assert store.lookup("") is None
+        store.close()
+
+
+def test_delta_adds_and_removes():
+    with tempfile.TemporaryDirectory() as folder:
+        store = make_store(folder, {md5("old"): "Old threat", md5("kept"): "Kept threat"})
+        delta_path = os.path.join(folder, "1-2.delta")
+        write_signature_delta(delta_path, 1, 2, added={sha256("new"): "New threat"}, removed=[md5("old")])
+
+        assert store.apply_delta(delta_path) == 2
+        assert store.version == 2
+        assert store.lookup(md5("old")) is None
+        assert store.lookup(md5("kept")) == "Kept threat"
+        assert store.lookup(sha256("new")) == "New threat"
+        store.close()
+
+        reopened = SignatureStore(store.db_path)
+        assert reopened.version == 2
+        assert reopened.lookup(sha256("new")) == "New threat"
+        reopened.close()
+
+
+def test_file_sizes_rule_out_signatures():
+    with tempfile.TemporaryDirectory() as folder:
+        db_path = os.path.join(folder, "signatures.db")
+        build_signature_file(db_path, {md5("abc"): "A", sha256("hello"): "B", "ab" * 24: "Large"},
+                             sizes={md5("abc"): 3, sha256("hello"): 5})
+        store = SignatureStore(db_path)
+        assert store.may_match_size(3) and store.may_match_size(5)
+        assert not store.may_match_size(4)
+
+        delta_path = os.path.join(folder, "1-2.delta")
+        write_signature_delta(delta_path, 1, 2, added={md5("sized"): "C"}, removed=[md5("abc")],
+                              sizes={md5("sized"): 1000})
+        store.apply_delta(delta_path)
+        assert store.may_match_size(1000) and store.may_match_size(5)
+        assert not store.may_match_size(4)
+
+        # A signature of unknown size can belong to a file of any size
+        delta_path = os.path.join(folder, "2-3.delta")
+        write_signature_delta(delta_path, 2, 3, added={md5("unsized"): "D"})
+        store.apply_delta(delta_path)
+        assert store.may_match_size(4)
+        store.close()
+
+
+def test_delta_for_other_version_is_rejected():
+    with tempfile.TemporaryDirectory() as folder:
+        store = make_store(folder, {md5("a"): "A"}, version=3)
+        delta_path = os.path.join(folder, "1-2.delta")
+        write_signature_delta(delta_path, 1, 2, added={md5("b"): "B"})
+        try:
+            store.apply_delta(delta_path)
+            assert False, "a delta for another version must not apply"
+        except ValueError:
+            pass
+        assert store.version == 3
+        assert store.lookup(md5("b")) is None
+        store.close()
+
+
+def test_update_from_directory_follows_the_chain():
+    with tempfile.TemporaryDirectory() as folder:
+        store = make_store(folder, {md5("a"): "A"})
+        delta_dir = os.path.join(folder, "updates")
+        os.makedirs(delta_dir)
+        write_signature_delta(os.path.join(delta_dir, "2.delta"), 2, 3, added={md5("c"): "C"})
+        write_signature_delta(os.path.join(delta_dir, "1.delta"), 1, 2, added={md5("b"): "B"})
+        write_signature_delta(os.path.join(delta_dir, "9.delta"), 9, 10, added={md5("z"): "Z"})
+
+        assert store.update_from_directory(delta_dir) == 2
+        assert store.version == 3
+        assert store.lookup(md5("c")) == "C"
+        assert store.lookup(md5("z")) is None
+        store.close()
+
+
+def test_lookups_stay_correct_while_a_delta_is_applied():
+    signatures = {md5(f"sig-{i}"): "Known" for i in range(2000)}
+    with tempfile.TemporaryDirectory() as folder:
+        store = make_store(folder, signatures)
+        delta_path = os.path.join(folder, "1-2.delta")
+        write_signature_delta(delta_path, 1, 2, added={md5(f"new-{i}"): "New" for i in range(200)})
+
+        errors = []
+        done = threading.Event()
+
+        def look_up():
+            while not done.is_set():
+                for i in range(0, 2000, 97):
+                    if store.lookup(md5(f"sig-{i}")) != "Known":
+                        errors.append(i)
+
+        threads = [threading.Thread(target=look_up) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        store.apply_delta(delta_path)
+        done.set()
+        for thread in threads:
+            thread.join()
+
+        assert errors == []
+        assert store.lookup(md5("new-5")) == "New"
+        store.close()
+
+
+if __name__ == "__main__":
+    test_new_store_is_seeded_with_builtin_signatures()
+    test_lookup_md5_sha256_and_fingerprint()
+    test_delta_adds_and_removes()
+    test_file_sizes_rule_out_signatures()
+    test_delta_for_other_version_is_rejected()
+    test_update_from_directory_follows_the_chain()
+    test_lookups_stay_correct_while_a_delta_is_applied()
+    print("✅ Signature store tests passed")
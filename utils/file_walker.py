@@ -0,0 +1,235 @@
+"""
+Streaming file system walker for DonTe Cleaner
+Single-pass os.scandir traversal that yields files together with their stat data
+"""
+
+import os
+import queue
+import threading
+from collections import deque
+
+
+class WalkProgress:
+    """Progress estimate for a walk whose total size is not known up front"""
+
+    def __init__(self):
+        self.files_seen = 0
+        self.dirs_done = 0
+        self.dirs_pending = 0
+
+    def percent(self):
+        """Estimated completion percentage, refined as more directories are listed"""
+        return _estimate_percent(self.files_seen, self.dirs_done, self.dirs_pending)
+
+
+class CombinedProgress:
+    """One overall estimate for several walks running side by side"""
+
+    def __init__(self, count):
+        self.parts = [WalkProgress() for _ in range(count)]
+
+    def percent(self):
+        """Estimated completion over all walks, roots not started yet count as pending"""
+        files_seen = sum(part.files_seen for part in self.parts)
+        dirs_done = sum(part.dirs_done for part in self.parts)
+        dirs_pending = sum(
+            part.dirs_pending if part.dirs_done or part.dirs_pending else 1
+            for part in self.parts
+        )
+        return _estimate_percent(files_seen, dirs_done, dirs_pending)
+
+
+def device_key(path):
+    """Identify the volume a path lives on, roots sharing it compete for the same disk"""
+    try:
+        return os.stat(path).st_dev
+    except OSError:
+        return os.path.splitdrive(os.path.abspath(path))[0].upper() or path
+
+
+def _estimate_percent(files_seen, dirs_done, dirs_pending):
+    if dirs_pending == 0:
+        return 100.0 if dirs_done else 0.0
+    if dirs_done == 0:
+        return 0.0
+
+    # Assume every pending directory holds as many files as the average one so far
+    files_per_dir = files_seen / dirs_done
+    estimated_total = files_seen + dirs_pending * max(files_per_dir, 1.0)
+    return min(99.9, (files_seen / estimated_total) * 100)
+
+
+def iter_files(root, progress=None, skip_dir=None):
+    """Yield (file_path, stat_result) for every regular file under root
+
+    The stat result comes from the os.DirEntry, so on Windows no extra system
+    call is made per file. skip_dir(name) can return True to prune a directory.
+    """
+    if progress is None:
+        progress = WalkProgress()
+
+    pending = deque([root])
+    progress.dirs_pending += 1
+
+    while pending:
+        directory = pending.popleft()
+        subdirs = []
+
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if not (skip_dir and skip_dir(entry.name)):
+                                subdirs.append(entry.path)
+                        elif entry.is_file():
+                            file_stat = entry.stat()
+                            progress.files_seen += 1
+                            yield entry.path, file_stat
+                    except OSError:
+                        continue
+        except OSError:
+            pass
+
+        pending.extend(subdirs)
+        progress.dirs_pending += len(subdirs) - 1
+        progress.dirs_done += 1
+
+
+class _StealingWalk:
+    """Worker threads listing directories, each with its own deque of pending work
+
+    A worker takes the newest directory from its own deque, which keeps its
+    walk depth first and close on disk. When it runs dry it steals the oldest
+    directory of another worker, the one closest to the root and so most
+    likely to hold a large unexplored subtree.
+    """
+
+    def __init__(self, root, progress, skip_dir, workers, queue_size):
+        self.progress = progress
+        self.skip_dir = skip_dir
+        self.deques = [deque() for _ in range(workers)]
+        self.deques[0].append(root)
+        self.outstanding = 1
+        self.condition = threading.Condition()
+        self.output = queue.Queue(maxsize=queue_size)
+        self.stopped = threading.Event()
+        progress.dirs_pending += 1
+
+        self.threads = [
+            threading.Thread(target=self._work, args=(index,), daemon=True)
+            for index in range(workers)
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def _take(self, index):
+        try:
+            return self.deques[index].pop()
+        except IndexError:
+            pass
+
+        count = len(self.deques)
+        for offset in range(1, count):
+            try:
+                return self.deques[(index + offset) % count].popleft()
+            except IndexError:
+                continue
+        return None
+
+    def _list(self, directory):
+        files = []
+        subdirs = []
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if not (self.skip_dir and self.skip_dir(entry.name)):
+                                subdirs.append(entry.path)
+                        elif entry.is_file():
+                            files.append((entry.path, entry.stat()))
+                    except OSError:
+                        continue
+        except OSError:
+            pass
+        return files, subdirs
+
+    def _put(self, item):
+        while not self.stopped.is_set():
+            try:
+                self.output.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _work(self, index):
+        while not self.stopped.is_set():
+            directory = self._take(index)
+            if directory is None:
+                with self.condition:
+                    if self.outstanding == 0:
+                        break
+                    self.condition.wait(0.05)
+                continue
+
+            files, subdirs = self._list(directory)
+            if files:
+                self._put(files)
+            self.deques[index].extend(subdirs)
+
+            with self.condition:
+                self.outstanding += len(subdirs) - 1
+                self.progress.dirs_pending += len(subdirs) - 1
+                self.progress.dirs_done += 1
+                if subdirs:
+                    self.condition.notify(len(subdirs))
+                elif self.outstanding == 0:
+                    self.condition.notify_all()
+
+        self._put(None)
+
+    def results(self):
+        finished = 0
+        while finished < len(self.threads):
+            batch = self.output.get()
+            if batch is None:
+                finished += 1
+                continue
+            for item in batch:
+                self.progress.files_seen += 1
+                yield item
+
+    def stop(self):
+        self.stopped.set()
+        with self.condition:
+            self.condition.notify_all()
+        # Unblock workers waiting on a full queue
+        try:
+            while True:
+                self.output.get_nowait()
+        except queue.Empty:
+            pass
+
+
+def parallel_iter_files(root, progress=None, skip_dir=None, workers=None, queue_size=64):
+    """Like iter_files, but directories are listed by several work-stealing threads
+
+    Files of one directory are still yielded together, the order between
+    directories is not deterministic. Useful on SSDs and network shares where
+    many outstanding directory reads finish faster than one at a time.
+    """
+    if progress is None:
+        progress = WalkProgress()
+    if workers is None:
+        workers = min(8, (os.cpu_count() or 1) * 2)
+
+    if workers <= 1:
+        yield from iter_files(root, progress, skip_dir)
+        return
+
+    walk = _StealingWalk(root, progress, skip_dir, workers, queue_size)
+    try:
+        yield from walk.results()
+    finally:
+        walk.stop()
@@ -0,0 +1,90 @@
+"""
+Progress Dispatch Helpers for DonTe Cleaner
+Coalesce high-frequency progress reports from scan threads to a fixed UI rate
+"""
+
+import time
+import threading
+
+# 10 updates per second is smooth for a progress bar and cheap for Tk
+DEFAULT_INTERVAL = 0.1
+
+
+class ThrottledCallback:
+    """Forward at most one call per interval, always with the most recent arguments
+
+    Calls arriving in between are dropped, flush() delivers the last one so the
+    final state is never lost.
+    """
+
+    def __init__(self, callback, interval=DEFAULT_INTERVAL):
+        self.callback = callback
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.last_sent = 0.0
+        self.latest = None
+
+    def __call__(self, *args):
+        with self.lock:
+            now = time.monotonic()
+            if now - self.last_sent < self.interval:
+                self.latest = args
+                return
+            self.last_sent = now
+            self.latest = None
+        self.callback(*args)
+
+    def flush(self):
+        """Deliver the last dropped update, if any"""
+        with self.lock:
+            args, self.latest = self.latest, None
+            self.last_sent = time.monotonic()
+        if args is not None:
+            self.callback(*args)
+
+
+class TkProgressDispatcher:
+    """Scan threads post their latest state, the Tk loop applies it at a fixed rate
+
+    post() only stores the arguments, so a worker never touches the Tk event
+    queue and scan speed does not depend on how long a redraw takes.
+    """
+
+    def __init__(self, root, handler, interval=DEFAULT_INTERVAL):
+        self.root = root
+        self.handler = handler
+        self.interval_ms = max(1, int(interval * 1000))
+        self.latest = None
+        self.posted = 0
+        self.shown = 0
+        self.running = False
+
+    def post(self, *args):
+        """Record the newest progress state, safe to call from any thread"""
+        self.latest = args
+        self.posted += 1
+
+    def start(self):
+        """Begin applying posted updates from the Tk event loop"""
+        if not self.running:
+            self.running = True
+            self.root.after(self.interval_ms, self._poll)
+
+    def stop(self):
+        """Stop polling after applying the last posted update, call from the Tk thread"""
+        self.running = False
+        self._apply()
+
+    def _apply(self):
+        posted = self.posted
+        if posted != self.shown and self.latest is not None:
+            self.shown = posted
+            self.handler(*self.latest)
+
+    def _poll(self):
+        if not self.running:
+            return
+        try:
+            self._apply()
+        finally:
+            self.root.after(self.interval_ms, self._poll)
@@ -14,3 +14,17 @@ def get_resource_path(relative_path):
         base_path = os.path.abspath(".")
     
     return os.path.join(base_path, "resources", relative_path)
+
+def get_app_dir():
+    """Directory the application is installed in, next to the executable when frozen"""
+    if getattr(sys, 'frozen', False):
+        return os.path.dirname(sys.executable)
+    return os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def get_config_path(relative_path=""):
+    """Absolute path inside the application's config folder, whatever the working directory
+    
+    DONTE_CONFIG_DIR moves the whole folder, e.g. to give a benchmark run cold caches.
+    """
+    config_dir = os.environ.get("DONTE_CONFIG_DIR") or os.path.join(get_app_dir(), "config")
+    return os.path.join(config_dir, relative_path)